@@ -0,0 +1,6 @@
+# benchmarks/__init__.py
+
+"""
+Performance benchmarks for the RAG backend
+Run from the backend directory, e.g. python -m benchmarks.bench_event_loop
+"""
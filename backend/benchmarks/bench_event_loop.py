@@ -0,0 +1,103 @@
+# benchmarks/bench_event_loop.py
+
+"""
+Measure /health and query latency while a large PDF upload is being ingested.
+
+If ingestion blocks the event loop, every request that arrives during the upload
+waits for it and p99 latency jumps to the upload time. With extraction on the
+process pool and embedding on the thread pool, it should stay close to the idle
+baseline.
+
+Usage: python -m benchmarks.bench_event_loop --pages 300 --concurrency 8
+Requires httpx (in-process ASGI client).
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+async def probe(client: httpx.AsyncClient, notebook_id: str, stop: asyncio.Event,
+                latencies: Dict[str, List[float]]) -> None:
+    """Alternate /health and query calls until stop is set."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies["health"].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await client.post("/hackrx/query-notebook",
+                          json={"notebook_id": notebook_id, "question": "What does the clause cover?"})
+        latencies["query"].append((time.perf_counter() - started) * 1000)
+
+
+async def run_probes(client, notebook_id, concurrency, stop) -> Dict[str, List[float]]:
+    latencies = {"health": [], "query": []}
+    await asyncio.gather(*(probe(client, notebook_id, stop, latencies) for _ in range(concurrency)))
+    return latencies
+
+
+async def main(pages: int, concurrency: int, idle_seconds: float) -> Dict[str, object]:
+    install_stub_model()
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        small = make_pdf(3, seed=1)
+        response = await client.post("/hackrx/create-notebook", files={"file": ("small.pdf", small, "application/pdf")})
+        notebook_id = response.json()["notebook_id"]
+
+        # Idle baseline
+        stop = asyncio.Event()
+        probes = asyncio.create_task(run_probes(client, notebook_id, concurrency, stop))
+        await asyncio.sleep(idle_seconds)
+        stop.set()
+        idle = await probes
+
+        # Same probes while a large upload is ingested
+        large = make_pdf(pages, seed=2)
+        stop = asyncio.Event()
+        probes = asyncio.create_task(run_probes(client, notebook_id, concurrency, stop))
+        started = time.perf_counter()
+        response = await client.post("/hackrx/create-notebook", files={"file": ("large.pdf", large, "application/pdf")})
+        upload_seconds = time.perf_counter() - started
+        stop.set()
+        busy = await probes
+
+    return {
+        "pages": pages,
+        "concurrency": concurrency,
+        "upload_status": response.status_code,
+        "upload_seconds": round(upload_seconds, 3),
+        "idle": {name: summarize(samples) for name, samples in idle.items()},
+        "during_upload": {name: summarize(samples) for name, samples in busy.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.pages, args.concurrency, args.idle_seconds)), indent=2))
@@ -0,0 +1,117 @@
+# benchmarks/bench_inference.py
+
+"""
+Throughput and agreement of the embedding inference backends.
+
+Encodes the chunks of a synthetic PDF together with their sentences and a set
+of questions (a realistic mix of long and short texts) with each backend. For
+every backend it reports load time, texts per second through a single
+model.encode call (the previous encode path) and through encode_length_sorted,
+and agreement with the torch backend: cosine between the two embeddings of
+each text, and how many answers answer_questions returns unchanged.
+
+Needs the granite model (downloaded on first use), or --stub to exercise only
+the batching with the offline stand-in. Backends that fail to load (e.g. onnx
+without onnxruntime) are reported with their error rather than measured on
+torch; "backend" in each row is the one that actually ran.
+
+Usage: python -m benchmarks.bench_inference [--backends torch torch-int8 onnx] [--pages 20] [--threads 4]
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import WORDS, make_pdf
+
+QUESTIONS = [
+    "What is the waiting period for hospital treatment?",
+    "List the benefits covered by the policy.",
+    "How is a claim processed?",
+    "What does the syllabus say about assessment?",
+] + ["What is the " + " ".join(random.Random(i).choice(WORDS) for _ in range(3)) + "?" for i in range(28)]
+
+
+def corpus(pages: int) -> Tuple[List[str], List[str]]:
+    from utils.pdf_extract import extract_pdf_text
+    from utils.sentence_index import SentenceIndex
+    from utils.splitter import semantic_split
+
+    chunks = semantic_split(extract_pdf_text(make_pdf(pages, seed=pages)))
+    sentences = SentenceIndex(chunks)
+    return list(chunks), [s for idx in range(len(chunks)) for s in sentences.sentences(idx)]
+
+
+def texts_per_second(encode, texts: List[str], repeats: int) -> float:
+    encode(texts[:8])  # Warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        encode(texts)
+    return round(repeats * len(texts) / (time.perf_counter() - started), 1)
+
+
+def main(backends: List[str], pages: int, threads: int, repeats: int, stub: bool) -> Dict[str, object]:
+    from utils.inference import encode_length_sorted, load_sentence_transformer
+    from utils.llm_chain import MODEL_LOCAL_PATH, MODEL_NAME, answer_questions, get_model
+    from utils.model_registry import model_registry
+    from utils.sentence_index import SentenceIndex
+
+    chunks, sentences = corpus(pages)
+    texts = chunks + sentences + QUESTIONS
+    random.Random(0).shuffle(texts)
+
+    results = {}
+    reference = None
+    for backend in backends:
+        try:
+            started = time.perf_counter()
+            if stub:
+                from benchmarks.stub_model import StubEmbeddingModel
+                model = StubEmbeddingModel()
+            else:
+                get_model()  # Downloads the checkpoint if needed
+                model = load_sentence_transformer(MODEL_LOCAL_PATH, backend, threads, fallback=False)
+            load_seconds = time.perf_counter() - started
+        except Exception as e:
+            results[backend] = {"error": str(e)}
+            continue
+
+        model_registry.unload(MODEL_NAME)
+        model_registry.register(MODEL_NAME, model)
+        embeddings = encode_length_sorted(model, texts)
+        chunk_embeddings = encode_length_sorted(model, chunks)
+        answers = answer_questions(QUESTIONS, chunks, chunk_embeddings, SentenceIndex(chunks))
+        row = {
+            "backend": "stub" if stub else model.inference_backend,
+            "load_s": round(load_seconds, 2),
+            "texts": len(texts),
+            "single_call_texts_per_s": texts_per_second(
+                lambda batch: model.encode(batch, normalize_embeddings=True, convert_to_numpy=True), texts, repeats),
+            "length_sorted_texts_per_s": texts_per_second(lambda batch: encode_length_sorted(model, batch),
+                                                          texts, repeats),
+        }
+        if reference is None:
+            reference = (backend, embeddings, answers)
+        else:
+            cosines = np.sum(embeddings * reference[1], axis=1)
+            row["agreement_with"] = reference[0]
+            row["cosine_mean"] = round(float(cosines.mean()), 5)
+            row["cosine_min"] = round(float(cosines.min()), 5)
+            row["answers_unchanged"] = f"{sum(a == b for a, b in zip(answers, reference[2]))}/{len(answers)}"
+        results[backend] = row
+    return {"pages": pages, "chunks": len(chunks), "threads": threads, "stub": stub, "backends": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--stub", action="store_true", help="Use the offline stand-in model")
+    args = parser.parse_args()
+    print(json.dumps(main(args.backends, args.pages, args.threads, args.repeats, args.stub), indent=2))
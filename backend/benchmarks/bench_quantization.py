@@ -0,0 +1,61 @@
+# benchmarks/bench_quantization.py
+
+"""
+Memory and recall of quantized embedding search against float32.
+
+Uses the clustered synthetic corpus of bench_vector_index. For float16 and
+int8 the benchmark reports the bytes held in memory by the search copy and the
+saving against the float32 matrix, recall@k of the quantized scores alone, and
+recall@k and latency once the top candidates are re-scored at full precision.
+
+Usage: python -m benchmarks.bench_quantization [--chunks 5000 20000] [--dim 384] [--k 3]
+"""
+
+import argparse
+import json
+from typing import Dict, List
+
+from benchmarks.bench_vector_index import make_embeddings, make_queries, recall, time_queries
+from utils.vector_index import FlatIndex, QuantizedIndex, top_k_indices
+
+
+def main(chunk_counts: List[int], dim: int, k: int, queries: int, rescore: List[int]) -> Dict[str, object]:
+    results = []
+    for chunks in chunk_counts:
+        embeddings = make_embeddings(chunks, dim, topics=max(16, chunks // 40))
+        query_vectors = make_queries(embeddings, queries)
+        flat = FlatIndex(embeddings)
+        truth = [flat.search(q, k)[0] for q in query_vectors]
+        row = {
+            "chunks": chunks,
+            "float32": {"bytes": embeddings.nbytes, **time_queries(lambda q: flat.search(q, k), query_vectors)},
+        }
+        for precision in ("float16", "int8"):
+            index = QuantizedIndex(embeddings, precision)
+            quantized = index.quantized
+            approximate = [top_k_indices(quantized.scores(q), k) for q in query_vectors]
+            entry = {
+                "bytes": quantized.nbytes,
+                "memory_saved": round(1 - quantized.nbytes / embeddings.nbytes, 4),
+                f"recall_at_{k}_quantized_only": recall(approximate, truth),
+                "rescored": [],
+            }
+            for candidates in rescore:
+                index.rescore = candidates
+                found = [index.search(q, k)[0] for q in query_vectors]
+                entry["rescored"].append({"candidates": candidates, f"recall_at_{k}": recall(found, truth),
+                                          **time_queries(lambda q: index.search(q, k), query_vectors)})
+            row[precision] = entry
+        results.append(row)
+    return {"dim": dim, "k": k, "queries": queries, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[5_000, 20_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[8, 32, 128])
+    args = parser.parse_args()
+    print(json.dumps(main(args.chunks, args.dim, args.k, args.queries, args.rescore), indent=2))
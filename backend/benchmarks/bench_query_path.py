@@ -0,0 +1,121 @@
+# benchmarks/bench_query_path.py
+
+"""
+Compare per-question allocations and latency of the prompt-building query path
+with the structured answer_question API.
+
+The old path built an f-string prompt holding ' '.join(chunks), passed it to
+generate_response, which wrapped it in a second prompt holding the document
+again, and process_with_llm split the result on "Question:" to recover the
+query. answer_question takes the question and the chunks directly. Both paths
+get the same pre-encoded question and must return identical answers.
+
+Usage: python -m benchmarks.bench_query_path [--pages 10 100 500] [--queries 50]
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+
+QUESTIONS = [
+    "What is the waiting period for hospital treatment?",
+    "List the benefits covered by the policy.",
+    "How is a claim processed?",
+    "Who is the insured member?",
+    "What does clause 4 say about the premium?",
+]
+
+
+def legacy_answer(question, chunks, chunk_embeddings, sentence_index, question_embedding) -> str:
+    """The removed prompt-building path, kept as the reference."""
+    from utils.llm_chain import process_with_llm
+
+    full_context = " ".join(chunks)
+    prompt = f"Based on the following document, answer the question:\n\nDocument:\n{full_context}\n\nQuestion:\n{question}"
+    system_prompt = f"""Answer the given question using ONLY the information provided in the supplied document content.
+
+Question: {prompt}
+
+Document Content: {' '.join(chunks)}
+
+Answer:"""
+    return process_with_llm(system_prompt, chunks, chunk_embeddings, sentence_index, question_embedding)
+
+
+def structured_answer(question, chunks, chunk_embeddings, sentence_index, question_embedding) -> str:
+    from utils.llm_chain import answer_question
+
+    return answer_question(question, chunks, chunk_embeddings, sentence_index, question_embedding)
+
+
+def measure(answer: Callable, document, questions: List[str], embeddings) -> Dict[str, float]:
+    args = [(q, document.chunks, document.embeddings, document.sentence_index, e) for q, e in zip(questions, embeddings)]
+
+    latencies = []
+    for call in args:
+        started = time.perf_counter()
+        answer(*call)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    peaks = []
+    for call in args:
+        tracemalloc.start()
+        answer(*call)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+
+    return {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "peak_alloc_kib_per_query": round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+def main(page_counts: List[int], queries: int) -> Dict[str, object]:
+    install_stub_model()
+    from utils.ingest import build_document
+    from utils.llm_chain import encode_texts
+
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(queries)]
+    question_embeddings = list(encode_texts(questions))
+    results = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for pages in page_counts:
+            document = build_document(make_pdf(pages, seed=pages), f"bench-{pages}", executor)
+            # Warm the sentence cache so both paths do identical retrieval work
+            for q, e in zip(questions, question_embeddings):
+                structured_answer(q, document.chunks, document.embeddings, document.sentence_index, e)
+
+            mismatches = sum(
+                legacy_answer(q, document.chunks, document.embeddings, document.sentence_index, e)
+                != structured_answer(q, document.chunks, document.embeddings, document.sentence_index, e)
+                for q, e in zip(questions, question_embeddings)
+            )
+            results.append({
+                "pages": pages,
+                "chunks": len(document.chunks),
+                "text_chars": len(document.text),
+                "answer_mismatches": mismatches,
+                "prompt_path": measure(legacy_answer, document, questions, question_embeddings),
+                "structured": measure(structured_answer, document, questions, question_embeddings),
+            })
+    return {"queries": queries, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    result = main(args.pages, args.queries)
+    print(json.dumps(result, indent=2))
+    if any(row["answer_mismatches"] for row in result["results"]):
+        raise SystemExit(1)
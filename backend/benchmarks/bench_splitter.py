@@ -0,0 +1,156 @@
+# benchmarks/bench_splitter.py
+
+"""
+Check semantic_split against the original implementation and chart its cost.
+
+The golden corpus covers the shapes that exercise every break rule: prose,
+newline-heavy text, comma-only text, unpunctuated text, single long tokens,
+unicode whitespace and documents around the chunk-size thresholds. Each is
+split by both implementations and must produce identical chunks; then chunking
+time is measured against document length.
+
+Usage: python -m benchmarks.bench_splitter [--max-chars 2000000]
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from typing import Callable, Dict, List
+
+from utils.splitter import semantic_split
+
+
+def legacy_semantic_split(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+    """The pre-index implementation, kept verbatim as the reference."""
+    if not text or not text.strip():
+        return []
+    text = re.sub(r'\n+', '\n', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text]
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end >= len(text):
+            chunks.append(text[start:].strip())
+            break
+        break_point = legacy_find_break_point(text, start, end)
+        if break_point == -1:
+            break_point = end
+        chunk = text[start:break_point].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = max(break_point - overlap, start + 1)
+        if start >= break_point:
+            start = break_point
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def legacy_find_break_point(text: str, start: int, end: int) -> int:
+    sentence_endings = ['.', '!', '?']
+    for i in range(end - 1, start + len(text) // 4, -1):
+        if text[i] in sentence_endings and i + 1 < len(text):
+            if text[i + 1].isspace() or i + 1 == len(text):
+                return i + 1
+    for i in range(end - 1, start + len(text) // 4, -1):
+        if text[i] == '\n':
+            return i + 1
+    other_punctuation = [';', ':', ',']
+    for i in range(end - 1, start + len(text) // 2, -1):
+        if text[i] in other_punctuation and i + 1 < len(text):
+            if text[i + 1].isspace():
+                return i + 1
+    for i in range(end - 1, start + len(text) // 2, -1):
+        if text[i].isspace():
+            return i + 1
+    return -1
+
+
+def prose(rng: random.Random, chars: int, punctuation: str = ".!?;:,", newline_rate: float = 0.05) -> str:
+    words = "the policy covers hospital treatment after a waiting period of thirty days for members".split()
+    parts, length = [], 0
+    while length < chars:
+        word = rng.choice(words)
+        if rng.random() < 0.12 and punctuation:
+            word += rng.choice(punctuation)
+        sep = "\n" if rng.random() < newline_rate else rng.choice([" ", " ", "  ", "\t"])
+        parts.append(word + sep)
+        length += len(word) + len(sep)
+    return "".join(parts)
+
+
+def golden_corpus() -> Dict[str, str]:
+    rng = random.Random(42)
+    corpus = {}
+    for chars in (0, 50, 999, 1000, 1001, 1500, 2500, 3999, 4000, 4100, 8000, 30000):
+        corpus[f"prose_{chars}"] = prose(rng, chars)
+        corpus[f"commas_{chars}"] = prose(rng, chars, punctuation=",;:")
+        corpus[f"bare_{chars}"] = prose(rng, chars, punctuation="", newline_rate=0.0)
+        corpus[f"paragraphs_{chars}"] = prose(rng, chars, newline_rate=0.4)
+    corpus["whitespace_only"] = " \n\t  \n"
+    corpus["one_token"] = "x" * 5000
+    corpus["long_tokens"] = " ".join("y" * rng.randint(200, 1500) for _ in range(10))
+    corpus["unicode_space"] = prose(rng, 3000).replace(" ", "  ", 200) + "\x1c\x1d end."
+    corpus["trailing_punct"] = prose(rng, 2000) + "..!! ?"
+    return corpus
+
+
+def check_golden(split: Callable, reference: Callable) -> List[str]:
+    mismatches = []
+    for name, text in golden_corpus().items():
+        for chunk_size, overlap in ((1000, 100), (300, 50), (1500, 50), (120, 200)):
+            if split(text, chunk_size, overlap) != reference(text, chunk_size, overlap):
+                mismatches.append(f"{name} (chunk_size={chunk_size}, overlap={overlap})")
+    return mismatches
+
+
+def time_split(split: Callable, text: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        split(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def chart(rows: List[Dict[str, float]], key: str, width: int = 50) -> str:
+    peak = max(row[key] for row in rows) or 1.0
+    lines = []
+    for row in rows:
+        bar = "#" * max(1, int(width * row[key] / peak))
+        lines.append(f"{int(row['chars']):>10,} chars | {bar} {row[key] * 1000:.1f} ms")
+    return "\n".join(lines)
+
+
+def main(max_chars: int, include_legacy: bool) -> Dict[str, object]:
+    mismatches = check_golden(semantic_split, legacy_semantic_split)
+
+    rng = random.Random(7)
+    rows = []
+    chars = 10_000
+    while chars <= max_chars:
+        # Two-column-PDF style text: sentences with the odd paragraph break
+        text = prose(rng, chars, newline_rate=0.02)
+        row = {"chars": chars, "semantic_split_s": time_split(semantic_split, text)}
+        if include_legacy:
+            row["legacy_s"] = time_split(legacy_semantic_split, text, repeat=1)
+        rows.append(row)
+        chars *= 2
+
+    print(chart(rows, "semantic_split_s"))
+    return {"golden_mismatches": mismatches, "timings": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-chars", type=int, default=2_000_000)
+    parser.add_argument("--no-legacy", action="store_true", help="skip timing the reference implementation")
+    args = parser.parse_args()
+    result = main(args.max_chars, not args.no_legacy)
+    print(json.dumps(result, indent=2))
+    if result["golden_mismatches"]:
+        raise SystemExit(1)
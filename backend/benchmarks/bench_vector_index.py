@@ -0,0 +1,94 @@
+# benchmarks/bench_vector_index.py
+
+"""
+Recall and latency of the IVF vector index against exact flat search.
+
+Chunk embeddings are drawn around a few thousand topic directions (real
+document embeddings are clustered in the same way; uniformly random vectors
+would be the worst case for any clustering index). Queries are noisy copies of
+chunks. For each n_probe setting the benchmark reports recall@k against
+FlatIndex and the per-query latency, next to the old full argsort.
+
+Usage: python -m benchmarks.bench_vector_index [--chunks 20000 100000] [--dim 384] [--k 3]
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from utils.vector_index import FlatIndex, IVFIndex
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_embeddings(chunks: int, dim: int, topics: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((topics, dim)))
+    members = centers[rng.integers(0, topics, chunks)]
+    return normalize(members + 0.6 * rng.standard_normal((chunks, dim)) / np.sqrt(dim))
+
+
+def make_queries(embeddings: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = embeddings[rng.integers(0, len(embeddings), count)]
+    return normalize(picks + 0.5 * rng.standard_normal(picks.shape) / np.sqrt(embeddings.shape[1]))
+
+
+def time_queries(search: Callable[[np.ndarray], np.ndarray], queries: np.ndarray) -> Dict[str, float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {"p50_ms": round(statistics.median(latencies), 3),
+            "p99_ms": round(sorted(latencies)[int(0.99 * (len(latencies) - 1))], 3)}
+
+
+def recall(found: List[np.ndarray], truth: List[np.ndarray]) -> float:
+    hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+    return round(hits / sum(len(t) for t in truth), 4)
+
+
+def main(chunk_counts: List[int], dim: int, k: int, queries: int, probes: List[int]) -> Dict[str, object]:
+    results = []
+    for chunks in chunk_counts:
+        embeddings = make_embeddings(chunks, dim, topics=max(16, chunks // 40))
+        query_vectors = make_queries(embeddings, queries)
+
+        flat = FlatIndex(embeddings)
+        truth = [flat.search(q, k)[0] for q in query_vectors]
+        row = {
+            "chunks": chunks,
+            "argsort_full": time_queries(lambda q: np.argsort(-(embeddings @ q), kind="stable")[:k], query_vectors),
+            "flat": time_queries(lambda q: flat.search(q, k), query_vectors),
+            "ivf": [],
+        }
+
+        started = time.perf_counter()
+        ivf = IVFIndex(embeddings)
+        row["ivf_build_s"] = round(time.perf_counter() - started, 3)
+        row["ivf_lists"] = ivf.n_lists
+        for n_probe in probes:
+            ivf.n_probe = min(n_probe, ivf.n_lists)
+            found = [ivf.search(q, k)[0] for q in query_vectors]
+            row["ivf"].append({"n_probe": ivf.n_probe, f"recall_at_{k}": recall(found, truth),
+                               **time_queries(lambda q: ivf.search(q, k), query_vectors)})
+        results.append(row)
+    return {"dim": dim, "k": k, "queries": queries, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+    print(json.dumps(main(args.chunks, args.dim, args.k, args.queries, args.probes), indent=2))
@@ -0,0 +1,304 @@
+# benchmarks/replay.py
+
+"""
+Replay a recorded query log against the notebook API.
+
+Start the server with QUERY_LOG_PATH=queries.log to record create-notebook,
+query-notebook, notebook listing, notebook and delete requests (one compact
+JSON line each; questions are kept, uploaded PDFs only as page count, size and
+hash). Replaying sends the same operations in the same order: each recorded
+upload becomes a synthetic PDF with the recorded page count (the same hash
+always maps to the same PDF, so repeated uploads still share a document), and
+recorded notebook IDs are mapped to the notebooks the replay created.
+Notebooks the log queries but never creates are created before the clock
+starts.
+
+Pacing, one of:
+  --speed S        the recorded arrival times, S times faster (default 1)
+  --rate R         open loop, R requests per second in the recorded order
+  --concurrency N  closed loop, N requests in flight at a time
+
+Targets a running server with --url, or by default the app in-process (httpx
+ASGI transport) with the offline stub embedding model and an in-memory
+notebook store, so it runs without the granite weights. --generate writes a
+synthetic log with the usual mix of uploads, follow-up questions, listings and
+deletes instead of recording one.
+
+Reports throughput, latency percentiles, error rate (status >= 400 or no
+response) and responses whose status differs from the recorded one, per
+operation and overall.
+
+Usage: python -m benchmarks.replay queries.log [--url http://localhost:8000] [--speed 2 | --rate 50 | --concurrency 8]
+       python -m benchmarks.replay queries.log --generate 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from benchmarks.suite import latency_summary
+from benchmarks.synthetic import WORDS, make_pdf
+
+DEFAULT_PAGES = 10
+
+
+def load_log(path: str, limit: Optional[int] = None) -> List[Dict[str, object]]:
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda entry: entry.get("t", 0.0))
+    return entries[:limit] if limit else entries
+
+
+def generate_log(operations: int, seed: int = 0) -> List[Dict[str, object]]:
+    """
+    A synthetic log: mostly follow-up questions on recent notebooks, some uploads
+    (a few repeating an earlier PDF), listings and deletes, arriving at ~20/s.
+    """
+    rng = random.Random(seed)
+    entries, live, hashes = [], [], []
+    t = 0.0
+    for idx in range(operations):
+        t += rng.expovariate(20.0)
+        roll = rng.random()
+        if not live or roll < 0.1:
+            if hashes and rng.random() < 0.3:
+                document_hash, pages = rng.choice(hashes)
+            else:
+                document_hash, pages = f"{rng.getrandbits(64):016x}", rng.choice([2, 5, 10, 30])
+                hashes.append((document_hash, pages))
+            notebook_id = f"nb-{idx}"
+            live.append(notebook_id)
+            entries.append({"t": round(t, 3), "op": "create", "nb": notebook_id, "hash": document_hash,
+                            "pages": pages, "status": 200})
+        elif roll < 0.85:
+            question = f"What does the document say about {' '.join(rng.choice(WORDS) for _ in range(3))}?"
+            entries.append({"t": round(t, 3), "op": "query", "nb": rng.choice(live[-5:]), "q": question,
+                            "status": 200})
+        elif roll < 0.93:
+            entries.append({"t": round(t, 3), "op": "list", "status": 200})
+        elif roll < 0.97:
+            entries.append({"t": round(t, 3), "op": "get", "nb": rng.choice(live), "status": 200})
+        else:
+            entries.append({"t": round(t, 3), "op": "delete", "nb": live.pop(rng.randrange(len(live))),
+                            "status": 200})
+    return entries
+
+
+class Replayer:
+    """Sends log entries through an httpx.AsyncClient and collects per-operation results."""
+
+    def __init__(self, client, entries: List[Dict[str, object]]):
+        self.client = client
+        self.entries = entries
+        self._notebooks: Dict[str, asyncio.Future] = {}  # Recorded ID -> replayed ID (None if creation failed)
+        self._pdfs: Dict[str, bytes] = {}
+        # Requests per recorded notebook still running; a delete waits for the ones logged before it
+        self._in_flight: Dict[str, Set[asyncio.Future]] = defaultdict(set)
+        self.latencies_ms: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.mismatches: Dict[str, int] = defaultdict(int)
+
+    def pdf(self, entry: Dict[str, object]) -> bytes:
+        document_hash = str(entry.get("hash") or entry.get("nb") or "")
+        if document_hash not in self._pdfs:
+            self._pdfs[document_hash] = make_pdf(int(entry.get("pages") or DEFAULT_PAGES),
+                                                 seed=zlib.crc32(document_hash.encode()))
+        return self._pdfs[document_hash]
+
+    def _notebook(self, recorded_id: str) -> asyncio.Future:
+        if recorded_id not in self._notebooks:
+            self._notebooks[recorded_id] = asyncio.get_running_loop().create_future()
+        return self._notebooks[recorded_id]
+
+    async def _create(self, entry: Dict[str, object]):
+        params = {"background": "true"} if entry.get("background") else None
+        response = await self.client.post("/hackrx/create-notebook", params=params,
+                                          files={"file": ("replay.pdf", self.pdf(entry), "application/pdf")})
+        if entry.get("nb"):
+            future = self._notebook(str(entry["nb"]))
+            if not future.done():
+                future.set_result(response.json()["notebook_id"] if response.status_code == 200 else None)
+        return response
+
+    async def prepare(self) -> None:
+        """
+        Create the notebooks the log uses but doesn't create (they predate the log).
+
+        Notebooks every recorded request failed on keep their recorded ID, which
+        the target doesn't know either, so those requests fail the same way.
+        """
+        created = {entry.get("nb") for entry in self.entries if entry["op"] == "create"}
+        missing = {}
+        for entry in self.entries:
+            if entry.get("nb") and entry["nb"] not in created:
+                missing[entry["nb"]] = missing.get(entry["nb"], False) or entry.get("status", 200) < 400
+        for notebook_id, existed in missing.items():
+            if not existed:
+                self._notebook(notebook_id).set_result(notebook_id)
+        # Building the PDFs would block the event loop during the replay
+        for entry in self.entries:
+            if entry["op"] == "create":
+                self.pdf(entry)
+        await asyncio.gather(*(self._create({"nb": nb}) for nb, existed in missing.items() if existed))
+
+    async def send(self, entry: Dict[str, object]) -> None:
+        op = str(entry["op"])
+        started = time.perf_counter()
+        status = 0
+        earlier, done = set(), None
+        if op in ("query", "get"):
+            done = asyncio.get_running_loop().create_future()
+            self._in_flight[str(entry["nb"])].add(done)
+        elif op == "delete":
+            earlier = set(self._in_flight[str(entry["nb"])])
+        try:
+            if op == "create":
+                response = await self._create(entry)
+            elif op == "list":
+                response = await self.client.get("/hackrx/notebooks")
+            else:
+                notebook_id = await self._notebook(str(entry["nb"]))
+                if notebook_id is None:
+                    raise LookupError("the notebook's creation failed")
+                if earlier:
+                    await asyncio.gather(*earlier)
+                started = time.perf_counter()  # Waiting for the upload or earlier requests isn't this request's latency
+                if op == "query":
+                    response = await self.client.post("/hackrx/query-notebook",
+                                                      json={"notebook_id": notebook_id, "question": entry["q"]})
+                elif op == "get":
+                    response = await self.client.get(f"/hackrx/notebooks/{notebook_id}")
+                elif op == "delete":
+                    response = await self.client.delete(f"/hackrx/notebooks/{notebook_id}")
+                else:
+                    raise ValueError(f"Unknown operation {op!r}")
+            status = response.status_code
+        except Exception as e:
+            if op == "create" and entry.get("nb"):
+                future = self._notebook(str(entry["nb"]))
+                if not future.done():
+                    future.set_result(None)
+            status = type(e).__name__
+        finally:
+            if done is not None:
+                done.set_result(None)
+                self._in_flight[str(entry["nb"])].discard(done)
+        self.latencies_ms[op].append((time.perf_counter() - started) * 1000)
+        self.statuses[op][str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[op] += 1
+        if "status" in entry and status != entry["status"]:
+            self.mismatches[op] += 1
+
+    async def run_timed(self, interval_of) -> None:
+        """Open loop: entry i starts interval_of(i, entry) seconds after the first, whatever is in flight."""
+        started = time.perf_counter()
+        tasks = []
+        for idx, entry in enumerate(self.entries):
+            delay = started + interval_of(idx, entry) - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.send(entry)))
+        await asyncio.gather(*tasks)
+
+    async def run_concurrent(self, concurrency: int) -> None:
+        """Closed loop: concurrency workers each send the next entry once their previous one completes."""
+        pending = iter(self.entries)
+
+        async def worker():
+            for entry in pending:
+                await self.send(entry)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    def report(self, seconds: float) -> Dict[str, object]:
+        def row(count: int, errors: int, mismatches: int, samples: List[float]) -> Dict[str, object]:
+            return {"requests": count, "errors": errors, "error_rate": round(errors / count, 4) if count else 0.0,
+                    "status_mismatches": mismatches, "throughput_per_s": round(count / seconds, 2),
+                    **(latency_summary(samples) if samples else {})}
+
+        operations = {}
+        for op in sorted(self.latencies_ms):
+            samples = self.latencies_ms[op]
+            operations[op] = {**row(len(samples), self.errors[op], self.mismatches[op], samples),
+                              "statuses": dict(self.statuses[op])}
+        every = [sample for samples in self.latencies_ms.values() for sample in samples]
+        return {"seconds": round(seconds, 3),
+                "overall": row(len(every), sum(self.errors.values()), sum(self.mismatches.values()), every),
+                "operations": operations}
+
+
+async def replay(client, entries: List[Dict[str, object]], speed: float, rate: Optional[float],
+                 concurrency: Optional[int]) -> Dict[str, object]:
+    replayer = Replayer(client, entries)
+    await replayer.prepare()
+    first = entries[0].get("t", 0.0) if entries else 0.0
+    started = time.perf_counter()
+    if concurrency:
+        await replayer.run_concurrent(concurrency)
+    elif rate:
+        await replayer.run_timed(lambda idx, entry: idx / rate)
+    else:
+        await replayer.run_timed(lambda idx, entry: (entry.get("t", 0.0) - first) / speed)
+    return replayer.report(time.perf_counter() - started)
+
+
+async def main(log_path: str, url: Optional[str], speed: float, rate: Optional[float], concurrency: Optional[int],
+               limit: Optional[int]) -> Dict[str, object]:
+    import httpx
+
+    entries = load_log(log_path, limit)
+    pacing = ({"concurrency": concurrency} if concurrency else {"rate": rate} if rate else {"speed": speed})
+    meta = {"log": log_path, "entries": len(entries), "target": url or "in-process", **pacing}
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+            return {"meta": meta, "results": await replay(client, entries, speed, rate, concurrency)}
+
+    # Defaults for an isolated, offline run; explicit environment settings still win
+    os.environ.setdefault("NOTEBOOK_STORE", "memory")
+    os.environ.setdefault("WARM_MODELS_ON_STARTUP", "0")
+    os.environ.pop("QUERY_LOG_PATH", None)  # Don't record the replay into a log
+
+    from benchmarks.stub_model import install_stub_model
+    install_stub_model()
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            return {"meta": meta, "results": await replay(client, entries, speed, rate, concurrency)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="Query log (QUERY_LOG_PATH) to replay, or to write with --generate")
+    parser.add_argument("--url", help="Base URL of a running server; the app runs in-process when omitted")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--speed", type=float, default=1.0, help="Replay the recorded timing this many times faster")
+    pacing.add_argument("--rate", type=float, help="Requests per second, open loop")
+    pacing.add_argument("--concurrency", type=int, help="Requests in flight, closed loop")
+    parser.add_argument("--limit", type=int, help="Replay only the first this many entries")
+    parser.add_argument("--generate", type=int, metavar="N", help="Write a synthetic log of N requests and exit")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --generate")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.generate:
+        with open(args.log, "w") as f:
+            for entry in generate_log(args.generate, args.seed):
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        print(f"Wrote {args.generate} requests to {args.log}")
+    else:
+        result = asyncio.run(main(args.log, args.url, args.speed, args.rate, args.concurrency, args.limit))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,262 @@
+# benchmarks/suite.py
+
+"""
+Reproducible benchmark suite for ingestion and query throughput.
+
+Every run uses the same seeded synthetic PDFs (PyMuPDF) and the offline stub
+embedding model, so it needs no network or model weights and results from
+different commits are comparable. Phases:
+
+  split      semantic_split throughput on each PDF's text
+  ingest     build_document on the production worker pools: pages/s, chunks/s
+  retrieval  extract_relevant_chunks and answer_question per call, in-process
+  http       single and concurrent query-notebook latency through the FastAPI
+             app in-process (httpx ASGI transport), plus run-file latency
+  memory     peak RSS of the process and RSS after each phase
+
+Results are written as JSON together with the commit and library versions.
+--compare prints the relative change of every number against an earlier
+result file. The answer cache is disabled unless --answer-cache is given, so
+repeated questions measure the pipeline rather than the cache.
+
+Usage: python -m benchmarks.suite [--pages 10 100] [--queries 50] [--concurrency 8]
+                                  [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.synthetic import WORDS, make_pdf
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss_bytes() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+    }
+
+
+def make_questions(count: int) -> List[str]:
+    rng = np.random.default_rng(7)
+    return [f"What does the document say about {' '.join(rng.choice(WORDS, 3))}?" for _ in range(count)]
+
+
+def commit_id() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_split(pdfs: Dict[int, bytes]) -> List[Dict[str, object]]:
+    from utils.pdf_extract import extract_pdf_text
+    from utils.splitter import semantic_split
+
+    rows = []
+    for pages, pdf_bytes in pdfs.items():
+        text = extract_pdf_text(pdf_bytes)
+        started = time.perf_counter()
+        chunks = semantic_split(text)
+        seconds = time.perf_counter() - started
+        rows.append({"pages": pages, "chars": len(text), "chunks": len(chunks), "seconds": round(seconds, 4),
+                     "mchars_per_s": round(len(text) / seconds / 1e6, 3)})
+    return rows
+
+
+def bench_ingest(pdfs: Dict[int, bytes]) -> List[Dict[str, object]]:
+    from utils.document_store import hash_document
+    from utils.ingest import build_document
+    from utils.workers import worker_pools
+
+    rows = []
+    for pages, pdf_bytes in pdfs.items():
+        started = time.perf_counter()
+        document = build_document(pdf_bytes, hash_document(pdf_bytes), worker_pools.process_pool,
+                                  worker_pools.embedding_pool)
+        seconds = time.perf_counter() - started
+        rows.append({"pages": pages, "chunks": len(document.chunks), "seconds": round(seconds, 3),
+                     "pages_per_s": round(pages / seconds, 1), "chunks_per_s": round(len(document.chunks) / seconds, 1),
+                     "document_bytes": document.nbytes()})
+    return rows
+
+
+def bench_retrieval(pdf_bytes: bytes, questions: List[str]) -> Dict[str, object]:
+    from utils.document_store import hash_document
+    from utils.ingest import build_document
+    from utils.llm_chain import answer_question, encode_texts, extract_relevant_chunks
+
+    document = build_document(pdf_bytes, hash_document(pdf_bytes), None, None)
+    question_embeddings = encode_texts(questions)
+    timings = {"extract_relevant_chunks": [], "answer_question": []}
+    for question, embedding in zip(questions, question_embeddings):
+        started = time.perf_counter()
+        extract_relevant_chunks(question, document.chunks, top_k=3, chunk_embeddings=document.embeddings)
+        timings["extract_relevant_chunks"].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        answer_question(question, document.chunks, document.embeddings, document.sentence_index, embedding,
+                        document.vector_index, document.lexical_index)
+        timings["answer_question"].append((time.perf_counter() - started) * 1000)
+    return {"chunks": len(document.chunks), **{name: latency_summary(samples) for name, samples in timings.items()}}
+
+
+async def bench_http(app, pdf_bytes: bytes, questions: List[str], concurrency: int) -> Dict[str, object]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post("/hackrx/create-notebook",
+                                     files={"file": ("bench.pdf", pdf_bytes, "application/pdf")})
+        response.raise_for_status()
+        create_ms = (time.perf_counter() - started) * 1000
+        notebook_id = response.json()["notebook_id"]
+
+        async def query(question: str) -> float:
+            started = time.perf_counter()
+            response = await client.post("/hackrx/query-notebook",
+                                         json={"notebook_id": notebook_id, "question": question})
+            response.raise_for_status()
+            return (time.perf_counter() - started) * 1000
+
+        single = [await query(question) for question in questions]
+
+        async def worker(offset: int) -> List[float]:
+            return [await query(question) for question in questions[offset::concurrency]]
+
+        started = time.perf_counter()
+        per_worker = await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        concurrent_seconds = time.perf_counter() - started
+        concurrent = [sample for samples in per_worker for sample in samples]
+
+        started = time.perf_counter()
+        response = await client.post("/hackrx/run-file", files={"file": ("bench.pdf", pdf_bytes, "application/pdf")},
+                                     params={"questions": json.dumps(questions[:10])})
+        response.raise_for_status()
+        run_file_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "create_notebook_ms": round(create_ms, 2),
+        "single_query": latency_summary(single),
+        "concurrent_query": {"concurrency": concurrency, **latency_summary(concurrent),
+                             "queries_per_s": round(len(concurrent) / concurrent_seconds, 1)},
+        "run_file_10_questions_ms": round(run_file_ms, 2),
+    }
+
+
+async def main(page_counts: List[int], query_pages: int, queries: int, concurrency: int,
+               answer_cache: bool) -> Dict[str, object]:
+    # Defaults for an isolated, offline run; explicit environment settings still win
+    os.environ.setdefault("NOTEBOOK_STORE", "memory")
+    os.environ.setdefault("WARM_MODELS_ON_STARTUP", "0")
+    if not answer_cache:
+        os.environ["ANSWER_CACHE_ENTRIES"] = "0"
+
+    from benchmarks.stub_model import install_stub_model
+    install_stub_model()
+    from main import app
+
+    pdfs = {pages: make_pdf(pages, seed=pages) for pages in page_counts}
+    questions = make_questions(queries)
+    rss = {"start": rss_bytes()}
+
+    # Runs the app's startup and shutdown handlers, as the server would
+    async with app.router.lifespan_context(app):
+        results = {"split": bench_split(pdfs)}
+        rss["after_split"] = rss_bytes()
+        results["ingest"] = await asyncio.to_thread(bench_ingest, pdfs)
+        rss["after_ingest"] = rss_bytes()
+        query_pdf = make_pdf(query_pages, seed=query_pages)
+        results["retrieval"] = await asyncio.to_thread(bench_retrieval, query_pdf, questions)
+        rss["after_retrieval"] = rss_bytes()
+        results["http"] = await bench_http(app, query_pdf, questions, concurrency)
+        rss["after_http"] = rss_bytes()
+
+    results["memory"] = {"peak_rss_bytes": peak_rss_bytes(), "rss_bytes": rss}
+    return {
+        "meta": {
+            "commit": commit_id(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {"pages": page_counts, "query_pages": query_pages, "queries": queries,
+                       "concurrency": concurrency, "answer_cache": answer_cache},
+        },
+        "results": results,
+    }
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by path; list items are keyed by their pages when they have them."""
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, list):
+        flat = {}
+        for idx, item in enumerate(value):
+            label = f"pages={item['pages']}" if isinstance(item, dict) and "pages" in item else str(idx)
+            flat.update(flatten(item, f"{prefix}[{label}]"))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object]) -> Dict[str, Dict[str, float]]:
+    """Relative change of every number present in both result files."""
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    return {
+        key: {"baseline": before[key], "current": after[key],
+              "change": round(after[key] / before[key] - 1, 4) if before[key] else None}
+        for key in sorted(before.keys() & after.keys())
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--query-pages", type=int, default=50, help="Size of the PDF the query phases use")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--answer-cache", action="store_true", help="Leave the answer cache enabled")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args.pages, args.query_pages, args.queries, args.concurrency, args.answer_cache))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        result["comparison"] = {"baseline_commit": baseline["meta"]["commit"], "metrics": compare(baseline, result)}
+    print(json.dumps(result, indent=2))
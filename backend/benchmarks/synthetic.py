@@ -0,0 +1,42 @@
+# benchmarks/synthetic.py
+
+import random
+from typing import Optional
+import fitz
+
+# Fixed metadata: PyMuPDF otherwise stamps the current time, so the same pages would hash differently
+METADATA = {"producer": "benchmarks.synthetic", "creator": "benchmarks.synthetic",
+            "creationDate": "D:20240101000000Z", "modDate": "D:20240101000000Z"}
+
+WORDS = (
+    "policy coverage premium hospital insured claim period benefit treatment clause "
+    "student syllabus lecture module assessment credit semester grade research method "
+    "data analysis result network model system process value table section report"
+).split()
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice([".", ".", ".", "?", "!", ";", ","])
+
+
+def make_pdf(pages: int, lines_per_page: int = 40, seed: Optional[int] = 0) -> bytes:
+    """
+    Build a text PDF with the given number of pages of pseudo-random sentences.
+
+    The same seed always produces the same bytes (fixed metadata and no new
+    file ID), so document hashes and results are comparable across runs and
+    commits.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_no in range(pages):
+        page = doc.new_page()
+        lines = [f"Section {page_no + 1}. Clause {page_no + 1}.{rng.randint(1, 9)} applies here."]
+        lines += [make_sentence(rng) for _ in range(lines_per_page - 1)]
+        page.insert_textbox(page.rect + (36, 36, -36, -36), "\n".join(lines), fontsize=8)
+    doc.set_metadata(METADATA)
+    pdf_bytes = doc.tobytes(no_new_id=True)
+    doc.close()
+    return pdf_bytes
@@ -1,14 +1,33 @@
 from fastapi import FastAPI, Request, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware  # Missing import
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any  # Added Dict and Any
-from utils.splitter import semantic_split
-from utils.llm_chain import generate_response
-import requests
-import fitz
+from typing import List, Dict, Any, Optional  # Added Dict and Any
+from utils.llm_chain import answer_question, answer_questions, answer_question_lexical, get_model, encode_texts, \
+    question_type
+from utils.model_registry import model_registry
+from utils.batcher import EmbeddingBatcher
+from utils.ingest import build_document, PartialDocument
+from utils.pdf_extract import count_pages
+from utils.jobs import IngestionJob, JobManager
+from utils.workers import worker_pools
+from utils.downloader import document_downloader, DocumentTooLargeError
+from utils.document_store import DocumentStore, DocumentArtifacts, hash_document
+from utils.vector_index import EMBEDDING_PRECISION
+from utils.notebook_store import NotebookNotFoundError, create_notebook_store
+from utils.resident_set import ResidentSet
+from utils.answer_cache import AnswerCache
+from utils.query_log import QueryLogRecorder, annotate
+from utils.summarizer import SummaryCache, summarize
+from utils.metrics import (STAGE_SAMPLE_RATE, end_trace, render_metrics, request_seconds, requests_total, stage,
+                           start_trace)
 import asyncio
+import numpy as np
 import json  # Added json import
 import uuid  # Added uuid import
+import os
+import random
+import time
 from datetime import datetime  # Added datetime import
 
 app = FastAPI()
@@ -19,10 +38,136 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["Server-Timing"],
 )
 
-# In-memory storage for notebooks (in production, use a database)
-notebooks_storage = {}
+# Requests carrying this header get their stage breakdown back in a Server-Timing header
+TRACE_HEADER = "X-RAG-Trace"
+
+# Notebook API requests are appended here for benchmarks.replay when set
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "")
+query_log = QueryLogRecorder(QUERY_LOG_PATH) if QUERY_LOG_PATH else None
+
+def observe_request(endpoint, status, started):
+    request_seconds.observe(endpoint, seconds=time.perf_counter() - started)
+    requests_total.inc(endpoint, str(status))
+
+async def timed_body(body, endpoint, status, started):
+    """Pass a response body through, observing the request once its last byte is sent"""
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        observe_request(endpoint, status, started)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Time every request by endpoint, to the end of its body, and its pipeline stages when sampled or traced.
+    Server-Timing goes out with the headers, so for the /stream endpoints it only covers stages before the first event.
+    """
+    traced = request.headers.get(TRACE_HEADER, "").lower() in ("1", "true")
+    trace, token = start_trace(sampled=traced or random.random() < STAGE_SAMPLE_RATE)
+    log_token = query_log.begin() if query_log is not None else None
+    started = time.perf_counter()
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        end_trace(token)
+        # Route templates rather than raw paths keep the label set bounded
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        if response is None:
+            observe_request(endpoint, status, started)
+        if log_token is not None:
+            query_log.finish(log_token, request.method, getattr(route, "path", None),
+                             request.scope.get("path_params", {}), status, time.perf_counter() - started)
+    if traced:
+        response.headers["Server-Timing"] = trace.server_timing()
+    # Streamed answers take most of their time after the headers
+    response.body_iterator = timed_body(response.body_iterator, endpoint, status, started)
+    return response
+
+# Concurrent question encodes share one model call
+embedding_batcher = EmbeddingBatcher(
+    encode_texts,
+    max_batch_size=int(os.getenv("EMBED_MAX_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+)
+
+# "hybrid" ranks chunks by embeddings plus BM25, "dense" by embeddings only, "lexical" by BM25 only (no model)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Answer lexically rather than queue behind this many pending encodes (0 never does)
+EMBED_DEGRADE_QUEUE_DEPTH = int(os.getenv("EMBED_DEGRADE_QUEUE_DEPTH", "0"))
+retrieval_stats = {"mode": RETRIEVAL_MODE, "lexical_answers": 0, "degraded_answers": 0}
+
+# Answers by document hash: exact normalized question first, then a near-identical question embedding
+# of the same question type, as that decides how the answer is formatted
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_ENTRIES", "4096")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+    question_type=question_type
+)
+
+def cacheable(answer: str) -> bool:
+    return not answer.startswith("Error processing question")
+
+@app.on_event("startup")
+async def warm_models():
+    """Load the embedding model once at startup so the first query doesn't pay for it"""
+    worker_pools.start()
+    embedding_batcher.executor = worker_pools.embedding_pool
+    if os.getenv("WARM_MODELS_ON_STARTUP", "1") != "1" or RETRIEVAL_MODE == "lexical":
+        return
+    try:
+        await worker_pools.run_embedding(get_model)
+    except Exception as e:
+        print(f"Error warming models: {e}")
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await embedding_batcher.close()
+    await document_downloader.close()
+    worker_pools.shutdown()
+    if query_log is not None:
+        query_log.close()
+
+# Durable notebook storage (metadata, Q&A log, chunks and embeddings), shared by every worker on the host
+notebook_store = create_notebook_store(
+    os.getenv("NOTEBOOK_STORE", "sqlite"),
+    os.getenv("NOTEBOOK_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "notebooks.db"))
+)
+
+# Extracted text, chunks and embeddings shared by every notebook built from the same PDF
+document_store = DocumentStore(max_unreferenced=int(os.getenv("DOCUMENT_CACHE_UNREFERENCED", "16")))
+
+def release_notebook(notebook):
+    """Drop the document reference a resident notebook holds; notebook_store keeps the durable copy"""
+    if "document" in notebook:
+        document_store.release(notebook["document_hash"], park=False)
+
+# Notebooks loaded into memory, within a byte budget; the rest are reloaded from notebook_store when queried
+resident_notebooks = ResidentSet(
+    max_bytes=int(os.getenv("NOTEBOOK_MEMORY_BYTES", str(1024 * 1024 * 1024))),
+    on_evict=release_notebook
+)
+
+# Background ingestion for create-notebook?background=true
+job_manager = JobManager(max_concurrent=int(os.getenv("INGEST_CONCURRENCY", "2")))
+INGEST_WAIT_TIMEOUT = float(os.getenv("INGEST_WAIT_TIMEOUT", "60"))
+
+# Extractive summaries for /hackrx/get-summary by (document hash, sentences), with their audio on disk
+SUMMARY_SENTENCES = int(os.getenv("SUMMARY_SENTENCES", "8"))
+SUMMARY_MAX_SENTENCES = 50
+summary_cache = SummaryCache(max_entries=int(os.getenv("SUMMARY_CACHE_ENTRIES", "256")))
+# Audio needs the optional gTTS package (and network access); summaries are returned without it otherwise
+SUMMARY_AUDIO = os.getenv("SUMMARY_AUDIO", "1") == "1"
+SUMMARY_AUDIO_DIR = os.getenv("SUMMARY_AUDIO_DIR",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "summaries"))
 
 class QueryRequest(BaseModel):
     documents: str
@@ -35,6 +180,7 @@ class FileQueryRequest(BaseModel):
 class NotebookQueryRequest(BaseModel):
     notebook_id: str
     question: str  # Changed from questions: List[str] to question: str
+    wait: bool = False  # For notebooks still ingesting: wait for completion instead of using indexed chunks
 
 class NotebookResponse(BaseModel):
     notebook_id: str
@@ -43,6 +189,13 @@ class NotebookResponse(BaseModel):
     questions_answers: List[Dict[str, str]]
     created_at: str
     pdf_filename: str
+    status: str = "ready"
+    job_id: Optional[str] = None
+
+class SummaryRequest(BaseModel):
+    notebook_id: str
+    notebook_content: Optional[Any] = None  # Sent by the clients; the stored document is summarized instead
+    sentences: int = SUMMARY_SENTENCES
 
 # Updated response model for single question
 class NotebookAnswerResponse(BaseModel):
@@ -52,11 +205,317 @@ class NotebookAnswerResponse(BaseModel):
     question_id: int
     total_questions: int
     updated_at: str
+    notebook_status: str = "ready"
+
+def is_embedded(chunks, embeddings) -> bool:
+    """Whether chunks have their embeddings; documents ingested in lexical mode have none"""
+    return embeddings is not None and len(embeddings) >= len(chunks)
+
+def search_index(document):
+    """The document's vector index, or None for documents without embeddings"""
+    if document is None or not is_embedded(document.chunks, document.embeddings):
+        return None
+    return document.vector_index
+
+def embeddings_overloaded() -> bool:
+    """Whether the embedding queue is deep enough that queries should answer from BM25 instead"""
+    return EMBED_DEGRADE_QUEUE_DEPTH > 0 and embedding_batcher.queue_depth >= EMBED_DEGRADE_QUEUE_DEPTH
+
+async def answer_lexically(questions, chunks, sentence_index, lexical_index, degraded=False):
+    """Answer from the BM25 index alone; runs off the embedding pool, which may be the bottleneck"""
+    retrieval_stats["degraded_answers" if degraded else "lexical_answers"] += len(questions)
+    return await asyncio.to_thread(
+        lambda: [answer_question_lexical(question, chunks, lexical_index, sentence_index) for question in questions]
+    )
+
+# Helper function to answer one question against a document's chunks
+async def answer_question_async(question, chunks, chunk_embeddings=None, sentence_index=None, vector_index=None,
+                                lexical_index=None, document_hash=None):
+    """
+    Encode the question through the batcher, then retrieve and refine on the embedding pool.
+    With a document_hash, answers are looked up in and added to answer_cache.
+    """
+    question = question.strip()
+    started = time.perf_counter()
+    lexical_only = RETRIEVAL_MODE == "lexical" or not is_embedded(chunks, chunk_embeddings)
+    lexical = lexical_index is not None and (lexical_only or embeddings_overloaded())
+    if document_hash is not None:
+        # Lexical answers never reach the semantic tier, so a miss here is the only one counted
+        cached = answer_cache.get_exact(document_hash, question, count_miss=lexical)
+        if cached is not None:
+            return cached
+    if lexical:
+        answers = await answer_lexically([question], chunks, sentence_index, lexical_index,
+                                         degraded=not lexical_only)
+        return answers[0]
+    try:
+        with stage("question_encoding"):
+            question_embedding = await embedding_batcher.encode(question)
+    except Exception as e:
+        if lexical_index is None:
+            raise
+        print(f"Error encoding question, answering lexically: {e}")
+        answers = await answer_lexically([question], chunks, sentence_index, lexical_index, degraded=True)
+        return answers[0]
+    if document_hash is not None:
+        cached = answer_cache.get_similar(document_hash, question, question_embedding,
+                                          time.perf_counter() - started)
+        if cached is not None:
+            return cached
+    answer = await worker_pools.run_embedding(
+        answer_question, question, chunks, chunk_embeddings, sentence_index, question_embedding, vector_index,
+        lexical_index if RETRIEVAL_MODE == "hybrid" else None
+    )
+    if document_hash is not None and cacheable(answer):
+        answer_cache.put(document_hash, question, answer, question_embedding, time.perf_counter() - started)
+    return answer
+
+async def answer_questions_async(questions, document: DocumentArtifacts):
+    """
+    Answer all of a request's questions as one batch on the embedding pool.
+    Questions answer_cache already holds, exactly or semantically, are not recomputed.
+    """
+    questions = [question.strip() for question in questions]
+    lexical_only = RETRIEVAL_MODE == "lexical" or not is_embedded(document.chunks, document.embeddings)
+    lexical = lexical_only or embeddings_overloaded()
+    answers = [answer_cache.get_exact(document.document_hash, question, count_miss=lexical) for question in questions]
+    missing = [row for row, answer in enumerate(answers) if answer is None]
+    if not missing:
+        return answers
+
+    async def fill_lexically(rows, degraded):
+        computed = await answer_lexically([questions[row] for row in rows], document.chunks,
+                                          document.sentence_index, document.lexical_index, degraded=degraded)
+        for row, answer in zip(rows, computed):
+            answers[row] = answer
+        return answers
 
-# Helper function to process chunks with LLM
-async def process_chunk_with_llm_async(prompt, chunks):
-    """Process a single chunk with LLM asynchronously"""
-    return generate_response(prompt, chunks)
+    if lexical:
+        return await fill_lexically(missing, degraded=not lexical_only)
+    try:
+        started = time.perf_counter()
+        with stage("question_encoding"):
+            embeddings = await embedding_batcher.encode_many([questions[row] for row in missing])
+        encode_s = (time.perf_counter() - started) / len(missing)
+        pending = []
+        for row, question_embedding in zip(missing, embeddings):
+            answers[row] = answer_cache.get_similar(document.document_hash, questions[row], question_embedding,
+                                                   encode_s)
+            if answers[row] is None:
+                pending.append(row)
+        if not pending:
+            return answers
+
+        started = time.perf_counter()
+        pending_embeddings = embeddings[[missing.index(row) for row in pending]]
+        computed = await worker_pools.run_embedding(
+            answer_questions, [questions[row] for row in pending], document.chunks, document.embeddings,
+            document.sentence_index, question_embeddings=pending_embeddings,
+            vector_index=document.vector_index,
+            lexical_index=document.lexical_index if RETRIEVAL_MODE == "hybrid" else None
+        )
+        latency_s = encode_s + (time.perf_counter() - started) / len(pending)
+        for row, question_embedding, answer in zip(pending, pending_embeddings, computed):
+            answers[row] = answer
+            if cacheable(answer):
+                answer_cache.put(document.document_hash, questions[row], answer, question_embedding, latency_s)
+        return answers
+    except Exception as e:
+        print(f"Error answering with embeddings, answering lexically: {e}")
+        return await fill_lexically([row for row, answer in enumerate(answers) if answer is None], degraded=True)
+
+def load_stored_document(document_hash):
+    """
+    Load a persisted document with its search indexes built. Blocking: run it in a
+    thread, as BM25 over a large document takes a fraction of a second and an IVF
+    index about a second.
+    """
+    document = notebook_store.load_document(document_hash)
+    if document is not None:
+        document.lexical_index
+        search_index(document)
+    return document
+
+async def load_document(pdf_bytes, document_hash=None, partial=None, on_progress=None) -> DocumentArtifacts:
+    """Return the artifacts for a PDF, reusing them when the same bytes were seen before"""
+    if document_hash is None:
+        document_hash = await asyncio.to_thread(hash_document, pdf_bytes)
+
+    async def build():
+        # A document some notebook already persisted is loaded instead of re-ingested
+        stored = await asyncio.to_thread(load_stored_document, document_hash)
+        if stored is not None:
+            return stored
+        # Pages are extracted on the process pool and embedded on the embedding pool as they stream in
+        return await worker_pools.run_ingest(
+            build_document, pdf_bytes, document_hash,
+            worker_pools.process_pool, worker_pools.embedding_pool,
+            on_progress=on_progress, partial=partial, embed_slots=worker_pools.ingest_embedding_slots,
+            embed=RETRIEVAL_MODE != "lexical"
+        )
+
+    return await document_store.get_or_build(document_hash, build)
+
+async def persist_document(document: DocumentArtifacts):
+    """
+    Save a document to notebook_store. With quantized search the in-memory float32
+    embeddings are then swapped for the stored, memory-mapped copy, which is only
+    read for the rows a query re-scores.
+    """
+    await asyncio.to_thread(notebook_store.save_document, document)
+    if EMBEDDING_PRECISION != "float32" and not isinstance(document.embeddings, np.memmap):
+        stored = await asyncio.to_thread(notebook_store.load_embeddings, document.document_hash)
+        if stored is not None and stored.shape == document.embeddings.shape:
+            document.use_stored_embeddings(stored)
+
+def attach_document(notebook, document: DocumentArtifacts):
+    """Point a notebook at a document's shared artifacts and take a reference to them"""
+    notebook.update({
+        "content": document.text,
+        "document_hash": document.document_hash,
+        "chunks": document.chunks,  # Spans into content; a chunk is sliced only when read
+        "chunk_pages": document.pages,  # Page each chunk starts on
+        "embeddings": document.embeddings,  # Normalized float32 matrix, one row per chunk
+        "sentence_index": document.sentence_index,  # Sentence embeddings filled in lazily
+        "document": document,
+    })
+    document_store.acquire(document)
+
+async def get_resident_notebook(notebook_id):
+    """
+    Return a notebook with its chunks and embeddings in memory, loading it from
+    notebook_store on a cache miss. Notebooks that aren't ready (e.g. ingesting
+    in another worker) are returned as bare metadata and not cached.
+    """
+    notebook = resident_notebooks.get(notebook_id)
+    if notebook is not None:
+        return notebook
+
+    notebook = await asyncio.to_thread(notebook_store.get_notebook, notebook_id)
+    if notebook is None or notebook["status"] != "ready" or not notebook["document_hash"]:
+        return notebook
+
+    document = document_store.get(notebook["document_hash"])
+    if document is None:
+        document = await asyncio.to_thread(load_stored_document, notebook["document_hash"])
+        if document is None:
+            raise HTTPException(status_code=500, detail="Notebook document is missing from storage")
+        document = document_store.add(document)
+    attach_document(notebook, document)
+    resident_notebooks.put(notebook_id, notebook, document.nbytes(), share_key=document.document_hash)
+    return notebook
+
+async def ingest_notebook(job: IngestionJob, notebook, pdf_bytes, document_hash):
+    """Background job body: build the notebook's document, publishing chunks as they are indexed"""
+    try:
+        document = await load_document(pdf_bytes, document_hash, notebook["partial"], job.update_progress)
+        if not document.text.strip():
+            raise ValueError("No text could be extracted from the PDF")
+        job.update_progress(job.pages_total or job.pages_processed, len(document.chunks))
+
+        # The notebook may have been deleted while it was ingesting
+        if resident_notebooks.peek(notebook["notebook_id"]) is notebook:
+            await persist_document(document)
+            await asyncio.to_thread(notebook_store.update_notebook, notebook["notebook_id"],
+                                    status="ready", document_hash=document.document_hash)
+            attach_document(notebook, document)
+            notebook["status"] = "ready"
+            resident_notebooks.put(notebook["notebook_id"], notebook, document.nbytes(),
+                                   share_key=document.document_hash)
+    except Exception:
+        notebook["status"] = "failed"
+        await asyncio.to_thread(notebook_store.update_notebook, notebook["notebook_id"], status="failed")
+        raise
+    finally:
+        notebook.pop("partial", None)
+        resident_notebooks.unpin(notebook["notebook_id"])
+
+# Streaming run and run-file: Server-Sent Events, or one JSON object per line
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+def format_event(event: str, data: Dict[str, Any], stream_format: str) -> str:
+    if stream_format == "ndjson":
+        return json.dumps({"event": event, **data}) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def answer_events(fetch_pdf, questions: List[str]):
+    """
+    Yield (event, data) pairs for a streaming run: progress while the PDF is
+    fetched and ingested, then one "answer" per question, tagged with its index,
+    as soon as it is ready, and finally "done" (or "error").
+
+    Questions are answered one by one rather than as a batch, so the first
+    answer only waits for its own retrieval; their encodes still share model
+    calls through the batcher.
+    """
+    loop = asyncio.get_running_loop()
+    progress = asyncio.Queue()
+    tasks = []
+    try:
+        yield "progress", {"stage": "fetching"}
+        try:
+            pdf_bytes = await fetch_pdf()
+        except Exception as e:
+            yield "error", {"detail": f"Error downloading document: {e}"}
+            return
+        pages_total = await asyncio.to_thread(count_pages, pdf_bytes)
+        yield "progress", {"stage": "ingesting", "pages_total": pages_total, "pages_processed": 0,
+                           "chunks_indexed": 0}
+
+        def on_progress(pages_processed, chunks_indexed):
+            loop.call_soon_threadsafe(progress.put_nowait, (pages_processed, chunks_indexed))
+
+        # Not cancelled if the client goes away: other requests may share the build
+        loading = asyncio.ensure_future(load_document(pdf_bytes, on_progress=on_progress))
+        while not loading.done():
+            update = asyncio.ensure_future(progress.get())
+            await asyncio.wait([loading, update], return_when=asyncio.FIRST_COMPLETED)
+            if not update.done():
+                update.cancel()
+                continue
+            # Only the latest of several queued updates is worth sending
+            pages_processed, chunks_indexed = update.result()
+            while not progress.empty():
+                pages_processed, chunks_indexed = progress.get_nowait()
+            yield "progress", {"stage": "ingesting", "pages_total": pages_total,
+                               "pages_processed": pages_processed, "chunks_indexed": chunks_indexed}
+        document = loading.result()
+        if not document.text.strip():
+            yield "error", {"detail": "No text could be extracted from the PDF"}
+            return
+        yield "progress", {"stage": "answering", "pages_total": pages_total, "chunks": len(document.chunks),
+                           "questions": len(questions)}
+
+        async def answer(index, question):
+            return index, await answer_question_async(
+                question, document.chunks, document.embeddings, document.sentence_index, search_index(document),
+                document.lexical_index, document.document_hash
+            )
+
+        tasks = [asyncio.ensure_future(answer(index, question)) for index, question in enumerate(questions)]
+        for next_answer in asyncio.as_completed(tasks):
+            index, answer_text = await next_answer
+            yield "answer", {"index": index, "question": questions[index], "answer": answer_text}
+        yield "done", {"answers": len(questions)}
+    except Exception as e:
+        yield "error", {"detail": f"Error processing document: {e}"}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def stream_answers(fetch_pdf, questions: List[str], stream_format: str) -> StreamingResponse:
+    async def body():
+        async for event, data in answer_events(fetch_pdf, questions):
+            yield format_event(event, data, stream_format)
+
+    # No-buffering header so proxies such as nginx pass events straight through
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[stream_format],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def check_stream_format(stream_format: str):
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown stream format {stream_format!r}; expected sse or ndjson")
 
 @app.post("/hackrx/run")
 async def run_rag(request: Request, body: QueryRequest):
@@ -65,44 +524,25 @@ async def run_rag(request: Request, body: QueryRequest):
     #     raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        response = requests.get(body.documents)
-        response.raise_for_status()
-        pdf_bytes = response.content
+        with stage("document_download"):
+            pdf_bytes = await document_downloader.fetch(body.documents)
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"Error downloading document: {e}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error downloading document: {e}")
 
-    pdf_text = ""
-    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-        for page in doc:
-            pdf_text += page.get_text()
-
-    chunks = semantic_split(pdf_text)
-    full_context = " ".join(chunks)
+    document = await load_document(pdf_bytes)
 
-    # Prepare prompts and pass document chunks
-    prompts_and_chunks = [
-        (f"Based on the following document, answer the question:\n\nDocument:\n{full_context}\n\nQuestion:\n{q}", chunks)
-        for q in body.questions
-    ]
-
-    # Create tasks with chunks
-    responses = [await process_chunk_with_llm_async(prompt, chunks) for prompt, chunks in prompts_and_chunks]
+    # One encode for all questions and one similarity matrix for the whole batch
+    responses = await answer_questions_async(body.questions, document)
 
     # Return only the list of answers
     return {
         "answers": responses,
     }
 
-@app.post("/hackrx/run-file")
-async def run_rag_with_file(
-    request: Request,
-    file: UploadFile = File(...),
-    questions: str = None  # We'll parse this as JSON
-):
-    # token = request.headers.get("Authorization", "")
-    # if token != "Bearer 2d42fd7d38f866414d839e960974157a2da00333865223973f728105760fe343":
-    #     raise HTTPException(status_code=401, detail="Unauthorized")
-
+async def read_file_request(file: UploadFile, questions: Optional[str]):
+    """Read and validate a run-file upload and its JSON list of questions"""
     try:
         # Read the uploaded file
         pdf_bytes = await file.read()
@@ -127,27 +567,29 @@ async def run_rag_with_file(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing file: {e}")
 
-    try:
-        # Extract text from PDF
-        pdf_text = ""
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-            for page in doc:
-                pdf_text += page.get_text()
+    return pdf_bytes, questions_list
 
-        if not pdf_text.strip():
-            raise HTTPException(status_code=400, detail="No text could be extracted from the PDF")
+@app.post("/hackrx/run-file")
+async def run_rag_with_file(
+    request: Request,
+    file: UploadFile = File(...),
+    questions: str = None  # We'll parse this as JSON
+):
+    # token = request.headers.get("Authorization", "")
+    # if token != "Bearer 2d42fd7d38f866414d839e960974157a2da00333865223973f728105760fe343":
+    #     raise HTTPException(status_code=401, detail="Unauthorized")
 
-        chunks = semantic_split(pdf_text)
-        full_context = " ".join(chunks)
+    pdf_bytes, questions_list = await read_file_request(file, questions)
 
-        # Prepare prompts and pass document chunks
-        prompts_and_chunks = [
-            (f"Based on the following document, answer the question:\n\nDocument:\n{full_context}\n\nQuestion:\n{q}", chunks)
-            for q in questions_list
-        ]
+    try:
+        # Reuses cached extraction, chunks and embeddings for PDFs seen before
+        document = await load_document(pdf_bytes)
+
+        if not document.text.strip():
+            raise HTTPException(status_code=400, detail="No text could be extracted from the PDF")
 
-        # Create tasks with chunks
-        responses = [await process_chunk_with_llm_async(prompt, chunks) for prompt, chunks in prompts_and_chunks]
+        # One encode for all questions and one similarity matrix for the whole batch
+        responses = await answer_questions_async(questions_list, document)
 
         # Return only the list of answers
         return {
@@ -157,10 +599,43 @@ async def run_rag_with_file(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing document: {e}")
 
+@app.post("/hackrx/run/stream")
+async def run_rag_stream(request: Request, body: QueryRequest, format: str = "sse"):
+    """
+    Streaming /hackrx/run: progress events while the document is downloaded and
+    ingested, then each answer as soon as it is ready (see answer_events).
+    format is "sse" (text/event-stream) or "ndjson".
+    """
+    check_stream_format(format)
+
+    async def fetch_pdf():
+        with stage("document_download"):
+            return await document_downloader.fetch(body.documents)
+
+    return stream_answers(fetch_pdf, body.questions, format)
+
+@app.post("/hackrx/run-file/stream")
+async def run_rag_with_file_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    questions: str = None,  # JSON list, as for /hackrx/run-file
+    format: str = "sse"
+):
+    """Streaming /hackrx/run-file; events as for /hackrx/run/stream"""
+    check_stream_format(format)
+    # The upload is read before the response starts; the form is closed once the endpoint returns
+    pdf_bytes, questions_list = await read_file_request(file, questions)
+
+    async def fetch_pdf():
+        return pdf_bytes
+
+    return stream_answers(fetch_pdf, questions_list, format)
+
 @app.post("/hackrx/create-notebook", response_model=NotebookResponse)
 async def create_notebook(
     request: Request,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    background: bool = False
 ):
     """
     Create a new notebook from PDF
@@ -169,41 +644,47 @@ async def create_notebook(
     2. Extracts text from PDF
     3. Creates a notebook with PDF content and space for future Q&A
     4. Returns the notebook ID and initial info
+
+    With background=true it returns right away with a job ID; ingestion runs in
+    the background and its progress is available from /hackrx/jobs/{job_id}.
     """
     try:
         # Read and validate PDF
         pdf_bytes = await file.read()
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
+        annotate(bytes=len(pdf_bytes), background=background)
 
-        # Extract text from PDF
-        pdf_text = ""
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-            for page in doc:
-                pdf_text += page.get_text()
+        if background:
+            return await create_notebook_in_background(pdf_bytes, file.filename)
+
+        # Extract, chunk and embed once per distinct PDF; repeats attach to the cached artifacts
+        document = await load_document(pdf_bytes)
+        pdf_text = document.text
 
         if not pdf_text.strip():
             raise HTTPException(status_code=400, detail="No text could be extracted from the PDF")
 
-        # Create chunks for future use
-        chunks = semantic_split(pdf_text)
-
         # Create notebook
         notebook_id = str(uuid.uuid4())
         notebook_title = f"Notebook from {file.filename}"
+        annotate(nb=notebook_id, hash=document.document_hash[:16],
+                 pages=max(document.pages) if len(document.pages) else 0)
 
-        # Store notebook with empty Q&A array
+        # Store notebook; its Q&A log starts empty
         notebook = {
             "notebook_id": notebook_id,
             "title": notebook_title,
-            "content": pdf_text,
-            "chunks": chunks,  # Store chunks for future queries
-            "questions_answers": [],  # Empty array for future Q&A
+            "status": "ready",
+            "document_hash": document.document_hash,
             "created_at": datetime.now().isoformat(),
             "pdf_filename": file.filename
         }
 
-        notebooks_storage[notebook_id] = notebook
+        await persist_document(document)
+        await asyncio.to_thread(notebook_store.create_notebook, notebook)
+        attach_document(notebook, document)
+        resident_notebooks.put(notebook_id, notebook, document.nbytes(), share_key=document.document_hash)
 
         return NotebookResponse(
             notebook_id=notebook_id,
@@ -219,6 +700,55 @@ async def create_notebook(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating notebook: {e}")
 
+async def create_notebook_in_background(pdf_bytes, filename):
+    """Register an ingesting notebook and start its ingestion job"""
+    document_hash = await asyncio.to_thread(hash_document, pdf_bytes)
+    try:
+        pages_total = await asyncio.to_thread(count_pages, pdf_bytes)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid PDF: {e}")
+
+    notebook_id = str(uuid.uuid4())
+    annotate(nb=notebook_id, hash=document_hash[:16], pages=pages_total)
+    partial = PartialDocument()
+    job = IngestionJob(notebook_id, pages_total=pages_total)
+    notebook = {
+        "notebook_id": notebook_id,
+        "title": f"Notebook from {filename}",
+        "status": "ingesting",
+        "job_id": job.job_id,
+        "content": "",
+        "chunks": partial.chunks,  # Grows as batches are indexed
+        "chunk_pages": partial.pages,
+        "sentence_index": partial.sentence_index,
+        "partial": partial,
+        "created_at": datetime.now().isoformat(),
+        "pdf_filename": filename
+    }
+    await asyncio.to_thread(notebook_store.create_notebook, notebook)
+    # Pinned: the partial document only exists in this process until ingestion completes
+    resident_notebooks.put(notebook_id, notebook, 0, pinned=True)
+    job_manager.submit(job, lambda job: ingest_notebook(job, notebook, pdf_bytes, document_hash))
+
+    return NotebookResponse(
+        notebook_id=notebook_id,
+        title=notebook["title"],
+        content="",
+        questions_answers=[],
+        created_at=notebook["created_at"],
+        pdf_filename=filename,
+        status="ingesting",
+        job_id=job.job_id
+    )
+
+@app.get("/hackrx/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the state and progress of a background ingestion job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 @app.post("/hackrx/query-notebook", response_model=NotebookAnswerResponse)
 async def query_notebook(request: Request, body: NotebookQueryRequest):
     """
@@ -231,63 +761,56 @@ async def query_notebook(request: Request, body: NotebookQueryRequest):
     4. Updates the notebook with the new Q&A pair
     5. Returns the answer along with updated notebook info
     """
+    annotate(nb=body.notebook_id, q=body.question)
     try:
-        # Debug logging
-        print(f"Received request for notebook_id: {body.notebook_id}")
-        print(f"Question: {body.question}")
-        print(f"Available notebooks: {list(notebooks_storage.keys())}")
-
-        # Check if notebook exists - Fixed the condition
-        if body.notebook_id not in notebooks_storage:
-            raise HTTPException(status_code=404, detail=f"Notebook not found. Available notebooks: {list(notebooks_storage.keys())}")
+        # Retrieve notebook from backend storage, loading it into memory if needed
+        notebook = await get_resident_notebook(body.notebook_id)
+        if notebook is None:
+            raise HTTPException(status_code=404, detail="Notebook not found")
 
-        # Retrieve notebook from backend storage
-        notebook = notebooks_storage[body.notebook_id]
-        print(f"Notebook retrieved: {notebook['title']}")
+        # Notebooks still ingesting either wait or answer from the chunks indexed so far
+        if notebook.get("status") == "ingesting" and body.wait:
+            job = job_manager.get(notebook.get("job_id", ""))
+            if job is not None and not await job.wait(INGEST_WAIT_TIMEOUT):
+                raise HTTPException(status_code=409, detail="Notebook is still being ingested")
+        if notebook.get("status") == "failed":
+            raise HTTPException(status_code=409, detail="Notebook ingestion failed")
 
         # Use stored chunks for processing (retrieved from backend)
-        chunks = notebook["chunks"]
-        full_context = " ".join(chunks)
-        
-        print(f"Full context length: {len(full_context)}")
-        print(f"Processing question: {body.question}")
-
-        # Process the single question using existing RAG logic
-        prompt = f"""Answer the following question using ONLY the provided document content. 
-Be direct and concise. Do not include phrases like 'Based on the document' or 'The document states'.
-For 'what is' questions: Give a clear, single-sentence definition.
-For 'list' or 'what are' questions: Provide a comma-separated list.
-For questions asking for X lines/points: Limit the answer to exactly that many points.
-For 'who' questions: State only the relevant person/organization.
-Remove any section numbers, titles, or notes markers.
-
-Question:
-{body.question}"""
-        
-        # Generate response with context
-        answer = generate_response(prompt, chunks)
-        print(f"Generated:{answer}")
+        partial = notebook.get("partial")
+        document = notebook.get("document")
+        lexical_index = document.lexical_index if document is not None else None
+        if notebook.get("status") == "ingesting":
+            # Chunks indexed so far are only visible to the worker running the ingestion
+            chunks, embeddings = partial.snapshot() if partial is not None else ([], None)
+            if partial is not None and not is_embedded(chunks, embeddings):
+                # Lexical mode: BM25 over the chunks so far, extended by those added since the last query
+                chunks, lexical_index = await asyncio.to_thread(partial.lexical_snapshot)
+            if not chunks:
+                raise HTTPException(status_code=409, detail="Notebook is still being ingested; no chunks are indexed yet")
+        else:
+            chunks, embeddings = notebook["chunks"], notebook.get("embeddings")
+        notebook_status = notebook.get("status", "ready")
 
-        # Create Q&A pair with unique ID
-        current_time = datetime.now().isoformat()
-        question_id = len(notebook.get("questions_answers", [])) + 1
-        
-        qa_pair = {
-            "question": body.question,
-            "answer": answer,
-            "question_id": question_id,
-            "created_at": current_time
-        }
-
-        # Ensure questions_answers exists in notebook
-        if "questions_answers" not in notebook:
-            notebook["questions_answers"] = []
-
-        # Update the notebook with the new Q&A pair
-        notebook["questions_answers"].append(qa_pair)
-        notebooks_storage[body.notebook_id] = notebook
+        # Answer from the bare question; the document never goes into a prompt
+        # Large ready notebooks are searched through their approximate index; ready ones also have BM25
+        answer = await answer_question_async(body.question, chunks, embeddings, notebook.get("sentence_index"),
+                                             search_index(document), lexical_index,
+                                             document.document_hash if document is not None else None)
+        if "document" in notebook:
+            # Refinement may have cached more sentence embeddings
+            resident_notebooks.resize(body.notebook_id, notebook["document"].nbytes())
 
-        print(f"Updated notebook with Q&A pair. Total questions: {len(notebook['questions_answers'])}")
+        # Append the Q&A pair to the notebook's log; the store assigns its ID
+        current_time = datetime.now().isoformat()
+        try:
+            question_id, total_questions = await asyncio.to_thread(
+                notebook_store.add_answer, body.notebook_id, body.question, answer, current_time
+            )
+        except NotebookNotFoundError:
+            # Deleted by another worker while still resident here
+            resident_notebooks.pop(body.notebook_id)
+            raise HTTPException(status_code=404, detail="Notebook not found")
 
         # Prepare response
         return NotebookAnswerResponse(
@@ -295,8 +818,9 @@ Question:
             question=body.question,
             answer=answer,
             question_id=question_id,
-            total_questions=len(notebook["questions_answers"]),
-            updated_at=current_time
+            total_questions=total_questions,
+            updated_at=current_time,
+            notebook_status=notebook_status
         )
 
     except HTTPException:
@@ -310,13 +834,14 @@ async def list_notebooks():
     """Get list of all notebooks"""
     try:
         notebook_list = []
-        for notebook_id, notebook in notebooks_storage.items():
+        for notebook in await asyncio.to_thread(notebook_store.list_notebooks):
             notebook_list.append({
-                "notebook_id": notebook_id,
+                "notebook_id": notebook["notebook_id"],
                 "title": notebook["title"],
                 "created_at": notebook["created_at"],
                 "pdf_filename": notebook["pdf_filename"],
-                "questions_count": len(notebook.get("questions_answers", []))
+                "questions_count": notebook["questions_count"],
+                "status": notebook["status"]
             })
         
         print(f"Returning {len(notebook_list)} notebooks")
@@ -329,19 +854,23 @@ async def list_notebooks():
 async def get_notebook(notebook_id: str):
     """Get a specific notebook by ID"""
     try:
-        if notebook_id not in notebooks_storage:
+        notebook = await get_resident_notebook(notebook_id)
+        if notebook is None:
             raise HTTPException(status_code=404, detail="Notebook not found")
 
-        notebook = notebooks_storage[notebook_id]
+        questions_answers = await asyncio.to_thread(notebook_store.get_answers, notebook_id)
         return {
             "notebook_id": notebook_id,
             "title": notebook["title"],
-            "content": notebook["content"],
-            "chunks": notebook["chunks"],
-            "questions_answers": notebook.get("questions_answers", []),
+            "content": notebook.get("content", ""),
+            "chunks": list(notebook.get("chunks", [])),
+            "chunk_pages": list(notebook.get("chunk_pages", [])),
+            "questions_answers": questions_answers,
             "created_at": notebook["created_at"],
             "pdf_filename": notebook["pdf_filename"],
-            "total_questions": len(notebook.get("questions_answers", []))
+            "total_questions": len(questions_answers),
+            "status": notebook.get("status", "ready"),
+            "job_id": notebook.get("job_id")
         }
     except HTTPException:
         raise
@@ -352,17 +881,18 @@ async def get_notebook(notebook_id: str):
 async def get_notebook_questions(notebook_id: str):
     """Get all questions and answers for a specific notebook"""
     try:
-        if notebook_id not in notebooks_storage:
+        notebook = await asyncio.to_thread(notebook_store.get_notebook, notebook_id)
+        if notebook is None:
             raise HTTPException(status_code=404, detail="Notebook not found")
         
-        notebook = notebooks_storage[notebook_id]
+        questions_answers = await asyncio.to_thread(notebook_store.get_answers, notebook_id)
         
         return {
             "notebook_id": notebook_id,
             "title": notebook["title"],
             "pdf_filename": notebook["pdf_filename"],
-            "questions_answers": notebook.get("questions_answers", []),
-            "total_questions": len(notebook.get("questions_answers", [])),
+            "questions_answers": questions_answers,
+            "total_questions": len(questions_answers),
             "created_at": notebook["created_at"]
         }
         
@@ -375,37 +905,147 @@ async def get_notebook_questions(notebook_id: str):
 async def delete_notebook(notebook_id: str):
     """Delete a notebook"""
     try:
-        if notebook_id not in notebooks_storage:
+        notebook = await asyncio.to_thread(notebook_store.get_notebook, notebook_id)
+        if notebook is None or not await asyncio.to_thread(notebook_store.delete_notebook, notebook_id):
             raise HTTPException(status_code=404, detail="Notebook not found")
+        if notebook.get("document_hash"):
+            # Notebooks sharing the document just recompute their answers
+            answer_cache.invalidate(notebook["document_hash"])
 
-        del notebooks_storage[notebook_id]
+        # Releases the notebook's document reference if it was resident
+        resident_notebooks.pop(notebook_id)
         return {"message": "Notebook deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting notebook: {str(e)}")
 
+def synthesize_summary_audio(text: str, path: str) -> bool:
+    """Write text as speech to an MP3 at path with gTTS; False if gTTS is missing or fails"""
+    if os.path.exists(path):
+        return True
+    try:
+        from gtts import gTTS
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = path + ".part"
+        gTTS(text=text, lang="en").save(partial_path)
+        os.replace(partial_path, path)
+        return True
+    except Exception as e:
+        print(f"Error generating summary audio: {e}")
+        return False
+
+@app.post("/hackrx/get-summary")
+async def get_summary(request: Request, body: SummaryRequest):
+    """
+    Extractive summary of a notebook's document, with an audio version when available.
+
+    Sentences are picked from the chunk embeddings the notebook already has
+    (centroid plus MMR; see utils/summarizer.py), so no model is called.
+    Summaries are cached per document and length; a repeat request only reads
+    the notebook's metadata.
+    """
+    if not 1 <= body.sentences <= SUMMARY_MAX_SENTENCES:
+        raise HTTPException(status_code=400, detail=f"sentences must be between 1 and {SUMMARY_MAX_SENTENCES}")
+    try:
+        notebook = resident_notebooks.get(body.notebook_id)
+        if notebook is None:
+            notebook = await asyncio.to_thread(notebook_store.get_notebook, body.notebook_id)
+        if notebook is None:
+            raise HTTPException(status_code=404, detail="Notebook not found")
+        if notebook.get("status") == "ingesting":
+            raise HTTPException(status_code=409, detail="Notebook is still being ingested")
+        if notebook.get("status") == "failed" or not notebook.get("document_hash"):
+            raise HTTPException(status_code=409, detail="Notebook ingestion failed")
+
+        document_hash = notebook["document_hash"]
+        cached = summary_cache.get(document_hash, body.sentences)
+        if cached is None:
+            if "document" not in notebook:
+                notebook = await get_resident_notebook(body.notebook_id)
+            document = notebook["document"]
+            with stage("summarization"):
+                sentences = await asyncio.to_thread(summarize, document.chunks, document.embeddings,
+                                                    document.sentence_index, document.pages, body.sentences)
+            summary = " ".join(sentence["text"] for sentence in sentences)
+            audio_name = f"{document_hash}-{body.sentences}"
+            has_audio = SUMMARY_AUDIO and summary and await asyncio.to_thread(
+                synthesize_summary_audio, summary, os.path.join(SUMMARY_AUDIO_DIR, audio_name + ".mp3"))
+            cached = {"summary": summary, "sentences": sentences, "audio_name": audio_name if has_audio else None}
+            summary_cache.put(document_hash, body.sentences, cached)
+
+        audio_name = cached["audio_name"]
+        return {
+            "notebook_id": body.notebook_id,
+            "summary": cached["summary"],
+            "sentences": cached["sentences"],
+            "audioUrl": str(request.url_for("get_summary_audio", summary_id=audio_name)) if audio_name else None,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating summary: {e}")
+
+@app.get("/hackrx/summaries/{summary_id}.mp3")
+async def get_summary_audio(summary_id: str):
+    """Audio of a summary generated by /hackrx/get-summary"""
+    path = os.path.join(SUMMARY_AUDIO_DIR, summary_id + ".mp3")
+    # Names are "<document hash>-<sentences>"; anything else (e.g. a path) is refused
+    hash_part, _, count = summary_id.partition("-")
+    if len(hash_part) != 64 or not all(c in "0123456789abcdef" for c in hash_part) or not count.isdigit() \
+            or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Summary audio not found")
+    return FileResponse(path, media_type="audio/mpeg")
+
 @app.get("/")
 async def root():
     return {"message": "RAG API with Notebook functionality is running"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "notebooks_count": len(notebooks_storage)}
+    return {
+        "status": "healthy",
+        "notebooks_count": await asyncio.to_thread(notebook_store.count_notebooks),
+        "resident_notebooks": resident_notebooks.stats(),
+        "models": model_registry.stats(),
+        "embedding_batcher": embedding_batcher.metrics(),
+        "retrieval": retrieval_stats,
+        "answer_cache": answer_cache.stats(),
+        "summary_cache": summary_cache.stats(),
+        "document_downloads": document_downloader.stats(),
+        "document_store": document_store.stats(),
+        "ingestion_jobs": job_manager.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request and stage latency histograms plus the numeric /health counters, for Prometheus"""
+    return PlainTextResponse(render_metrics({
+        "rag_resident_notebooks": resident_notebooks.stats(),
+        "rag_embedding_batcher": embedding_batcher.metrics(),
+        "rag_retrieval": retrieval_stats,
+        "rag_answer_cache": answer_cache.stats(),
+        "rag_summary_cache": summary_cache.stats(),
+        "rag_document_store": document_store.stats(),
+        "rag_ingestion_jobs": job_manager.stats(),
+    }), media_type="text/plain; version=0.0.4")
 
 # Debug endpoint to check notebooks storage
 @app.get("/hackrx/debug/notebooks")
 async def debug_notebooks():
     """Debug endpoint to see all notebooks in storage"""
+    notebooks = await asyncio.to_thread(notebook_store.list_notebooks)
     return {
-        "notebooks_storage": {k: {
-            "notebook_id": v.get("notebook_id"),
-            "title": v.get("title"),
-            "pdf_filename": v.get("pdf_filename"),
-            "questions_count": len(v.get("questions_answers", [])),
-            "created_at": v.get("created_at")
-        } for k, v in notebooks_storage.items()},
-        "total_notebooks": len(notebooks_storage)
+        "notebooks_storage": {v["notebook_id"]: {
+            "notebook_id": v["notebook_id"],
+            "title": v["title"],
+            "pdf_filename": v["pdf_filename"],
+            "questions_count": v["questions_count"],
+            "created_at": v["created_at"]
+        } for v in notebooks},
+        "total_notebooks": len(notebooks)
     }
 
 if __name__ == "__main__":
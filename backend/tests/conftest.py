@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Tests import main and utils the way the server does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep notebooks in memory, PDF extraction in-process and the model unloaded until a test needs it
+os.environ.setdefault("NOTEBOOK_STORE", "memory")
+os.environ.setdefault("WARM_MODELS_ON_STARTUP", "0")
+os.environ.setdefault("PDF_WORKERS", "0")
+os.environ.setdefault("SUMMARY_AUDIO", "0")
@@ -0,0 +1,40 @@
+# tests/test_answer_cache.py
+
+import numpy as np
+
+from utils.answer_cache import AnswerCache
+from utils.llm_chain import question_type
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_semantic_tier_keeps_question_types_apart():
+    cache = AnswerCache(similarity_threshold=0.9, question_type=question_type)
+    cache.put("doc", "What is the waiting period?", "Thirty days.", unit(1, 0))
+
+    assert cache.get_similar("doc", "How is the waiting period applied?", unit(1, 0)) is None
+    assert cache.get_similar("doc", "What is the waiting-period?", unit(1, 0.01)) == "Thirty days."
+
+
+def test_expired_entries_do_not_shadow_live_ones():
+    clock = FakeClock()
+    cache = AnswerCache(ttl_seconds=10, similarity_threshold=0.9, clock=clock)
+    cache.put("doc", "grace period", "stale", unit(1, 0))
+    clock.now = 5
+    cache.put("doc", "the grace period", "fresh", unit(1, 0.2))
+    clock.now = 12
+
+    # The expired entry is the closer match but must not win the argmax
+    assert cache.get_similar("doc", "grace period length", unit(1, 0)) == "fresh"
+    assert cache.stats()["expirations"] == 1
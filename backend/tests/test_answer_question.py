@@ -0,0 +1,90 @@
+# tests/test_answer_question.py
+
+import pytest
+
+from benchmarks.stub_model import StubEmbeddingModel
+from benchmarks.synthetic import make_pdf
+from utils.ingest import build_document
+from utils.llm_chain import MODEL_NAME, answer_question, answer_questions, embed_chunks, encode_texts, generate_response
+from utils.model_registry import model_registry
+from utils.sentence_index import SentenceIndex
+
+CHUNKS = [
+    "The grace period is thirty days. Premiums are paid monthly. Late payment voids cover.",
+    "Claims are filed within ninety days. Hospital bills must be attached to the claim.",
+    "Maternity cover starts after two years. Newborns are covered from birth.",
+]
+QUESTIONS = [
+    "What is the waiting period for hospital treatment?",
+    "List the benefits covered by the policy.",
+    "How is a claim processed?",
+    "What does the clause say about the premium?",
+    "How is a claim processed?",
+]
+
+
+class RecordingModel(StubEmbeddingModel):
+    """The stub model, remembering every text it encodes"""
+
+    def __init__(self):
+        super().__init__()
+        self.encoded = []
+
+    def encode(self, sentences, **kwargs):
+        self.encoded.extend([sentences] if isinstance(sentences, str) else sentences)
+        return super().encode(sentences, **kwargs)
+
+
+@pytest.fixture
+def model():
+    model = RecordingModel()
+    model_registry.unload(MODEL_NAME)
+    model_registry.register(MODEL_NAME, model)
+    yield model
+    model_registry.unload(MODEL_NAME)
+
+
+def test_answer_comes_from_the_relevant_chunk(model):
+    embeddings = embed_chunks(CHUNKS)
+    answer = answer_question("How many days do I have to file claims?", CHUNKS, embeddings, SentenceIndex(CHUNKS))
+    assert "ninety days" in answer
+    assert "thirty" not in answer and "Maternity" not in answer
+
+
+def test_only_the_question_and_chunk_sentences_are_encoded(model):
+    embeddings = embed_chunks(CHUNKS)
+    model.encoded.clear()
+    question = "When does maternity cover start?"
+    answer = answer_question(question, CHUNKS, embeddings, SentenceIndex(CHUNKS))
+
+    assert "two years" in answer
+    assert question in model.encoded
+    assert all(len(text) <= max(map(len, CHUNKS)) for text in model.encoded)
+
+    # The old callers' prompts reduce to the same bare question
+    prompt = f"Document:\n{' '.join(CHUNKS)}\n\nQuestion:\n{question}"
+    assert generate_response(prompt, CHUNKS, embeddings, SentenceIndex(CHUNKS)) == answer
+
+
+@pytest.mark.parametrize("hybrid", [False, True])
+def test_batch_answers_match_one_at_a_time(model, hybrid):
+    document = build_document(make_pdf(6, seed=121), "batch-121")
+    args = (document.chunks, document.embeddings, document.sentence_index)
+    lexical_index = document.lexical_index if hybrid else None
+
+    expected = [answer_question(question, *args, lexical_index=lexical_index) for question in QUESTIONS]
+    model.encoded.clear()
+    assert answer_questions(QUESTIONS, *args, lexical_index=lexical_index) == expected
+    # Only the questions are encoded; sentences were cached by the single-question pass
+    assert sorted(model.encoded) == sorted(QUESTIONS)
+
+
+def test_batch_reuses_given_question_embeddings(model):
+    embeddings = embed_chunks(CHUNKS)
+    questions = ["When are premiums paid?", "When does maternity cover start?"]
+    question_embeddings = encode_texts(questions)
+    model.encoded.clear()
+
+    answers = answer_questions(questions, CHUNKS, embeddings, SentenceIndex(CHUNKS), question_embeddings)
+    assert "monthly" in answers[0] and "two years" in answers[1]
+    assert not set(questions) & set(model.encoded)
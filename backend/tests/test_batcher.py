@@ -0,0 +1,55 @@
+# tests/test_batcher.py
+
+import asyncio
+import numpy as np
+
+from benchmarks.stub_model import StubEmbeddingModel
+from utils.batcher import EmbeddingBatcher
+
+MODEL = StubEmbeddingModel()
+
+
+def encode(texts):
+    return MODEL.encode(texts, normalize_embeddings=True)
+
+
+def test_concurrent_encodes_share_one_model_call():
+    calls = []
+
+    def recording_encode(texts):
+        calls.append(list(texts))
+        return encode(texts)
+
+    async def run():
+        batcher = EmbeddingBatcher(recording_encode, max_batch_size=32, max_wait_ms=50)
+        try:
+            texts = [f"question number {idx}" for idx in range(10)]
+            rows = await asyncio.gather(*(batcher.encode(text) for text in texts))
+            return texts, rows, batcher.metrics()
+        finally:
+            await batcher.close()
+
+    texts, rows, metrics = asyncio.run(run())
+    assert calls == [texts]
+    # Each caller gets back its own row
+    np.testing.assert_allclose(np.stack(rows), encode(texts))
+    assert metrics["batches"] == 1 and metrics["texts"] == 10 and metrics["batch_size_histogram"]["16"] == 1
+
+
+def test_batches_are_capped_and_errors_reach_every_caller():
+    sizes = []
+
+    def failing_encode(texts):
+        sizes.append(len(texts))
+        raise RuntimeError("model failed")
+
+    async def run():
+        batcher = EmbeddingBatcher(failing_encode, max_batch_size=4, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(batcher.encode(str(idx)) for idx in range(10)), return_exceptions=True)
+        finally:
+            await batcher.close()
+
+    results = asyncio.run(run())
+    assert sizes == [4, 4, 2]
+    assert all(isinstance(result, RuntimeError) for result in results)
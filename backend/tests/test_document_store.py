@@ -0,0 +1,52 @@
+# tests/test_document_store.py
+
+import asyncio
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.document_store import DocumentStore, hash_document
+
+
+def test_concurrent_requests_share_one_build():
+    builds = []
+
+    async def build():
+        builds.append(1)
+        await asyncio.sleep(0.05)
+        return "artifacts"
+
+    async def run():
+        store = DocumentStore()
+        store.add = lambda artifacts: artifacts  # Strings stand in for DocumentArtifacts here
+        return store, await asyncio.gather(*(store.get_or_build("doc", build) for _ in range(5)))
+
+    store, results = asyncio.run(run())
+    assert builds == [1] and results == ["artifacts"] * 5
+    assert store.misses == 1 and store.hits == 4
+
+
+def test_notebooks_share_a_document_until_the_last_is_deleted():
+    install_stub_model()
+    pdf = make_pdf(2, seed=61)
+    document_hash = hash_document(pdf)
+    with TestClient(main.app) as client:
+        misses = main.document_store.misses
+        notebook_ids = []
+        for _ in range(2):
+            created = client.post("/hackrx/create-notebook", files={"file": ("shared.pdf", pdf, "application/pdf")})
+            assert created.status_code == 200, created.text
+            notebook_ids.append(created.json()["notebook_id"])
+
+        document = main.document_store.get(document_hash)
+        assert main.document_store.misses == misses + 1
+        assert document.refcount == 2
+
+        assert client.delete(f"/hackrx/notebooks/{notebook_ids[0]}").status_code == 200
+        assert document.refcount == 1 and main.document_store.get(document_hash) is document
+
+        assert client.delete(f"/hackrx/notebooks/{notebook_ids[1]}").status_code == 200
+        assert document.refcount == 0
+        # Unreferenced, and dropped rather than parked: notebook_store holds the durable copy
+        assert main.document_store.get(document_hash) is None
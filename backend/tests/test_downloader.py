@@ -0,0 +1,88 @@
+# tests/test_downloader.py
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.downloader import DocumentDownloader, DocumentDownloadError
+
+PDF = make_pdf(2, seed=23)
+ETAG = '"replay-23"'
+
+
+class PdfHandler(BaseHTTPRequestHandler):
+    """Serves the PDF with an ETag at /doc.pdf, without Content-Length at /streamed.pdf; /stuck.pdf is always 304"""
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == ETAG or self.path == "/stuck.pdf":
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("ETag", ETAG)
+        if self.path == "/doc.pdf":
+            self.send_header("Content-Length", str(len(PDF)))
+        self.end_headers()
+        self.wfile.write(PDF)  # HTTP/1.0: without Content-Length the body ends when the connection closes
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def pdf_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PdfHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    PdfHandler.requests = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    install_stub_model()
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_unchanged_document_is_served_from_cache(client, pdf_server):
+    url = f"{pdf_server}/doc.pdf"
+    hits = main.document_downloader.hits
+    for _ in range(2):
+        response = client.post("/hackrx/run", json={"documents": url, "questions": ["What is the premium?"]})
+        assert response.status_code == 200, response.text
+
+    assert PdfHandler.requests == [("/doc.pdf", None), ("/doc.pdf", ETAG)]
+    assert main.document_downloader.hits == hits + 1
+
+
+@pytest.mark.parametrize("path", ["/doc.pdf", "/streamed.pdf"])
+def test_document_over_size_cap_is_rejected(client, pdf_server, monkeypatch, path):
+    monkeypatch.setattr(main.document_downloader, "max_bytes", len(PDF) - 1)
+    # A URL not fetched before, so the body isn't already cached under a validator
+    response = client.post("/hackrx/run", json={"documents": f"{pdf_server}{path}?cap", "questions": ["Anything?"]})
+    assert response.status_code == 413, response.text
+
+
+async def fetch(url):
+    downloader = DocumentDownloader()
+    try:
+        return await downloader.fetch(url)
+    finally:
+        await downloader.close()
+
+
+def test_304_without_cached_body_is_retried_once(pdf_server):
+    with pytest.raises(DocumentDownloadError):
+        asyncio.run(fetch(f"{pdf_server}/stuck.pdf"))
+    assert PdfHandler.requests == [("/stuck.pdf", None), ("/stuck.pdf", None)]
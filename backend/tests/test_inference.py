@@ -0,0 +1,48 @@
+# tests/test_inference.py
+
+import numpy as np
+import pytest
+
+from benchmarks.stub_model import StubEmbeddingModel
+from utils.inference import encode_length_sorted, estimate_tokens, load_sentence_transformer
+
+
+class BatchRecordingModel(StubEmbeddingModel):
+    """The stub model, remembering the texts of every call"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def encode(self, sentences, **kwargs):
+        self.batches.append(list(sentences))
+        return super().encode(sentences, **kwargs)
+
+
+def test_rows_come_back_in_input_order():
+    texts = [" ".join(["policy"] * length) + f" {n}" for n, length in enumerate([3, 200, 1, 50, 120, 7, 3])]
+    model = BatchRecordingModel()
+    embeddings = encode_length_sorted(model, texts, batch_size=3, batch_tokens=10_000)
+
+    assert embeddings.dtype == np.float32
+    np.testing.assert_allclose(embeddings, StubEmbeddingModel().encode(texts, normalize_embeddings=True))
+    assert [len(batch) for batch in model.batches] == [3, 3, 1]
+    assert model.batches[0][0] == texts[1]
+
+
+def test_batches_are_capped_by_padded_tokens():
+    texts = ["claim " * 400] * 4 + ["short"] * 40
+    model = BatchRecordingModel()
+    encode_length_sorted(model, texts, batch_size=32, batch_tokens=1024)
+
+    for batch in model.batches:
+        assert len(batch) * min(estimate_tokens(batch[0]), model.max_seq_length) <= 1024 or len(batch) == 1
+        assert [estimate_tokens(text) for text in batch] == sorted(map(estimate_tokens, batch), reverse=True)
+    assert sum(map(len, model.batches)) == len(texts)
+    assert [len(batch) for batch in model.batches[:2]] == [2, 2]
+
+
+def test_empty_input_and_unknown_backend():
+    assert encode_length_sorted(BatchRecordingModel(), []).shape == (0, 0)
+    with pytest.raises(ValueError):
+        load_sentence_transformer("unused", backend="tensorrt")
@@ -0,0 +1,104 @@
+# tests/test_jobs.py
+
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.jobs import COMPLETED, FAILED, QUEUED, RUNNING, IngestionJob, JobManager
+
+
+@pytest.fixture
+def held_ingestion(monkeypatch):
+    """A client whose background ingestions wait on the returned event before they build anything"""
+    install_stub_model()
+    release = threading.Event()
+    load_document = main.load_document
+
+    async def held(*args, **kwargs):
+        await asyncio.to_thread(release.wait)
+        return await load_document(*args, **kwargs)
+
+    monkeypatch.setattr(main, "load_document", held)
+    with TestClient(main.app) as client:
+        yield client, release
+        release.set()
+
+
+def create_in_background(client, pdf):
+    created = client.post("/hackrx/create-notebook", params={"background": True},
+                          files={"file": ("job.pdf", pdf, "application/pdf")})
+    assert created.status_code == 200, created.text
+    assert created.json()["status"] == "ingesting"
+    return created.json()
+
+
+def wait_for_job(client, job_id):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        job = client.get(f"/hackrx/jobs/{job_id}").json()
+        if job["state"] in (COMPLETED, FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("ingestion job did not finish")
+
+
+def test_query_before_any_chunks_is_a_conflict(held_ingestion, monkeypatch):
+    client, release = held_ingestion
+    created = create_in_background(client, make_pdf(3, seed=101))
+    query = {"notebook_id": created["notebook_id"], "question": "What is covered?"}
+
+    assert client.post("/hackrx/query-notebook", json=query).status_code == 409
+    monkeypatch.setattr(main, "INGEST_WAIT_TIMEOUT", 0.05)
+    waited = client.post("/hackrx/query-notebook", json={**query, "wait": True})
+    assert waited.status_code == 409
+    assert client.get(f"/hackrx/jobs/{created['job_id']}").json()["state"] == RUNNING
+
+    release.set()
+    assert wait_for_job(client, created["job_id"])["state"] == COMPLETED
+    answered = client.post("/hackrx/query-notebook", json=query)
+    assert answered.status_code == 200, answered.text
+
+
+def test_notebook_deleted_while_ingesting_stays_deleted(held_ingestion):
+    client, release = held_ingestion
+    created = create_in_background(client, make_pdf(3, seed=102))
+    notebook_id = created["notebook_id"]
+
+    assert client.delete(f"/hackrx/notebooks/{notebook_id}").status_code == 200
+    release.set()
+    assert wait_for_job(client, created["job_id"])["state"] == COMPLETED
+
+    assert main.notebook_store.get_notebook(notebook_id) is None
+    assert main.resident_notebooks.peek(notebook_id) is None
+    gone = client.post("/hackrx/query-notebook", json={"notebook_id": notebook_id, "question": "Anything?"})
+    assert gone.status_code == 404
+
+
+def test_jobs_beyond_the_cap_queue_and_failures_are_recorded():
+    async def run():
+        manager = JobManager(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def held(job):
+            await release.wait()
+
+        async def broken(job):
+            raise ValueError("unreadable PDF")
+
+        first = manager.submit(IngestionJob("a"), held)
+        second = manager.submit(IngestionJob("b"), broken)
+        await asyncio.sleep(0.01)
+        assert (first.state, second.state) == (RUNNING, QUEUED)
+
+        release.set()
+        assert await second.wait(5)
+        assert (first.state, second.state) == (COMPLETED, FAILED)
+        assert second.error == "unreadable PDF"
+        assert manager.stats() == {QUEUED: 0, RUNNING: 0, COMPLETED: 1, FAILED: 1}
+
+    asyncio.run(run())
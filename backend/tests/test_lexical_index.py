@@ -0,0 +1,42 @@
+# tests/test_lexical_index.py
+
+import numpy as np
+
+from utils.ingest import PartialDocument
+from utils.lexical_index import BM25Index
+
+CHUNKS = [
+    "The grace period for premium payment is thirty days.",
+    "Claims under section 4.2 must be filed within ninety days of discharge.",
+    "Maternity benefits are covered after a waiting period of two years.",
+    "Pre-existing diseases are excluded for the first thirty-six months.",
+    "Room rent is capped at one percent of the sum insured per day.",
+    "Claims for hospital treatment abroad are not covered.",
+]
+QUERIES = ["grace period premium", "section 4.2 claims", "hospital claims abroad", "waiting period"]
+
+
+def test_extended_index_scores_like_a_rebuilt_one():
+    extended = BM25Index(CHUNKS[:2]).extended([]).extended(CHUNKS[2:5]).extended(CHUNKS[5:])
+    rebuilt = BM25Index(CHUNKS)
+    assert len(extended) == len(CHUNKS)
+    for query in QUERIES:
+        np.testing.assert_allclose(extended.scores(query), rebuilt.scores(query), rtol=1e-6)
+
+
+def test_partial_document_extends_its_index_across_queries():
+    partial = PartialDocument()
+    no_embeddings = np.zeros((0, 0), dtype=np.float32)
+    partial.add(CHUNKS[:3], [1, 1, 1], no_embeddings)
+    chunks, first = partial.lexical_snapshot()
+    assert chunks == CHUNKS[:3] and len(first) == 3
+
+    # Nothing added since: the same index is reused
+    assert partial.lexical_snapshot()[1] is first
+
+    partial.add(CHUNKS[3:], [2, 2, 2], no_embeddings)
+    chunks, second = partial.lexical_snapshot()
+    assert chunks == CHUNKS and len(second) == len(CHUNKS)
+    # The earlier index is left as it was, for searches still using it
+    assert len(first) == 3 and len(first.scores("claims")) == 3
+    np.testing.assert_allclose(second.scores("claims abroad"), BM25Index(CHUNKS).scores("claims abroad"), rtol=1e-6)
@@ -0,0 +1,60 @@
+# tests/test_lexical_mode.py
+
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.synthetic import make_pdf
+from utils import llm_chain
+from utils.document_store import hash_document
+from utils.llm_chain import MODEL_NAME
+from utils.model_registry import model_registry
+
+
+@pytest.fixture
+def lexical_client(monkeypatch):
+    """A client for the app in lexical mode, with no model loaded and loading one an error"""
+    def no_model():
+        raise AssertionError("lexical mode loaded the embedding model")
+
+    monkeypatch.setattr(main, "RETRIEVAL_MODE", "lexical")
+    monkeypatch.setattr(llm_chain, "_load_model", no_model)
+    model_registry.unload(MODEL_NAME)
+    with TestClient(main.app) as client:
+        yield client
+    model_registry.unload(MODEL_NAME)
+
+
+def test_notebook_answers_without_model(lexical_client):
+    pdf = make_pdf(3, seed=17)
+    created = lexical_client.post("/hackrx/create-notebook", files={"file": ("lexical.pdf", pdf, "application/pdf")})
+    assert created.status_code == 200, created.text
+    notebook_id = created.json()["notebook_id"]
+
+    document = main.document_store.get(hash_document(pdf))
+    assert len(document.embeddings) == 0
+
+    answered = lexical_client.post("/hackrx/query-notebook", json={"notebook_id": notebook_id,
+                                                                     "question": "What is the policy?"})
+    assert answered.status_code == 200, answered.text
+    assert answered.json()["answer"]
+
+    summary = lexical_client.post("/hackrx/get-summary", json={"notebook_id": notebook_id})
+    assert summary.status_code == 200, summary.text
+    assert summary.json()["sentences"]
+    assert not model_registry.is_loaded(MODEL_NAME)
+
+
+def test_run_file_answers_without_model(lexical_client):
+    misses = main.answer_cache.misses
+    response = lexical_client.post(
+        "/hackrx/run-file",
+        files={"file": ("lexical.pdf", make_pdf(2, seed=18), "application/pdf")},
+        params={"questions": json.dumps(["What is covered?", "List the exclusions"])}
+    )
+    assert response.status_code == 200, response.text
+    assert len(response.json()["answers"]) == 2
+    # Lexical answers skip the semantic tier, so their exact-tier misses are the ones counted
+    assert main.answer_cache.misses == misses + 2
+    assert not model_registry.is_loaded(MODEL_NAME)
@@ -0,0 +1,63 @@
+# tests/test_metrics.py
+
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.metrics import Histogram, end_trace, stage, stage_seconds, start_trace
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe("a", seconds=seconds)
+
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{stage="a",le="0.1"} 1',
+        'test_seconds_bucket{stage="a",le="1"} 3',
+        'test_seconds_bucket{stage="a",le="+Inf"} 4',
+        'test_seconds_sum{stage="a"} 6.250000',
+        'test_seconds_count{stage="a"} 4',
+    ]
+
+
+def test_stages_are_summed_into_the_trace_only_when_sampled():
+    trace, token = start_trace(sampled=True)
+    try:
+        for _ in range(3):
+            with stage("test_stage"):
+                pass
+    finally:
+        end_trace(token)
+    assert list(trace.stages) == ["test_stage"]
+    assert trace.server_timing().startswith("test_stage;dur=")
+
+    unsampled, token = start_trace(sampled=False)
+    try:
+        with stage("test_unsampled"):
+            pass
+    finally:
+        end_trace(token)
+    assert unsampled.stages == {}
+    assert not any("test_unsampled" in line for line in stage_seconds.render())
+
+
+def test_traced_requests_get_server_timing_and_metrics_count_them():
+    install_stub_model()
+    with TestClient(main.app) as client:
+        created = client.post("/hackrx/create-notebook",
+                              files={"file": ("metrics.pdf", make_pdf(2, seed=131), "application/pdf")})
+        assert created.status_code == 200, created.text
+        query = {"notebook_id": created.json()["notebook_id"], "question": "Which clause covers the premium?"}
+
+        traced = client.post("/hackrx/query-notebook", json=query, headers={main.TRACE_HEADER: "1"})
+        assert traced.status_code == 200, traced.text
+        assert "sentence_refinement;dur=" in traced.headers["Server-Timing"]
+        untraced = client.post("/hackrx/query-notebook", json=query)
+        assert "Server-Timing" not in untraced.headers
+
+        metrics = client.get("/metrics").text
+    assert 'rag_requests_total{endpoint="/hackrx/query-notebook",status="200"}' in metrics
+    assert 'rag_request_duration_seconds_bucket{endpoint="/hackrx/query-notebook",le="+Inf"}' in metrics
+    assert "rag_resident_notebooks_resident_bytes" in metrics
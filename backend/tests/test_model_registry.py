@@ -0,0 +1,37 @@
+# tests/test_model_registry.py
+
+import threading
+import time
+
+from utils.model_registry import ModelRegistry
+
+
+def test_concurrent_callers_share_one_load():
+    registry = ModelRegistry()
+    loads = []
+
+    def loader():
+        loads.append(threading.get_ident())
+        time.sleep(0.05)  # Long enough for every caller to arrive while the load is running
+        return object()
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("model", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(models) == 8 and all(model is models[0] for model in models)
+    assert registry.get("model", loader) is models[0] and len(loads) == 1
+    assert registry.stats()["model"]["load_seconds"] >= 0.05
+
+
+def test_unload_forgets_the_model_and_its_stats():
+    registry = ModelRegistry()
+    first = registry.get("model", object)
+    registry.unload("model")
+
+    assert not registry.is_loaded("model") and "model" not in registry.stats()
+    assert registry.get("model", object) is not first
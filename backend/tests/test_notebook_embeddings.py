@@ -0,0 +1,51 @@
+# tests/test_notebook_embeddings.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import StubEmbeddingModel
+from benchmarks.synthetic import make_pdf
+from utils.document_store import hash_document
+from utils.llm_chain import MODEL_NAME
+from utils.model_registry import model_registry
+
+
+class RecordingModel(StubEmbeddingModel):
+    """The stub model, remembering every text it encodes"""
+
+    def __init__(self):
+        super().__init__()
+        self.encoded = []
+
+    def encode(self, sentences, **kwargs):
+        self.encoded.extend([sentences] if isinstance(sentences, str) else sentences)
+        return super().encode(sentences, **kwargs)
+
+
+@pytest.fixture
+def model():
+    model = RecordingModel()
+    model_registry.unload(MODEL_NAME)
+    model_registry.register(MODEL_NAME, model)
+    yield model
+    model_registry.unload(MODEL_NAME)
+
+
+def test_chunks_are_embedded_once_at_creation(model):
+    pdf = make_pdf(3, seed=41)
+    with TestClient(main.app) as client:
+        created = client.post("/hackrx/create-notebook", files={"file": ("embed.pdf", pdf, "application/pdf")})
+        assert created.status_code == 200, created.text
+        chunks = set(main.document_store.get(hash_document(pdf)).chunks)
+        assert chunks <= set(model.encoded)
+
+        model.encoded.clear()
+        for question in ("What is the premium?", "Which clause applies?"):
+            answered = client.post("/hackrx/query-notebook",
+                                   json={"notebook_id": created.json()["notebook_id"], "question": question})
+            assert answered.status_code == 200, answered.text
+
+    # Queries encode their question (and sentences for refinement), never the chunks again
+    assert "What is the premium?" in model.encoded
+    assert not chunks & set(model.encoded)
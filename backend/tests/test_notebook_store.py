@@ -0,0 +1,104 @@
+# tests/test_notebook_store.py
+
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+from utils.chunks import ChunkSpans
+from utils.document_store import DocumentArtifacts
+from utils.notebook_store import NotebookNotFoundError, SQLiteNotebookStore
+from utils.sentence_index import SentenceIndex
+
+TEXT = "First chunk of the document. Second chunk, which overlaps. Third and last chunk."
+
+
+def make_document(document_hash="doc-1"):
+    chunks = ChunkSpans(TEXT)
+    chunks.append(0, 28, 1)
+    chunks.append(20, 58, 1)
+    chunks.append(59, len(TEXT), 2)
+    embeddings = np.eye(3, 4, dtype=np.float32)
+    return DocumentArtifacts(document_hash, TEXT, chunks, embeddings, SentenceIndex(chunks))
+
+
+def make_notebook(notebook_id, document_hash="doc-1"):
+    return {"notebook_id": notebook_id, "title": f"Notebook {notebook_id}", "pdf_filename": "doc.pdf",
+            "created_at": "2024-01-01T00:00:00", "document_hash": document_hash}
+
+
+def chunk_columns(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+
+
+def test_chunks_are_stored_as_offsets_only(tmp_path):
+    db_path = str(tmp_path / "notebooks.db")
+    store = SQLiteNotebookStore(db_path)
+    store.save_document(make_document())
+
+    assert "text" not in chunk_columns(db_path)
+    loaded = store.load_document("doc-1")
+    assert list(loaded.chunks) == list(make_document().chunks)
+    assert [loaded.chunks.span(idx) for idx in range(3)] == [(0, 28, 1), (20, 58, 1), (59, len(TEXT), 2)]
+
+
+def test_chunk_text_column_is_dropped_from_older_databases(tmp_path):
+    db_path = str(tmp_path / "notebooks.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript("""
+            CREATE TABLE documents (document_hash TEXT PRIMARY KEY, text TEXT NOT NULL, chunk_count INTEGER NOT NULL);
+            CREATE TABLE chunks (
+                document_hash TEXT NOT NULL REFERENCES documents (document_hash) ON DELETE CASCADE,
+                chunk_index INTEGER NOT NULL, start_offset INTEGER NOT NULL, end_offset INTEGER NOT NULL,
+                page INTEGER, text TEXT NOT NULL, PRIMARY KEY (document_hash, chunk_index)
+            );
+        """)
+
+    store = SQLiteNotebookStore(db_path)
+    assert "text" not in chunk_columns(db_path)
+    store.save_document(make_document())
+    assert list(store.load_document("doc-1").chunks) == list(make_document().chunks)
+
+
+def test_a_new_store_on_the_same_database_sees_everything(tmp_path):
+    db_path = str(tmp_path / "notebooks.db")
+    store = SQLiteNotebookStore(db_path)
+    store.save_document(make_document())
+    store.create_notebook(make_notebook("nb-1"))
+    store.add_answer("nb-1", "What is first?", "The first chunk.", "2024-01-01T00:01:00")
+
+    reopened = SQLiteNotebookStore(db_path)
+    assert reopened.get_notebook("nb-1")["document_hash"] == "doc-1"
+    assert [qa["question_id"] for qa in reopened.get_answers("nb-1")] == [1]
+    loaded = reopened.load_document("doc-1")
+    assert loaded.text == TEXT
+    assert np.array_equal(loaded.embeddings, make_document().embeddings)
+
+
+def test_answers_are_numbered_once_across_stores(tmp_path):
+    db_path = str(tmp_path / "notebooks.db")
+    stores = [SQLiteNotebookStore(db_path), SQLiteNotebookStore(db_path)]
+    stores[0].create_notebook(make_notebook("nb-1", document_hash=None))
+
+    with ThreadPoolExecutor(8) as executor:
+        ids = list(executor.map(lambda n: stores[n % 2].add_answer("nb-1", f"q{n}", "a", "now")[0], range(40)))
+    assert sorted(ids) == list(range(1, 41))
+
+
+def test_last_notebook_deleted_removes_its_document(tmp_path):
+    db_path = str(tmp_path / "notebooks.db")
+    store = SQLiteNotebookStore(db_path)
+    store.save_document(make_document())
+    store.create_notebook(make_notebook("nb-1"))
+    store.create_notebook(make_notebook("nb-2"))
+
+    assert store.delete_notebook("nb-1")
+    assert store.load_document("doc-1") is not None
+    assert store.delete_notebook("nb-2")
+    assert store.load_document("doc-1") is None
+    assert not os.path.exists(store._embeddings_path("doc-1"))
+    assert not store.delete_notebook("nb-2")
+    with pytest.raises(NotebookNotFoundError):
+        store.add_answer("nb-2", "Still there?", "No.", "now")
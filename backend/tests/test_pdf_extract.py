@@ -0,0 +1,40 @@
+# tests/test_pdf_extract.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import make_pdf
+from utils.pdf_extract import extract_pdf_text, iter_page_texts
+from utils.splitter import iter_chunk_spans, semantic_split
+
+
+def test_parallel_extraction_yields_pages_in_order():
+    pdf = make_pdf(11, seed=91)
+    inline = list(iter_page_texts(pdf))
+    with ThreadPoolExecutor(4) as executor:
+        parallel = list(iter_page_texts(pdf, executor, pages_per_task=3))
+
+    assert parallel == inline
+    assert [page_no for page_no, _ in parallel] == list(range(1, 12))
+    assert "".join(text for _, text in parallel) == extract_pdf_text(pdf)
+
+
+def test_chunks_stream_before_the_last_page():
+    pdf = make_pdf(40, seed=92)
+    pages_read = []
+
+    def pages():
+        for page_no, text in iter_page_texts(pdf):
+            pages_read.append(page_no)
+            yield page_no, text
+
+    chunks = []
+    read_at_first_chunk = None
+    for chunk, _, _, page in iter_chunk_spans(pages(), 1000, 100):
+        if read_at_first_chunk is None:
+            read_at_first_chunk = len(pages_read)
+        chunks.append((chunk, page))
+
+    assert [chunk for chunk, _ in chunks] == semantic_split(extract_pdf_text(pdf), 1000, 100)
+    assert read_at_first_chunk < 40
+    assert [page for _, page in chunks] == sorted(page for _, page in chunks)
+    assert chunks[0][1] == 1 and chunks[-1][1] == 40
@@ -0,0 +1,63 @@
+# tests/test_replay.py
+
+import asyncio
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.replay import load_log, replay
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.query_log import QueryLogRecorder
+
+
+def record_log(path):
+    """Drive the notebook API through a short session with the query log on; returns the statuses sent"""
+    recorder = QueryLogRecorder(str(path))
+    main.query_log = recorder
+    try:
+        with TestClient(main.app) as client:
+            created = client.post("/hackrx/create-notebook",
+                                  files={"file": ("log.pdf", make_pdf(3, seed=31), "application/pdf")})
+            notebook_id = created.json()["notebook_id"]
+            query = "/hackrx/query-notebook"
+            responses = [
+                created,
+                client.post(query, json={"notebook_id": notebook_id, "question": "What is covered?"}),
+                client.post(query, json={"notebook_id": notebook_id, "question": "List the claims"}),
+                client.get(f"/hackrx/notebooks/{notebook_id}"),
+                client.get("/hackrx/notebooks"),
+                client.get("/hackrx/notebooks/not-a-notebook"),
+                client.delete(f"/hackrx/notebooks/{notebook_id}"),
+            ]
+    finally:
+        main.query_log = None
+        recorder.close()
+    return [response.status_code for response in responses]
+
+
+async def replay_in_process(entries):
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            return await replay(client, entries, speed=100.0, rate=None, concurrency=None)
+
+
+def test_recorded_log_replays_with_same_statuses(tmp_path):
+    install_stub_model()
+    sent = record_log(tmp_path / "queries.log")
+    entries = load_log(str(tmp_path / "queries.log"))
+
+    assert [entry["op"] for entry in entries] == ["create", "query", "query", "get", "list", "get", "delete"]
+    assert [entry["status"] for entry in entries] == sent == [200, 200, 200, 200, 200, 404, 200]
+    assert entries[1]["q"] == "What is covered?" and entries[0]["pages"] == 3
+
+    results = asyncio.run(replay_in_process(entries))
+    operations = results["operations"]
+    assert results["overall"]["requests"] == len(entries)
+    assert results["overall"]["status_mismatches"] == 0
+    assert operations["create"]["statuses"] == {"200": 1}
+    assert operations["query"]["statuses"] == {"200": 2}
+    assert operations["get"]["statuses"] == {"200": 1, "404": 1}
+    assert operations["list"]["statuses"] == {"200": 1}
+    assert operations["delete"]["statuses"] == {"200": 1}
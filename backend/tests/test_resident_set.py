@@ -0,0 +1,67 @@
+# tests/test_resident_set.py
+
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.resident_set import ResidentSet
+
+
+def test_least_recently_used_entries_are_evicted_over_budget():
+    evicted = []
+    resident = ResidentSet(max_bytes=100, on_evict=evicted.append)
+    resident.put("a", "A", 40)
+    resident.put("b", "B", 40)
+    assert resident.get("a") == "A"
+
+    resident.put("c", "C", 40)
+    assert evicted == ["B"]
+    assert resident.peek("b") is None and resident.get("b") is None
+    assert resident.resident_bytes == 80
+    assert resident.stats()["evictions"] == 1
+
+
+def test_shared_and_pinned_entries():
+    evicted = []
+    resident = ResidentSet(max_bytes=100, on_evict=evicted.append)
+    resident.put("a", "A", 60, share_key="doc")
+    resident.put("b", "B", 60, share_key="doc")
+    assert resident.resident_bytes == 60 and evicted == []
+
+    resident.put("pinned", "P", 30, pinned=True)
+    resident.put("big", "G", 500)
+    # Everything unpinned but the newest goes; the newest stays even though it alone is over budget
+    assert sorted(evicted) == ["A", "B"]
+    assert resident.peek("pinned") == "P" and resident.peek("big") == "G"
+    assert resident.resident_bytes == 530
+
+    resident.unpin("pinned")
+    resident.resize("big", 80)
+    assert evicted[-1] == "P"
+    assert resident.resident_bytes == 80
+    assert resident.pop("big") == "G" and evicted[-1] == "G"
+    assert resident.resident_bytes == 0
+
+
+def test_evicted_notebook_is_reloaded_on_query(monkeypatch):
+    install_stub_model()
+    monkeypatch.setattr(main.resident_notebooks, "max_bytes", 1)
+    with TestClient(main.app) as client:
+        notebook_ids = []
+        for seed in (111, 112):
+            created = client.post("/hackrx/create-notebook",
+                                  files={"file": ("resident.pdf", make_pdf(2, seed=seed), "application/pdf")})
+            assert created.status_code == 200, created.text
+            notebook_ids.append(created.json()["notebook_id"])
+
+        first, second = notebook_ids
+        assert main.resident_notebooks.peek(first) is None
+        first_hash = main.notebook_store.get_notebook(first)["document_hash"]
+        assert main.document_store.get(first_hash) is None
+
+        query = {"notebook_id": first, "question": "What is the premium?"}
+        answered = client.post("/hackrx/query-notebook", json=query)
+        assert answered.status_code == 200, answered.text
+        assert main.resident_notebooks.peek(first) is not None
+        assert main.resident_notebooks.peek(second) is None
@@ -0,0 +1,45 @@
+# tests/test_sentence_index.py
+
+import numpy as np
+
+from benchmarks.stub_model import StubEmbeddingModel
+from utils.sentence_index import SentenceIndex
+
+CHUNKS = [
+    "The grace period is thirty days. Premiums are paid monthly. Late payment voids cover.",
+    "Claims are filed within ninety days. Hospital bills must be attached.",
+    "Maternity cover starts after two years.",
+]
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.model = StubEmbeddingModel()
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return self.model.encode(texts, normalize_embeddings=True)
+
+
+def test_sentence_embeddings_are_encoded_once_per_chunk():
+    index = SentenceIndex(CHUNKS)
+    encode = CountingEncoder()
+    question = encode.model.encode("When are premiums paid?", normalize_embeddings=True)
+
+    assert index.top_sentences(0, question, encode, top_n=1) == ["Premiums are paid monthly."]
+    index.top_sentences(0, question, encode, top_n=2)
+    assert encode.calls == [index.sentences(0)]
+    assert index.cached_chunks == 1 and index.nbytes > 0
+
+
+def test_prefetch_encodes_every_missing_chunk_in_one_call():
+    index = SentenceIndex(CHUNKS)
+    encode = CountingEncoder()
+    index.embeddings(1, encode)
+    index.prefetch([0, 1, 2], encode)
+
+    assert len(encode.calls) == 2 and encode.calls[1] == index.sentences(0) + index.sentences(2)
+    for idx in range(3):
+        expected = encode.model.encode(index.sentences(idx), normalize_embeddings=True)
+        np.testing.assert_allclose(index.cached_embeddings(idx), expected)
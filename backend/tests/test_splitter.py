@@ -0,0 +1,74 @@
+# tests/test_splitter.py
+
+import random
+import re
+import pytest
+
+from utils.splitter import iter_chunk_spans, normalize_text, semantic_split
+
+
+def reference_break_point(text, start, end):
+    """find_break_point as it was before the boundary index: backwards character scans"""
+    for i in range(end - 1, start + len(text) // 4, -1):
+        if text[i] in ".!?" and i + 1 < len(text) and text[i + 1].isspace():
+            return i + 1
+    for i in range(end - 1, start + len(text) // 4, -1):
+        if text[i] == "\n":
+            return i + 1
+    for i in range(end - 1, start + len(text) // 2, -1):
+        if text[i] in ";:," and i + 1 < len(text) and text[i + 1].isspace():
+            return i + 1
+    for i in range(end - 1, start + len(text) // 2, -1):
+        if text[i].isspace():
+            return i + 1
+    return -1
+
+
+def reference_split(text, chunk_size, overlap):
+    """semantic_split as it was before the boundary index"""
+    text = re.sub(r"\s+", " ", re.sub(r"\n+", "\n", text)).strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+    chunks, start = [], 0
+    while start < len(text):
+        end = start + chunk_size
+        if end >= len(text):
+            chunks.append(text[start:].strip())
+            break
+        break_point = reference_break_point(text, start, end)
+        if break_point == -1:
+            break_point = end
+        if text[start:break_point].strip():
+            chunks.append(text[start:break_point].strip())
+        start = max(break_point - overlap, start + 1)
+        if start >= break_point:
+            start = break_point
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def random_text(rng, words):
+    pieces = []
+    for _ in range(words):
+        pieces.append(rng.choice(["policy", "claim", "a", "premium", "hospitalization", "x", "4.2"]))
+        pieces.append(rng.choice([" ", " ", " ", ". ", ", ", "; ", "\n", "\n\n", "  ", "! "]))
+    return "".join(pieces)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_split_matches_the_character_scan(seed):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.choice([5, 60, 200, 900]))
+    chunk_size = rng.choice([50, 120, 400])
+    assert semantic_split(text, chunk_size, 20) == reference_split(text, chunk_size, 20)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_streamed_pages_split_like_the_whole_text(seed):
+    rng = random.Random(seed)
+    pages = [(page_no, random_text(rng, rng.randint(0, 80))) for page_no in range(1, rng.randint(2, 12))]
+    chunk_size = rng.choice([40, 120, 400])
+    text = normalize_text("".join(page for _, page in pages))
+
+    streamed = list(iter_chunk_spans(iter(pages), chunk_size, 10))
+    assert [chunk for chunk, _, _, _ in streamed] == semantic_split(text, chunk_size, 10)
+    assert all(text[start:end] == chunk for chunk, start, end, _ in streamed)
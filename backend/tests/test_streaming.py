@@ -0,0 +1,85 @@
+# tests/test_streaming.py
+
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.downloader import DocumentDownloadError
+
+QUESTIONS = ["What is the premium?", "Which clause applies?", "How is a claim processed?"]
+
+
+@pytest.fixture
+def client():
+    install_stub_model()
+    with TestClient(main.app) as client:
+        yield client
+
+
+def parse_sse(text):
+    events = []
+    for frame in text.split("\n\n"):
+        if frame:
+            event_line, data_line = frame.split("\n")
+            assert event_line.startswith("event: ") and data_line.startswith("data: ")
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def parse_ndjson(text):
+    events = []
+    for line in text.splitlines():
+        data = json.loads(line)
+        events.append((data.pop("event"), data))
+    return events
+
+
+def run_file(client, path, pdf, stream_format=None):
+    params = {"questions": json.dumps(QUESTIONS)}
+    if stream_format is not None:
+        params["format"] = stream_format
+    return client.post(path, params=params, files={"file": ("stream.pdf", pdf, "application/pdf")})
+
+
+@pytest.mark.parametrize("stream_format, media_type, parse", [
+    ("sse", "text/event-stream", parse_sse),
+    ("ndjson", "application/x-ndjson", parse_ndjson),
+])
+def test_stream_frames_progress_answers_and_done(client, stream_format, media_type, parse):
+    pdf = make_pdf(3, seed=141)
+    response = run_file(client, "/hackrx/run-file/stream", pdf, stream_format)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith(media_type)
+    events = parse(response.text)
+
+    assert events[0] == ("progress", {"stage": "fetching"})
+    stages = [data["stage"] for event, data in events if event == "progress"]
+    assert stages[1] == "ingesting" and stages[-1] == "answering"
+    assert events[-1] == ("done", {"answers": len(QUESTIONS)})
+
+    answers = {data["index"]: data for event, data in events if event == "answer"}
+    assert sorted(answers) == list(range(len(QUESTIONS)))
+    assert [answers[index]["question"] for index in range(len(QUESTIONS))] == QUESTIONS
+    expected = run_file(client, "/hackrx/run-file", pdf).json()["answers"]
+    assert [answers[index]["answer"] for index in range(len(QUESTIONS))] == expected
+
+
+def test_unknown_format_is_rejected(client):
+    response = run_file(client, "/hackrx/run-file/stream", make_pdf(1, seed=142), "xml")
+    assert response.status_code == 400
+
+
+def test_download_failure_ends_the_stream_with_an_error(client, monkeypatch):
+    async def fail(url):
+        raise DocumentDownloadError("unreachable")
+
+    monkeypatch.setattr(main.document_downloader, "fetch", fail)
+    response = client.post("/hackrx/run/stream", params={"format": "ndjson"},
+                           json={"documents": "http://example.invalid/doc.pdf", "questions": QUESTIONS})
+    assert response.status_code == 200
+    events = parse_ndjson(response.text)
+    assert [event for event, _ in events] == ["progress", "error"]
+    assert "unreachable" in events[-1][1]["detail"]
@@ -0,0 +1,76 @@
+# tests/test_summarizer.py
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.summarizer import SummaryCache, mmr_select
+
+
+def grouped_embeddings():
+    """Three tight groups of rows: a big one and two smaller ones"""
+    rng = np.random.default_rng(7)
+    topics = np.eye(3, 16, dtype=np.float32)
+    rows = np.repeat(topics, [10, 4, 3], axis=0) + 0.01 * rng.standard_normal((17, 16)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_mmr_covers_every_group():
+    embeddings = grouped_embeddings()
+    groups = np.repeat([0, 1, 2], [10, 4, 3])
+
+    picked, centroid = mmr_select(embeddings, 3, diversity=0.5)
+    assert sorted(groups[picked]) == [0, 1, 2]
+    assert np.isclose(np.linalg.norm(centroid), 1.0)
+    # By centrality alone every pick comes from the biggest group
+    central, _ = mmr_select(embeddings, 3, diversity=0.0)
+    assert list(groups[central]) == [0, 0, 0]
+    assert mmr_select(embeddings[:0], 3)[0] == []
+
+
+def test_summary_cache_evicts_least_recently_used():
+    cache = SummaryCache(max_entries=2)
+    cache.put("a", 5, "A")
+    cache.put("b", 5, "B")
+    assert cache.get("a", 5) == "A"
+    cache.put("c", 5, "C")
+
+    assert cache.get("b", 5) is None and cache.get("a", 5) == "A"
+    assert cache.stats() == {"entries": 2, "max_entries": 2, "hits": 2, "misses": 1}
+
+
+def test_repeat_summaries_come_from_the_cache(monkeypatch):
+    install_stub_model()
+    calls = []
+    summarize = main.summarize
+
+    def counting_summarize(*args, **kwargs):
+        calls.append(args)
+        return summarize(*args, **kwargs)
+
+    monkeypatch.setattr(main, "summarize", counting_summarize)
+    pdf = make_pdf(6, seed=151)
+    with TestClient(main.app) as client:
+        notebook_ids = []
+        for _ in range(2):
+            created = client.post("/hackrx/create-notebook", files={"file": ("summary.pdf", pdf, "application/pdf")})
+            assert created.status_code == 200, created.text
+            notebook_ids.append(created.json()["notebook_id"])
+
+        first = client.post("/hackrx/get-summary", json={"notebook_id": notebook_ids[0], "sentences": 4})
+        assert first.status_code == 200, first.text
+        hits = main.summary_cache.hits
+        # Same PDF, so the other notebook shares the summary
+        second = client.post("/hackrx/get-summary", json={"notebook_id": notebook_ids[1], "sentences": 4})
+        too_long = client.post("/hackrx/get-summary", json={"notebook_id": notebook_ids[0], "sentences": 10_000})
+
+    assert len(calls) == 1
+    assert main.summary_cache.hits == hits + 1
+    assert second.json()["sentences"] == first.json()["sentences"]
+    sentences = first.json()["sentences"]
+    assert 1 <= len(sentences) <= 4
+    assert [s["chunk"] for s in sentences] == sorted(s["chunk"] for s in sentences)
+    assert first.json()["summary"] == " ".join(s["text"] for s in sentences)
+    assert too_long.status_code == 400
@@ -0,0 +1,47 @@
+# tests/test_synthetic.py
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import fitz
+
+from benchmarks.suite import compare
+from benchmarks.synthetic import make_pdf
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_same_seed_gives_identical_bytes_across_processes():
+    here = hashlib.sha256(make_pdf(3, seed=1)).hexdigest()
+    # PDF dates have one-second resolution: a later run would stamp a different creation date and file ID
+    time.sleep(1.1)
+    script = ("import hashlib; from benchmarks.synthetic import make_pdf; "
+              "print(hashlib.sha256(make_pdf(3, seed=1)).hexdigest())")
+    other = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                           cwd=BACKEND_DIR).stdout.split()[-1]
+    assert here == other
+    assert make_pdf(3, seed=1) != make_pdf(3, seed=2)
+
+
+def test_pages_follow_the_requested_count():
+    with fitz.open(stream=make_pdf(4, seed=5), filetype="pdf") as doc:
+        assert doc.page_count == 4
+        assert "Section 4." in doc[3].get_text()
+
+
+def test_suite_runs_and_compares_against_itself(tmp_path):
+    output = str(tmp_path / "results.json")
+    subprocess.run([sys.executable, "-m", "benchmarks.suite", "--pages", "2", "--query-pages", "2",
+                    "--queries", "3", "--concurrency", "2", "--output", output],
+                   capture_output=True, check=True, cwd=BACKEND_DIR)
+    with open(output) as f:
+        result = json.load(f)
+
+    assert set(result["results"]) == {"split", "ingest", "retrieval", "http", "memory"}
+    assert result["results"]["ingest"][0]["pages"] == 2
+    changes = compare(result, result)
+    assert "ingest[pages=2].chunks" in changes
+    assert all(row["change"] in (0, None) for row in changes.values())
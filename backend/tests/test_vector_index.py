@@ -0,0 +1,83 @@
+# tests/test_vector_index.py
+
+import numpy as np
+import pytest
+
+from utils.quantization import QuantizedEmbeddings
+from utils.vector_index import (FlatIndex, IVFIndex, QuantizedIndex, VectorIndex, build_vector_index,
+                                top_k_indices)
+
+
+def normalized(rows):
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+def clustered_embeddings(n=4000, dimension=64, clusters=40, seed=0):
+    """Unit vectors around random topics, like chunks of a long document"""
+    rng = np.random.default_rng(seed)
+    topics = normalized(rng.standard_normal((clusters, dimension)))
+    rows = topics[rng.integers(clusters, size=n)] + 0.06 * rng.standard_normal((n, dimension))
+    return normalized(rows), rng
+
+
+def recall(index, exact, queries, k):
+    found = 0
+    for query in queries:
+        found += len(set(index.search(query, k)[0]) & set(exact.search(query, k)[0]))
+    return found / (k * len(queries))
+
+
+def test_top_k_indices_matches_a_stable_sort():
+    scores = np.random.default_rng(1).integers(0, 5, size=200).astype(np.float32)
+    for k in (0, 1, 7, 199, 200, 250):
+        assert np.array_equal(top_k_indices(scores, k), np.argsort(-scores, kind="stable")[:k])
+
+
+def test_ivf_recall_against_exact_search():
+    embeddings, rng = clustered_embeddings()
+    queries = normalized(embeddings[rng.integers(len(embeddings), size=100)]
+                         + 0.03 * rng.standard_normal((100, embeddings.shape[1])))
+    exact = FlatIndex(embeddings)
+
+    assert recall(IVFIndex(embeddings, n_probe=8), exact, queries, 10) >= 0.9
+    assert recall(IVFIndex(embeddings, n_probe=IVFIndex(embeddings).n_lists), exact, queries, 10) == 1.0
+
+
+def test_ivf_finds_each_chunk_itself():
+    embeddings, _ = clustered_embeddings(n=1000, seed=2)
+    index = IVFIndex(embeddings)
+    assert index.nbytes > 0
+    assert all(index.search(embeddings[row], 1)[0][0] == row for row in range(0, 1000, 37))
+
+
+def test_build_vector_index_picks_ivf_for_large_notebooks():
+    embeddings, _ = clustered_embeddings(n=500, seed=3)
+    assert isinstance(build_vector_index(embeddings, ivf_min_chunks=1000, precision="float32"), FlatIndex)
+    assert isinstance(build_vector_index(embeddings, ivf_min_chunks=500, precision="float32"), IVFIndex)
+    with pytest.raises(TypeError):
+        VectorIndex(embeddings)
+
+
+@pytest.mark.parametrize("precision, ratio, tolerance", [("float16", 2, 1e-3), ("int8", 4, 2e-2)])
+def test_quantized_scores_and_size(precision, ratio, tolerance):
+    embeddings, rng = clustered_embeddings(n=2000, seed=4)
+    quantized = QuantizedEmbeddings(embeddings, precision, block_rows=100)
+    query = embeddings[rng.integers(len(embeddings))]
+
+    assert np.abs(quantized.scores(query) - embeddings @ query).max() < tolerance
+    assert quantized.nbytes <= embeddings.nbytes / ratio + 4 * len(embeddings)
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_quantized_index_rescores_to_exact_results(precision):
+    embeddings, rng = clustered_embeddings(n=3000, seed=5)
+    queries = normalized(embeddings[rng.integers(len(embeddings), size=50)]
+                         + 0.03 * rng.standard_normal((50, embeddings.shape[1])))
+    index = build_vector_index(embeddings, ivf_min_chunks=10000, precision=precision)
+    exact = FlatIndex(embeddings)
+
+    assert isinstance(index, QuantizedIndex)
+    assert recall(index, exact, queries, 5) >= 0.98
+    # Re-scored candidates carry their exact float32 scores
+    indices, scores = index.search(queries[0], 5)
+    np.testing.assert_allclose(scores, embeddings[indices] @ queries[0], rtol=1e-6)
@@ -0,0 +1,54 @@
+# tests/test_workers.py
+
+import asyncio
+import time
+
+import main
+from benchmarks.stub_model import install_stub_model
+from benchmarks.synthetic import make_pdf
+from utils.workers import WorkerPools
+
+
+def test_ingestion_leaves_the_event_loop_responsive():
+    install_stub_model()
+    pdf = make_pdf(80, seed=51)
+
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            gaps = []
+
+            async def tick():
+                while True:
+                    started = time.perf_counter()
+                    await asyncio.sleep(0.005)
+                    gaps.append(time.perf_counter() - started)
+
+            ticker = asyncio.create_task(tick())
+            started = time.perf_counter()
+            document = await main.load_document(pdf)
+            elapsed = time.perf_counter() - started
+            ticker.cancel()
+            return document, elapsed, max(gaps)
+
+    document, elapsed, longest_gap = asyncio.run(run())
+    assert len(document.chunks) > 0
+    # Extraction, splitting and embedding ran elsewhere: the loop never stalled for most of the ingestion
+    assert longest_gap < elapsed / 2, (longest_gap, elapsed)
+
+
+def test_queries_keep_an_embedding_thread():
+    pools = WorkerPools(process_workers=0, embedding_workers=1)
+    assert pools.embedding_workers == 2
+    # Ingestion may hold every slot but one
+    assert pools.ingest_embedding_slots.acquire(blocking=False)
+    assert not pools.ingest_embedding_slots.acquire(blocking=False)
+
+
+def test_process_pool_starts_from_a_fork_server():
+    pools = WorkerPools(process_workers=1, embedding_workers=2)
+    try:
+        pools.start()
+        assert pools.process_pool._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert pools.process_pool.submit(sum, [1, 2, 3]).result(timeout=60) == 6
+    finally:
+        pools.shutdown()
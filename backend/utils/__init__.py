@@ -12,11 +12,13 @@ from .llm_chain import (
     generate_response,
     get_model
 )
+from .model_registry import model_registry
 
 __all__ = [
     'semantic_split',
     'initialize_models',
     'process_with_llm',
     'generate_response',
-    'get_model'
+    'get_model',
+    'model_registry'
 ]
\ No newline at end of file
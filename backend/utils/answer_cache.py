@@ -0,0 +1,167 @@
+# utils/answer_cache.py
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation so trivial variants share a key."""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+
+
+class _Entry:
+    __slots__ = ("answer", "embedding", "question_type", "latency_s", "expires_at")
+
+    def __init__(self, answer: str, embedding: Optional[np.ndarray], question_type: str, latency_s: float,
+                 expires_at: float):
+        self.answer = answer
+        self.embedding = embedding
+        self.question_type = question_type
+        self.latency_s = latency_s
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    Two-tier cache of answers, keyed by document hash.
+
+    The exact tier matches the normalized question text. The semantic tier
+    matches a question embedding within similarity_threshold (cosine) of a
+    question already answered for the same document and of the same
+    question_type, since answers are formatted by how the question is phrased
+    ("what is" vs "list" vs "how"). Both tiers share the same
+    entries, which expire after ttl_seconds and are evicted least recently used
+    beyond max_entries. Documents are content-addressed, so a changed PDF has a
+    new hash and never sees the old answers; invalidate() drops a document's
+    entries eagerly.
+
+    Each entry remembers how long its answer took to compute, which is credited
+    to saved_seconds whenever it is served from the cache.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 3600.0, similarity_threshold: float = 0.95,
+                 question_type: Callable[[str], str] = lambda question: "",
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.question_type = question_type
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._by_document: Dict[str, Dict[str, _Entry]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.saved_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_exact(self, document_hash: str, question: str, count_miss: bool = False) -> Optional[str]:
+        """
+        Answer cached for the same normalized question, or None. A miss is only
+        counted with count_miss, for callers that won't go on to get_similar.
+        """
+        if self.max_entries <= 0:
+            return None
+        key = (document_hash, normalize_question(question))
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                self.misses += count_miss
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            self.saved_seconds += entry.latency_s
+            return entry.answer
+
+    def get_similar(self, document_hash: str, question: str, question_embedding: np.ndarray,
+                    spent_s: float = 0.0) -> Optional[str]:
+        """
+        Answer cached for the most similar live question of the same document
+        and question type, if within the threshold; otherwise counts a miss.
+        spent_s is time already spent getting here (encoding the question) and
+        isn't counted as saved.
+        """
+        if self.max_entries <= 0:
+            return None
+        kind = self.question_type(question)
+        with self._lock:
+            candidates = []
+            for cached_question in list(self._by_document.get(document_hash, ())):
+                entry = self._live_entry((document_hash, cached_question))
+                if entry is not None and entry.embedding is not None and entry.question_type == kind:
+                    candidates.append((cached_question, entry))
+            if candidates:
+                similarities = np.stack([entry.embedding for _, entry in candidates]) @ question_embedding
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    cached_question, entry = candidates[best]
+                    self._entries.move_to_end((document_hash, cached_question))
+                    self.semantic_hits += 1
+                    self.saved_seconds += max(0.0, entry.latency_s - spent_s)
+                    return entry.answer
+            self.misses += 1
+            return None
+
+    def put(self, document_hash: str, question: str, answer: str, question_embedding: Optional[np.ndarray] = None,
+            latency_s: float = 0.0) -> None:
+        """Cache an answer; latency_s is how long it took to compute."""
+        if self.max_entries <= 0:
+            return
+        key = (document_hash, normalize_question(question))
+        entry = _Entry(answer, question_embedding, self.question_type(question), latency_s,
+                       self.clock() + self.ttl_seconds)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._by_document.setdefault(document_hash, {})[key[1]] = entry
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, document_hash: str) -> int:
+        """Drop every answer cached for a document; returns how many there were."""
+        with self._lock:
+            questions = list(self._by_document.get(document_hash, ()))
+            for question in questions:
+                self._remove((document_hash, question))
+            return len(questions)
+
+    def _live_entry(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        document_hash, question = key
+        entries = self._by_document[document_hash]
+        del entries[question]
+        if not entries:
+            del self._by_document[document_hash]
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else None,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,143 @@
+# utils/batcher.py
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """
+    Collects concurrent encode calls and runs them through the model as one batch.
+
+    The first pending text opens a window of max_wait_ms; everything that arrives
+    before the window closes (up to max_batch_size texts) is encoded together and
+    each caller gets back its own row.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, executor: Optional[Executor] = None):
+        self.encode_batch = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.executor = executor
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = 0
+
+        self._batch_sizes: Dict[str, int] = {str(b): 0 for b in BATCH_SIZE_BUCKETS}
+        self._batch_sizes["+Inf"] = 0
+        self._wait_ms: Deque[float] = deque(maxlen=2048)
+        self._batches = 0
+        self._texts = 0
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode a single text, sharing the model call with other concurrent callers."""
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def encode_many(self, texts: List[str]) -> np.ndarray:
+        """Encode several texts; they are batched together with any other pending calls."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        rows = await asyncio.gather(*(self.encode(text) for text in texts))
+        return np.stack(rows)
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Texts waiting for or inside a model call."""
+        return (self._queue.qsize() if self._queue is not None else 0) + self._in_flight
+
+    def metrics(self) -> Dict[str, object]:
+        """Queue depth, batch-size histogram and wait-time percentiles."""
+        waits = sorted(self._wait_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        return {
+            "queue_depth": self.queue_depth,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self._batches,
+            "texts": self._texts,
+            "batch_size_histogram": dict(self._batch_sizes),
+            "wait_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99),
+                        "max": round(waits[-1], 3) if waits else None},
+        }
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # Queues and tasks are bound to one event loop; start over on a new loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def _run(self) -> None:
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._dispatch(batch, loop)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]], loop) -> None:
+        started = time.perf_counter()
+        texts = [text for text, _, _ in batch]
+        self._in_flight = len(batch)
+        self._record(len(batch), [(started - enqueued) * 1000 for _, _, enqueued in batch])
+        try:
+            embeddings = await loop.run_in_executor(self.executor, self.encode_batch, texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for row, (_, future, _) in zip(embeddings, batch):
+                if not future.done():
+                    future.set_result(row)
+        finally:
+            self._in_flight = 0
+
+    def _record(self, size: int, waits_ms: List[float]) -> None:
+        self._batches += 1
+        self._texts += size
+        self._wait_ms.extend(waits_ms)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self._batch_sizes[str(bucket)] += 1
+                break
+        else:
+            self._batch_sizes["+Inf"] += 1
@@ -0,0 +1,49 @@
+# utils/chunks.py
+
+from array import array
+from collections.abc import Sequence
+from typing import Iterator, List, Tuple, Union
+
+
+class ChunkSpans(Sequence):
+    """
+    A document's chunks as (start, end, page) offsets into its normalized text.
+
+    Behaves like a read-only list of chunk strings, but a chunk is only sliced
+    out of the text when it is accessed, so a document costs its text plus
+    20 bytes per chunk instead of a second, overlapping copy of the text.
+    """
+
+    __slots__ = ("text", "starts", "ends", "pages")
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.starts = array("q")
+        self.ends = array("q")
+        self.pages = array("i")  # Page each chunk starts on
+
+    def append(self, start: int, end: int, page: int) -> None:
+        self.starts.append(start)
+        self.ends.append(end)
+        self.pages.append(page)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(idx, slice):
+            return [self.text[start:end] for start, end in zip(self.starts[idx], self.ends[idx])]
+        return self.text[self.starts[idx]:self.ends[idx]]
+
+    def __iter__(self) -> Iterator[str]:
+        text = self.text
+        for start, end in zip(self.starts, self.ends):
+            yield text[start:end]
+
+    def span(self, idx: int) -> Tuple[int, int, int]:
+        return self.starts[idx], self.ends[idx], self.pages[idx]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the offsets; the text buffer is not included."""
+        return sum(a.itemsize * len(a) for a in (self.starts, self.ends, self.pages))
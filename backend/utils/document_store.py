@@ -0,0 +1,210 @@
+# utils/document_store.py
+
+import asyncio
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+import numpy as np
+from .chunks import ChunkSpans
+from .lexical_index import BM25Index
+from .sentence_index import SentenceIndex
+from .vector_index import EMBEDDING_PRECISION, VectorIndex, build_vector_index
+
+
+def hash_document(pdf_bytes: bytes) -> str:
+    """Return the SHA-256 hex digest that identifies a document."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class DocumentArtifacts:
+    """
+    Everything derived from one PDF: normalized text, chunks with their pages,
+    and embeddings. Chunks are spans into text rather than copies of it.
+    """
+
+    __slots__ = ("document_hash", "text", "chunks", "embeddings", "sentence_index", "refcount",
+                 "_static_nbytes", "_vector_index", "_lexical_index", "_index_lock")
+
+    def __init__(self, document_hash: str, text: str, chunks: ChunkSpans,
+                 embeddings: np.ndarray, sentence_index: SentenceIndex, lexical_index: Optional[BM25Index] = None):
+        self.document_hash = document_hash
+        self.text = text
+        self.chunks = chunks
+        self.embeddings = embeddings
+        self.sentence_index = sentence_index
+        self.refcount = 0
+        self._static_nbytes: Optional[int] = None
+        self._vector_index: Optional[VectorIndex] = None
+        self._lexical_index = lexical_index
+        self._index_lock = threading.Lock()
+
+    @property
+    def vector_index(self) -> VectorIndex:
+        """
+        Search index over the chunk embeddings (IVF for very large documents). Ingestion and
+        load_stored_document build it off the event loop; otherwise it is built on first use.
+        """
+        if self._vector_index is None:
+            with self._index_lock:
+                if self._vector_index is None:
+                    self._vector_index = build_vector_index(self.embeddings)
+        return self._vector_index
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        """
+        BM25 inverted index over the chunks. Ingestion and load_stored_document build
+        it off the event loop; otherwise it is built on first use.
+        """
+        if self._lexical_index is None:
+            with self._index_lock:
+                if self._lexical_index is None:
+                    self._lexical_index = BM25Index(self.chunks)
+        return self._lexical_index
+
+    def use_stored_embeddings(self, embeddings: np.ndarray) -> None:
+        """Swap the embedding matrix for its persisted copy (e.g. memory-mapped), which holds the same values."""
+        with self._index_lock:
+            self.embeddings = embeddings
+            if self._vector_index is not None:
+                self._vector_index.embeddings = embeddings
+            self._static_nbytes = None
+
+    def nbytes(self) -> int:
+        """Approximate memory held: text, chunks, pages, embeddings, indexes and cached sentence vectors."""
+        if self._static_nbytes is None:
+            embeddings_nbytes = self.embeddings.nbytes
+            if isinstance(self.embeddings, np.memmap) and EMBEDDING_PRECISION != "float32":
+                # Quantized search only pages in the float32 rows it re-scores
+                embeddings_nbytes = 0
+            self._static_nbytes = sys.getsizeof(self.text) + self.chunks.nbytes + embeddings_nbytes
+        index_nbytes = self._vector_index.nbytes if self._vector_index is not None else 0
+        if self._lexical_index is not None:
+            index_nbytes += self._lexical_index.nbytes
+        return self._static_nbytes + self.sentence_index.nbytes + index_nbytes
+
+    @property
+    def pages(self):
+        """Page number of each chunk"""
+        return self.chunks.pages
+
+
+class DocumentStore:
+    """
+    Content-addressed cache of document artifacts keyed by the SHA-256 of the PDF.
+
+    Notebooks acquire a reference to the artifacts they use and release it when
+    deleted. Artifacts that nobody references are kept in a small LRU (so a
+    repeated /hackrx/run-file of the same PDF is still a hit) and dropped once it
+    is full. Concurrent requests for a document that is still being built share
+    the one build.
+    """
+
+    def __init__(self, max_unreferenced: int = 16):
+        self.max_unreferenced = max_unreferenced
+        self._referenced: Dict[str, DocumentArtifacts] = {}
+        self._unreferenced: "OrderedDict[str, DocumentArtifacts]" = OrderedDict()
+        self._building: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, document_hash: str) -> Optional[DocumentArtifacts]:
+        with self._lock:
+            artifacts = self._referenced.get(document_hash)
+            if artifacts is None:
+                artifacts = self._unreferenced.get(document_hash)
+                if artifacts is not None:
+                    self._unreferenced.move_to_end(document_hash)
+            return artifacts
+
+    async def get_or_build(self, document_hash: str,
+                           build: Callable[[], Awaitable[DocumentArtifacts]]) -> DocumentArtifacts:
+        """
+        Return the cached artifacts for a document, building them at most once.
+
+        Args:
+            document_hash (str): SHA-256 of the PDF bytes
+            build (Callable): Coroutine function producing the artifacts on a miss
+
+        Returns:
+            DocumentArtifacts: Shared artifacts for the document
+        """
+        artifacts = self.get(document_hash)
+        if artifacts is not None:
+            self.hits += 1
+            return artifacts
+
+        pending = self._building.get(document_hash)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._building[document_hash] = future
+        try:
+            artifacts = self.add(await build())
+            future.set_result(artifacts)
+            return artifacts
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._building.pop(document_hash, None)
+
+    def acquire(self, artifacts: DocumentArtifacts) -> DocumentArtifacts:
+        """Take a reference to artifacts so they stay resident until released."""
+        with self._lock:
+            self._unreferenced.pop(artifacts.document_hash, None)
+            self._referenced[artifacts.document_hash] = artifacts
+            artifacts.refcount += 1
+            return artifacts
+
+    def release(self, document_hash: str, park: bool = True) -> None:
+        """
+        Drop a reference. Unreferenced artifacts move to the bounded LRU, or are
+        dropped outright with park=False (e.g. when a durable copy exists).
+        """
+        with self._lock:
+            artifacts = self._referenced.get(document_hash)
+            if artifacts is None:
+                return
+            artifacts.refcount -= 1
+            if artifacts.refcount <= 0:
+                artifacts.refcount = 0
+                del self._referenced[document_hash]
+                if park:
+                    self._park(artifacts)
+
+    def add(self, artifacts: DocumentArtifacts) -> DocumentArtifacts:
+        """Cache artifacts (e.g. loaded from storage); returns the copy already cached, if any."""
+        with self._lock:
+            existing = self._referenced.get(artifacts.document_hash)
+            if existing is None:
+                existing = self._unreferenced.get(artifacts.document_hash)
+            if existing is not None:
+                return existing
+            self._park(artifacts)
+            return artifacts
+
+    def _park(self, artifacts: DocumentArtifacts) -> None:
+        self._unreferenced[artifacts.document_hash] = artifacts
+        self._unreferenced.move_to_end(artifacts.document_hash)
+        while len(self._unreferenced) > self.max_unreferenced:
+            self._unreferenced.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "referenced_documents": len(self._referenced),
+            "unreferenced_documents": len(self._unreferenced),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,164 @@
+# utils/downloader.py
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import httpx
+
+
+class DocumentDownloadError(Exception):
+    """Raised when a document can't be fetched."""
+
+
+class DocumentTooLargeError(DocumentDownloadError):
+    """Raised when a document is bigger than the configured limit."""
+
+
+class DocumentDownloader:
+    """
+    Async document fetcher with a pooled keep-alive client, size cap and content cache.
+
+    Bodies are held in memory, as PDF extraction and hashing need the bytes; the
+    download is aborted as soon as it passes max_bytes, so a body never takes
+    more than that.
+    Responses carrying an ETag or Last-Modified header are cached under the URL
+    and that validator; the next fetch of the URL is a conditional request and a
+    304 reply is served from the cache.
+    """
+
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024, connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0, max_connections: int = 20,
+                 cache_max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.cache_max_bytes = cache_max_bytes
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # (url, validator) -> body, most recently used last
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        # url -> (etag, last_modified) of the cached copy
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, follow_redirects=True)
+            self._client_loop = loop
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+    async def fetch(self, url: str) -> bytes:
+        """
+        Download url and return its body.
+
+        Raises:
+            DocumentTooLargeError: If the body exceeds max_bytes
+            DocumentDownloadError: On network errors, timeouts or error statuses
+        """
+        body = await self._fetch(url, conditional=True)
+        if body is None:
+            # Validators were evicted between request and reply; fetch again in full, once
+            self._validators.pop(url, None)
+            body = await self._fetch(url, conditional=False)
+            if body is None:
+                raise DocumentDownloadError(f"Server returned 304 to an unconditional request for {url}")
+        return body
+
+    async def _fetch(self, url: str, conditional: bool) -> Optional[bytes]:
+        """The body of url, or None for a 304 whose body isn't cached."""
+        headers = {}
+        etag, last_modified = self._validators.get(url, (None, None)) if conditional else (None, None)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        try:
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304:
+                    cached = self._cache_get(url, etag, last_modified)
+                    if cached is not None:
+                        self.hits += 1
+                    return cached
+                response.raise_for_status()
+                self.misses += 1
+
+                declared = response.headers.get("Content-Length")
+                if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+                    raise DocumentTooLargeError(f"Document is {declared} bytes, limit is {self.max_bytes}")
+
+                body = await self._read_capped(response)
+                self._cache_put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), body)
+                return body
+        except DocumentDownloadError:
+            raise
+        except httpx.HTTPStatusError as e:
+            raise DocumentDownloadError(f"Server returned {e.response.status_code} for {url}") from e
+        except httpx.HTTPError as e:
+            raise DocumentDownloadError(f"{type(e).__name__}: {e}") from e
+
+    async def _read_capped(self, response: httpx.Response) -> bytes:
+        body = bytearray()
+        async for block in response.aiter_bytes():
+            if len(body) + len(block) > self.max_bytes:
+                raise DocumentTooLargeError(f"Document exceeds the {self.max_bytes} byte limit")
+            body += block
+        return bytes(body)
+
+    def _cache_get(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> Optional[bytes]:
+        key = (url, etag or last_modified or "")
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+            return body
+
+    def _cache_put(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes) -> None:
+        if not (etag or last_modified) or len(body) > self.cache_max_bytes:
+            return
+        with self._lock:
+            old_validators = self._validators.get(url)
+            if old_validators is not None:
+                old = self._cache.pop((url, old_validators[0] or old_validators[1] or ""), None)
+                if old is not None:
+                    self._cache_bytes -= len(old)
+
+            self._cache[(url, etag or last_modified)] = body
+            self._validators[url] = (etag, last_modified)
+            self._cache_bytes += len(body)
+
+            while self._cache_bytes > self.cache_max_bytes and self._cache:
+                (old_url, _), old = self._cache.popitem(last=False)
+                self._validators.pop(old_url, None)
+                self._cache_bytes -= len(old)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cache_entries": len(self._cache),
+            "cache_bytes": self._cache_bytes,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+        }
+
+
+document_downloader = DocumentDownloader(
+    max_bytes=int(os.getenv("DOWNLOAD_MAX_BYTES", str(50 * 1024 * 1024))),
+    connect_timeout=float(os.getenv("DOWNLOAD_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("DOWNLOAD_READ_TIMEOUT", "30")),
+    cache_max_bytes=int(os.getenv("DOWNLOAD_CACHE_BYTES", str(64 * 1024 * 1024)))
+)
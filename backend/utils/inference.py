@@ -0,0 +1,100 @@
+# utils/inference.py
+
+import os
+from typing import Any, List
+import numpy as np
+
+# "torch" (full precision), "torch-int8" (dynamic int8 quantization of the linear layers)
+# or "onnx" (ONNX Runtime through sentence-transformers>=3.2; needs optimum[onnxruntime])
+INFERENCE_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+BACKENDS = ("torch", "torch-int8", "onnx")
+# Intra-op threads for one model call; 0 keeps the library default (one per core)
+INFERENCE_THREADS = int(os.getenv("EMBED_THREADS", "0"))
+# Longer inputs are truncated; chunks are ~1000 characters, well under 512 tokens
+MAX_SEQ_LENGTH = int(os.getenv("EMBED_MAX_SEQ_LENGTH", "512"))
+# Texts per model call, and the padded size of a call in estimated tokens (texts x longest text)
+ENCODE_BATCH_SIZE = int(os.getenv("EMBED_ENCODE_BATCH_SIZE", "32"))
+ENCODE_BATCH_TOKENS = int(os.getenv("EMBED_ENCODE_BATCH_TOKENS", "8192"))
+
+
+def load_sentence_transformer(path: str, backend: str = INFERENCE_BACKEND, threads: int = INFERENCE_THREADS,
+                              max_seq_length: int = MAX_SEQ_LENGTH, fallback: bool = True) -> Any:
+    """
+    Load a SentenceTransformer on CPU with the given inference backend.
+
+    If the ONNX backend can't load (no runtime, or a sentence-transformers
+    without backend support) this raises, or with fallback loads torch instead
+    and says so. The backend actually in use is the model's inference_backend.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    model = None
+    if backend == "onnx":
+        try:
+            import onnxruntime
+
+            session_options = onnxruntime.SessionOptions()
+            if threads > 0:
+                session_options.intra_op_num_threads = threads
+            # Exports the model on first load when the checkpoint has no ONNX file
+            model = SentenceTransformer(path, device="cpu", backend="onnx",
+                                        model_kwargs={"session_options": session_options,
+                                                      "provider": "CPUExecutionProvider"})
+        except Exception as e:
+            if not fallback:
+                raise RuntimeError(f"ONNX embedding backend unavailable: {e}") from e
+            print(f"Error loading ONNX backend, falling back to torch: {e}")
+    if model is None:
+        model = SentenceTransformer(path, device="cpu")
+        if backend == "torch-int8":
+            # Weights of every Linear layer become int8; activations are quantized per call
+            torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        model.inference_backend = "torch-int8" if backend == "torch-int8" else "torch"
+    else:
+        model.inference_backend = "onnx"
+
+    if max_seq_length > 0:
+        model.max_seq_length = min(model.max_seq_length or max_seq_length, max_seq_length)
+    return model
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for batching: about four characters per token."""
+    return len(text) // 4 + 2
+
+
+def encode_length_sorted(model: Any, texts: List[str], batch_size: int = ENCODE_BATCH_SIZE,
+                         batch_tokens: int = ENCODE_BATCH_TOKENS) -> np.ndarray:
+    """
+    Encode texts into normalized float32 embeddings, in batches of similar length.
+
+    Texts are sorted by length and cut into batches of at most batch_size
+    texts and batch_tokens padded tokens, so a batch pads to about the length
+    of its own texts and batches of long chunks stay small. Rows come back in
+    the original order.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    max_tokens = getattr(model, "max_seq_length", None) or MAX_SEQ_LENGTH
+    lengths = [min(estimate_tokens(text), max_tokens) for text in texts]
+    order = sorted(range(len(texts)), key=lengths.__getitem__, reverse=True)
+
+    embeddings = None
+    start = 0
+    while start < len(order):
+        # The first text of a batch is its longest, so it sets the padded width
+        size = max(1, min(batch_size, batch_tokens // lengths[order[start]]))
+        rows = order[start:start + size]
+        batch = model.encode([texts[row] for row in rows], batch_size=len(rows),
+                             normalize_embeddings=True, convert_to_numpy=True)
+        if embeddings is None:
+            embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+        embeddings[rows] = batch
+        start += size
+    return embeddings
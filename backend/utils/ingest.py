@@ -0,0 +1,184 @@
+# utils/ingest.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Deque, List, Optional, Tuple
+import numpy as np
+from .chunks import ChunkSpans
+from .document_store import DocumentArtifacts
+from .lexical_index import BM25Index
+from .llm_chain import embed_chunks
+from .metrics import is_sampled, record_stage
+from .pdf_extract import iter_page_texts
+from .sentence_index import SentenceIndex
+from .splitter import iter_chunk_spans, normalize_text
+
+
+class PartialDocument:
+    """
+    Chunks and embeddings of a document that is still being ingested.
+
+    Batches are appended in chunk order as their embeddings complete, so a
+    snapshot is always a consistent prefix of the finished document and can be
+    queried while ingestion carries on.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.pages: List[int] = []
+        self.sentence_index = SentenceIndex(self.chunks)
+        self._batches: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        # BM25 over a prefix of the chunks, extended as lexical queries and the finished document need it
+        self._lexical_index = BM25Index([])
+        self._lexical_lock = threading.Lock()
+
+    def add(self, chunks: List[str], pages: List[int], embeddings: np.ndarray) -> None:
+        with self._lock:
+            self._batches.append(embeddings)
+            self.pages.extend(pages)
+            self.chunks.extend(chunks)
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """Return the chunks indexed so far and their embedding matrix."""
+        with self._lock:
+            if len(self._batches) > 1:
+                # Merge so later snapshots don't pay for the concatenation again
+                self._batches = [np.vstack(self._batches)]
+            embeddings = self._batches[0] if self._batches else embed_chunks([])
+            return self.chunks[:], embeddings
+
+    def lexical_snapshot(self) -> Tuple[List[str], BM25Index]:
+        """
+        Return the chunks indexed so far and a BM25 index over them. The index is
+        extended with the chunks added since the last call rather than rebuilt.
+        """
+        with self._lexical_lock:
+            with self._lock:
+                chunks = self.chunks[:]
+            if len(chunks) > len(self._lexical_index):
+                self._lexical_index = self._lexical_index.extended(chunks[len(self._lexical_index):])
+            return chunks, self._lexical_index
+
+    def to_artifacts(self, document_hash: str, spans: ChunkSpans,
+                     lexical_index: Optional[BM25Index] = None) -> DocumentArtifacts:
+        """Finish the document; its chunks become offsets into spans.text instead of copies."""
+        _, embeddings = self.snapshot()
+        # Sentence embeddings cached while ingesting stay valid: chunk i has the same text
+        self.sentence_index.chunks = spans
+        return DocumentArtifacts(document_hash, spans.text, spans, embeddings, self.sentence_index, lexical_index)
+
+
+def build_document(pdf_bytes: bytes, document_hash: str, extract_executor: Optional[Executor] = None,
+                   embed_executor: Optional[Executor] = None,
+                   on_progress: Optional[Callable[[int, int], None]] = None,
+                   partial: Optional[PartialDocument] = None,
+                   embed_slots: Optional[threading.Semaphore] = None,
+                   embed_batch_size: int = 64, embed: bool = True) -> DocumentArtifacts:
+    """
+    Extract, split and embed a PDF as a pipeline.
+
+    Pages are extracted in parallel on extract_executor and streamed into the
+    splitter; every embed_batch_size chunks are handed to embed_executor while
+    extraction and splitting carry on. Runs on an ingestion thread, not on the
+    event loop.
+
+    Args:
+        pdf_bytes (bytes): Raw PDF file content
+        document_hash (str): SHA-256 of pdf_bytes
+        extract_executor (Executor): Pool for page extraction (usually the process pool)
+        embed_executor (Executor): Pool for embedding batches; embeds inline when None
+        on_progress (Callable): Called with (pages_processed, chunks_indexed)
+        partial (PartialDocument): Receives each embedded batch as it completes
+        embed_slots (Semaphore): Caps how many embedding batches ingestion may have
+            in flight, leaving the rest of the embedding pool to queries
+        embed_batch_size (int): Chunks per embedding call
+        embed (bool): Embed the chunks; without it (lexical retrieval) no model is
+            needed and the document gets an empty embedding matrix
+
+    Returns:
+        DocumentArtifacts: Normalized text, chunk spans with their pages, embeddings
+        and sentence index
+    """
+    if partial is None:
+        partial = PartialDocument()
+    page_texts: List[str] = []
+    spans = ChunkSpans()
+    pending: Deque[Tuple[Future, List[str], List[int]]] = deque()
+    batch: List[str] = []
+    batch_pages: List[int] = []
+    # Seconds the pipeline spent waiting on page extraction and on embeddings; the rest is splitting
+    waits = {"pdf_extraction": 0.0, "chunk_embedding": 0.0}
+    started = time.perf_counter()
+
+    def report() -> None:
+        if on_progress is not None:
+            on_progress(len(page_texts), len(partial.chunks))
+
+    def submit(texts: List[str], pages: List[int]) -> None:
+        if not embed:
+            future = Future()
+            future.set_result(embed_chunks([]))
+        elif embed_executor is None:
+            future = Future()
+            future.set_result(embed_chunks(texts))
+        else:
+            if embed_slots is not None:
+                embed_slots.acquire()
+            future = embed_executor.submit(embed_chunks, texts)
+            if embed_slots is not None:
+                future.add_done_callback(lambda _: embed_slots.release())
+        pending.append((future, texts, pages))
+
+    def publish(wait: bool) -> None:
+        # Keep batches in chunk order: only the oldest pending batch may be published
+        published = False
+        while pending and (wait or pending[0][0].done()):
+            future, texts, pages = pending.popleft()
+            partial.add(texts, pages, future.result())
+            published = True
+        if published:
+            report()
+
+    def pages():
+        resumed = time.perf_counter()
+        for page_no, text in iter_page_texts(pdf_bytes, extract_executor):
+            waits["pdf_extraction"] += time.perf_counter() - resumed
+            page_texts.append(text)
+            report()
+            yield page_no, text
+            resumed = time.perf_counter()
+
+    for chunk, start, end, page_no in iter_chunk_spans(pages()):
+        spans.append(start, end, page_no)
+        batch.append(chunk)
+        batch_pages.append(page_no)
+        if len(batch) >= embed_batch_size:
+            submit(batch, batch_pages)
+            batch, batch_pages = [], []
+            publish(wait=False)
+    if batch:
+        submit(batch, batch_pages)
+    waited = time.perf_counter()
+    publish(wait=True)
+    waits["chunk_embedding"] += time.perf_counter() - waited
+
+    # Chunk offsets are relative to the normalized text of the whole document
+    spans.text = normalize_text("".join(page_texts))
+    split_done = time.perf_counter()
+    # Indexes are built here, on the ingest thread, rather than on the event loop by the first query;
+    # BM25 extends whatever lexical queries indexed while ingestion ran
+    _, lexical_index = partial.lexical_snapshot()
+    artifacts = partial.to_artifacts(document_hash, spans, lexical_index)
+    lexical_done = time.perf_counter()
+    if embed:
+        artifacts.vector_index
+    if is_sampled():
+        for name, seconds in waits.items():
+            record_stage(name, seconds)
+        record_stage("splitting", max(0.0, split_done - started - sum(waits.values())))
+        record_stage("lexical_indexing", lexical_done - split_done)
+        record_stage("vector_indexing", time.perf_counter() - lexical_done)
+    return artifacts
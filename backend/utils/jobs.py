@@ -0,0 +1,122 @@
+# utils/jobs.py
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class IngestionJob:
+    """State and progress of one background notebook ingestion."""
+
+    def __init__(self, notebook_id: str, pages_total: Optional[int] = None):
+        self.job_id = str(uuid.uuid4())
+        self.notebook_id = notebook_id
+        self.state = QUEUED
+        self.pages_total = pages_total
+        self.pages_processed = 0
+        self.chunks_processed = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (COMPLETED, FAILED)
+
+    def update_progress(self, pages_processed: int, chunks_processed: int) -> None:
+        """Record progress; safe to call from the ingestion thread."""
+        self.pages_processed = pages_processed
+        self.chunks_processed = chunks_processed
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the job finishes; returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "notebook_id": self.notebook_id,
+            "state": self.state,
+            "pages_total": self.pages_total,
+            "pages_processed": self.pages_processed,
+            "chunks_processed": self.chunks_processed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs ingestion jobs in the background with a cap on how many run at once.
+
+    Jobs beyond max_concurrent wait in the queued state, so a burst of large
+    uploads can't take every ingestion and embedding thread away from queries.
+    Finished jobs are remembered (up to max_finished) for status polling.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_finished: int = 1000):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def submit(self, job: IngestionJob, run: Callable[[IngestionJob], Awaitable[None]]) -> IngestionJob:
+        """Schedule run(job) on the running event loop and return the job."""
+        self._jobs[job.job_id] = job
+        self._tasks[job.job_id] = asyncio.get_running_loop().create_task(self._run(job, run))
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.state] += 1
+        return counts
+
+    async def _run(self, job: IngestionJob, run: Callable[[IngestionJob], Awaitable[None]]) -> None:
+        try:
+            async with self._get_semaphore():
+                job.state = RUNNING
+                job.started_at = datetime.now().isoformat()
+                await run(job)
+                job.state = COMPLETED
+        except Exception as e:
+            job.state = FAILED
+            job.error = str(e)
+            print(f"Ingestion job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            job._done.set()
+            self._tasks.pop(job.job_id, None)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+        return self._semaphore
+
+    def _trim(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,134 @@
+# utils/lexical_index.py
+
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from .vector_index import top_k_indices
+
+# Words, numbers and compound codes such as "4.2", "ab-123" or "sec/7"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its me my of on or our "
+    "should so that the their there these they this to was we what when where which who whom why will "
+    "with would you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of text; compound codes are kept whole and also split into their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[.\-/]", token) if part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Inverted index over a notebook's chunks with Okapi BM25 scoring.
+
+    Postings are stored CSR-style (one array of chunk IDs and one of
+    precomputed term-frequency weights, sliced per term), so a query costs one
+    numpy scatter-add per query term and needs no embedding model. The raw term
+    frequencies are kept too, so extended() can add chunks without re-tokenizing.
+    """
+
+    def __init__(self, chunks: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        # Rough cost of the vocabulary dict: each key string plus its entry
+        self._vocabulary_nbytes = 0
+        empty = np.zeros(0, dtype=np.int32)
+        self._index(chunks, np.zeros(1, dtype=np.intp), empty, empty, np.zeros(0, dtype=np.float32))
+
+    def extended(self, chunks: Sequence[str]) -> "BM25Index":
+        """
+        A new index over this one's chunks followed by chunks. Only the new chunks
+        are tokenized; this index is left as it is, so searches on it can carry on.
+        """
+        index = BM25Index.__new__(BM25Index)
+        index.k1 = self.k1
+        index.b = self.b
+        index.vocabulary = dict(self.vocabulary)
+        index._vocabulary_nbytes = self._vocabulary_nbytes
+        index._index(chunks, self.offsets, self.doc_ids, self.term_freqs, self.doc_lengths)
+        return index
+
+    def _index(self, chunks: Sequence[str], offsets: np.ndarray, doc_ids: np.ndarray, term_freqs: np.ndarray,
+               doc_lengths: np.ndarray) -> None:
+        """Merge chunks into the postings given (CSR by term) and compute the BM25 weights."""
+        first = len(doc_lengths)
+        terms, docs, freqs = array("i"), array("i"), array("i")
+        new_lengths = np.zeros(len(chunks), dtype=np.float32)
+        for offset, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            new_lengths[offset] = sum(counts.values())
+            for term, freq in counts.items():
+                if term not in self.vocabulary:
+                    self.vocabulary[term] = len(self.vocabulary)
+                    self._vocabulary_nbytes += len(term) + 100
+                terms.append(self.vocabulary[term])
+                docs.append(first + offset)
+                freqs.append(freq)
+
+        # Existing postings come first, so each term's chunks stay in ascending order
+        old_terms = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+        terms = np.concatenate([old_terms, np.frombuffer(terms, dtype=np.int32)])
+        order = np.argsort(terms, kind="stable")
+        self.doc_ids = np.concatenate([doc_ids, np.frombuffer(docs, dtype=np.int32)])[order]
+        self.term_freqs = np.concatenate([term_freqs, np.frombuffer(freqs, dtype=np.int32)])[order]
+        self.offsets = np.searchsorted(terms[order], np.arange(len(self.vocabulary) + 1))
+        self.doc_lengths = np.concatenate([doc_lengths, new_lengths])
+
+        n = len(self.doc_lengths)
+        df = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_length = float(self.doc_lengths.mean()) if n and self.doc_lengths.any() else 1.0
+        tf = self.term_freqs.astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[self.doc_ids] / avg_length)
+        self.weights = (tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+        self.size = n
+
+    def __len__(self) -> int:
+        return self.size
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for query."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # A term's postings hold each chunk at most once, so plain fancy-index += is safe
+            scores[self.doc_ids[start:end]] += self.idf[term_id] * self.weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) of the k best matching chunks, best first; only chunks with a match."""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores > 0)
+        best = top_k_indices(scores[matched], k)
+        return matched[best], scores[matched[best]]
+
+    def rank_texts(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Score short texts (e.g. a chunk's sentences) by the summed IDF of the query terms they contain."""
+        weights = {}
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                weights[term] = float(self.idf[term_id])
+        return np.array([sum(weights.get(term, 0.0) for term in set(tokenize(text))) for text in texts],
+                        dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.doc_ids, self.term_freqs, self.weights, self.offsets, self.idf, self.doc_lengths)
+        return sum(a.nbytes for a in arrays) + self._vocabulary_nbytes
@@ -1,16 +1,25 @@
 # utils/llm_chain.py
 
 import os
-from typing import List, Optional
-from sentence_transformers import SentenceTransformer, util
+from typing import List, Optional, Sequence
 from huggingface_hub import snapshot_download, login
-import torch
+import numpy as np
 import re
+from .model_registry import model_registry
+from .inference import encode_length_sorted, load_sentence_transformer
+from .metrics import stage
+from .sentence_index import SentenceIndex
+from .lexical_index import BM25Index
+from .vector_index import FlatIndex, VectorIndex, top_k_indices
 
 MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
 MODEL_NAME = "ibm-granite/granite-embedding-english-r2"
 MODEL_LOCAL_PATH = os.path.join(MODELS_DIR, MODEL_NAME.replace('/', '_'))
 
+# Hybrid retrieval: how many candidates each ranker contributes, and how much BM25 adds to the cosine
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "0.3"))
+
 def initialize_models(hf_token: Optional[str] = None) -> bool:
     """Initialize the models with Hugging Face token."""
     try:
@@ -23,71 +32,184 @@ def initialize_models(hf_token: Optional[str] = None) -> bool:
         print(f"Error initializing models: {e}")
         return False
 
-def get_model():
-    """Get or download the sentence transformer model."""
+def _load_model():
+    """Download the sentence transformer model if needed and load it with the configured backend."""
     if not os.path.exists(MODEL_LOCAL_PATH):
         os.makedirs(MODELS_DIR, exist_ok=True)
         snapshot_download(repo_id=MODEL_NAME, local_dir=MODEL_LOCAL_PATH, ignore_patterns=["*.h5", "*.ot", "*.msgpack"])
-    return SentenceTransformer(MODEL_LOCAL_PATH)
+    return load_sentence_transformer(MODEL_LOCAL_PATH)
+
+def get_model():
+    """Get the shared sentence transformer model, loading it once per process."""
+    return model_registry.get(MODEL_NAME, _load_model)
+
+def embed_chunks(document_chunks: List[str]) -> np.ndarray:
+    """Encode document chunks into a normalized float32 matrix with one row per chunk."""
+    if not document_chunks:
+        return np.zeros((0, 0), dtype=np.float32)
+    return encode_texts(document_chunks)
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """Encode texts into normalized float32 embeddings with the shared model, batched by length."""
+    return encode_length_sorted(get_model(), list(texts))
+
+def select_relevant_chunk_indices(question_embedding: np.ndarray, chunk_embeddings: np.ndarray,
+                                  top_k: int = 3, vector_index: Optional[VectorIndex] = None,
+                                  lexical_index: Optional[BM25Index] = None, question: Optional[str] = None,
+                                  dense_scores: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Rank chunks against a question embedding, falling back to the first top_k chunks.
+
+    Searches vector_index when given (e.g. an approximate index for a large
+    notebook), otherwise scores every chunk exactly. With a lexical_index and
+    the question text, ranking is hybrid (see hybrid_chunk_indices).
+    """
+    if lexical_index is not None and question:
+        return hybrid_chunk_indices(question, question_embedding, chunk_embeddings, top_k, lexical_index,
+                                    vector_index, dense_scores)
+
+    index = vector_index if vector_index is not None else FlatIndex(chunk_embeddings)
+    top_indices, scores = index.search(question_embedding, top_k)
+    selected = [int(idx) for idx, score in zip(top_indices, scores) if score > 0.2]
+    return selected if selected else list(range(min(top_k, len(chunk_embeddings))))
+
+def hybrid_chunk_indices(question: str, question_embedding: np.ndarray, chunk_embeddings: np.ndarray,
+                         top_k: int, lexical_index: BM25Index, vector_index: Optional[VectorIndex] = None,
+                         dense_scores: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Rank the union of the dense and BM25 candidates by cosine plus weighted BM25.
+
+    BM25 is normalized by the best lexical score, so a chunk containing the
+    question's exact terms (clause numbers, names, policy codes) is lifted even
+    when its embedding isn't the closest. A chunk is relevant when its cosine is
+    above 0.2 or it shares a term with the question; the first top_k chunks are
+    only used when nothing is.
+
+    Args:
+        dense_scores (np.ndarray): Cosine of every chunk, when already computed
+            (e.g. a row of a batched similarity matrix)
+    """
+    n_candidates = max(top_k, HYBRID_CANDIDATES)
+    if dense_scores is not None:
+        dense_candidates = top_k_indices(dense_scores, n_candidates)
+    else:
+        index = vector_index if vector_index is not None else FlatIndex(chunk_embeddings)
+        dense_candidates, _ = index.search(question_embedding, n_candidates)
+    lexical_candidates, lexical_scores = lexical_index.search(question, n_candidates)
 
-def extract_relevant_chunks(question: str, document_chunks: List[str], top_k: int = 3) -> List[str]:
-    """Extract the most relevant chunks for the question using semantic similarity."""
+    candidates = np.union1d(dense_candidates, lexical_candidates)
+    if dense_scores is not None:
+        dense = dense_scores[candidates]
+    else:
+        dense = chunk_embeddings[candidates] @ question_embedding
+    lexical = np.zeros(len(candidates), dtype=np.float32)
+    if len(lexical_candidates):
+        lexical[np.searchsorted(candidates, lexical_candidates)] = lexical_scores / lexical_scores.max()
+
+    relevant = (dense > 0.2) | (lexical > 0)
+    fused = np.where(relevant, dense + HYBRID_LEXICAL_WEIGHT * lexical, -np.inf)
+    selected = [int(candidates[idx]) for idx in top_k_indices(fused, top_k) if relevant[idx]]
+    return selected if selected else list(range(min(top_k, len(chunk_embeddings))))
+
+def extract_relevant_chunks(question: str, document_chunks: List[str], top_k: int = 3,
+                            chunk_embeddings: Optional[np.ndarray] = None,
+                            lexical_index: Optional[BM25Index] = None) -> List[str]:
+    """
+    Extract the most relevant chunks for the question using semantic similarity.
+
+    When chunk_embeddings (as returned by embed_chunks) are given, only the question
+    is encoded and scoring is a single matrix-vector product. With a lexical_index
+    ranking is hybrid, and if embedding fails the best BM25 matches are returned
+    instead of the first chunks.
+    """
     try:
-        model = get_model()
-        question_embedding = model.encode([question], normalize_embeddings=True, convert_to_tensor=True)
-        chunk_embeddings = model.encode(document_chunks, normalize_embeddings=True, convert_to_tensor=True)
-        
-        similarities = util.cos_sim(question_embedding, chunk_embeddings)[0]
-        top_indices = similarities.argsort(descending=True)[:top_k]
+        if chunk_embeddings is None or len(chunk_embeddings) != len(document_chunks):
+            chunk_embeddings = embed_chunks(document_chunks)
 
-        relevant_chunks = []
-        for idx in top_indices:
-            if similarities[idx] > 0.2:
-                relevant_chunks.append(document_chunks[idx.item()])
-        
-        return relevant_chunks if relevant_chunks else document_chunks[:top_k]
+        question_embedding = encode_texts([question])[0]
+        indices = select_relevant_chunk_indices(question_embedding, chunk_embeddings, top_k,
+                                                lexical_index=lexical_index, question=question)
+        return [document_chunks[idx] for idx in indices]
     except Exception as e:
         print(f"Error in chunk extraction: {e}")
+        if lexical_index is not None:
+            indices, _ = lexical_index.search(question, top_k)
+            if len(indices):
+                return [document_chunks[int(idx)] for idx in indices]
         return document_chunks[:top_k] if document_chunks else []
 
 def extract_relevant_sentences(question: str, chunk: str, top_n: int = 2) -> str:
     """Extract the most relevant sentences from a chunk using semantic similarity."""
     try:
-        model = get_model()
-        sentences = re.split(r'(?<=[.!?]) +', chunk)
-        if not sentences:
-            return chunk
+        index = SentenceIndex([chunk])
+        question_embedding = encode_texts([question])[0]
+        best_sentences = index.top_sentences(0, question_embedding, encode_texts, top_n)
+        return ' '.join(best_sentences).strip()
+    except Exception as e:
+        print(f"Error extracting sentences: {e}")
+        return chunk
+
+def refine_with_sentence_index(question: str, document_chunks: List[str], chunk_embeddings: Optional[np.ndarray],
+                               sentence_index: SentenceIndex, top_n: int = 2,
+                               question_embedding: Optional[np.ndarray] = None,
+                               vector_index: Optional[VectorIndex] = None,
+                               lexical_index: Optional[BM25Index] = None) -> Optional[str]:
+    """
+    Pick the best chunk and its most relevant sentences using cached embeddings.
 
-        question_embedding = model.encode([question], normalize_embeddings=True, convert_to_tensor=True)
-        sentence_embeddings = model.encode(sentences, normalize_embeddings=True, convert_to_tensor=True)
+    The question is encoded once; chunk scoring and sentence scoring are both dot
+    products against embeddings that are computed at most once per notebook.
+    """
+    if chunk_embeddings is None or len(chunk_embeddings) != len(document_chunks):
+        chunk_embeddings = embed_chunks(document_chunks)
 
-        similarities = util.cos_sim(question_embedding, sentence_embeddings)[0]
-        top_indices = similarities.argsort(descending=True)[:top_n]
+    if question_embedding is None:
+        with stage("question_encoding"):
+            question_embedding = encode_texts([question])[0]
+    with stage("similarity_search"):
+        indices = select_relevant_chunk_indices(question_embedding, chunk_embeddings, top_k=3,
+                                                vector_index=vector_index, lexical_index=lexical_index,
+                                                question=question)
+    if not indices:
+        return None
 
-        best_sentences = [sentences[idx] for idx in top_indices]
+    try:
+        with stage("sentence_refinement"):
+            best_sentences = sentence_index.top_sentences(indices[0], question_embedding, encode_texts, top_n)
         return ' '.join(best_sentences).strip()
     except Exception as e:
         print(f"Error extracting sentences: {e}")
-        return chunk
+        return document_chunks[indices[0]]
+
+def question_type(question: str) -> str:
+    """How an answer to the question is formatted: "definition", "list", "steps" or "plain"."""
+    question_lower = question.lower().strip()
+    if question_lower.startswith(('what is', 'define', 'definition of')):
+        return "definition"
+    if question_lower.startswith(('list', 'what are', 'name', 'identify')):
+        return "list"
+    if question_lower.startswith(('how', 'steps', 'process', 'procedure')):
+        return "steps"
+    return "plain"
 
 def clean_and_format_response(response: str, question: str) -> str:
     """Clean and format the response based on question type."""
     response = re.sub(r'^\d+\.\s*', '', response)
     response = re.sub(r'\s+', ' ', response).strip()
     
-    question_lower = question.lower().strip()
+    kind = question_type(question)
     
-    if question_lower.startswith(('what is', 'define', 'definition of')):
+    if kind == "definition":
         sentences = response.split('.')
         if len(sentences) > 1 and len(sentences[0]) > 20:
             return sentences[0].strip() + '.'
     
-    elif question_lower.startswith(('list', 'what are', 'name', 'identify')):
+    elif kind == "list":
         if ',' in response and len(response.split(',')) > 2:
             items = [item.strip() for item in response.split(',')]
             return '• ' + '\n• '.join(items[:10])
     
-    elif question_lower.startswith(('how', 'steps', 'process', 'procedure')):
+    elif kind == "steps":
         sentences = [s.strip() for s in response.split('.') if s.strip()]
         if len(sentences) > 1:
             numbered_steps = []
@@ -98,14 +220,48 @@ def clean_and_format_response(response: str, question: str) -> str:
     
     return response
 
-def process_with_llm(prompt: str, document_chunks: Optional[List[str]] = None) -> str:
-    """Process a prompt using the model and document chunks with improved relevance."""
+def answer_question(question: str, document_chunks: Optional[Sequence[str]] = None,
+                    chunk_embeddings: Optional[np.ndarray] = None,
+                    sentence_index: Optional[SentenceIndex] = None,
+                    question_embedding: Optional[np.ndarray] = None,
+                    vector_index: Optional[VectorIndex] = None,
+                    lexical_index: Optional[BM25Index] = None) -> str:
+    """
+    Answer a question from a document's chunks.
+
+    Retrieval works on the bare question: no prompt containing the document is
+    ever built, so the cost per question doesn't grow with the document beyond
+    the one matrix-vector product over chunk_embeddings.
+
+    Args:
+        question (str): The user's question
+        document_chunks (Sequence[str]): The document's chunks (a list or ChunkSpans)
+        chunk_embeddings (np.ndarray): Normalized chunk embeddings; computed when missing
+        sentence_index (SentenceIndex): Cached sentence spans and embeddings for the chunks
+        question_embedding (np.ndarray): Normalized question embedding, if already encoded
+        vector_index (VectorIndex): Index over chunk_embeddings; exact search when None
+        lexical_index (BM25Index): BM25 index over the chunks; enables hybrid ranking
+
+    Returns:
+        str: The formatted answer
+    """
     if not document_chunks:
         return "No document context available to answer this question."
     
     try:
-        question = prompt.split("Question:")[-1].strip() if "Question:" in prompt else prompt
-        relevant_chunks = extract_relevant_chunks(question, document_chunks, top_k=3)
+        if sentence_index is not None:
+            refined_text = refine_with_sentence_index(question, document_chunks, chunk_embeddings, sentence_index,
+                                                      question_embedding=question_embedding,
+                                                      vector_index=vector_index,
+                                                      lexical_index=lexical_index)
+            if refined_text is None:
+                return "I couldn't find relevant information in the document to answer this question."
+            with stage("formatting"):
+                return clean_and_format_response(refined_text, question)
+
+        relevant_chunks = extract_relevant_chunks(question, document_chunks, top_k=3,
+                                                  chunk_embeddings=chunk_embeddings,
+                                                  lexical_index=lexical_index)
         
         if not relevant_chunks:
             return "I couldn't find relevant information in the document to answer this question."
@@ -120,47 +276,135 @@ def process_with_llm(prompt: str, document_chunks: Optional[List[str]] = None) -
     except Exception as e:
         return f"Error processing question: {str(e)}"
 
-def generate_response(question: str, chunks: List[str]) -> str:
-    """Generate a response using the enhanced RAG system with improved prompt."""
-    system_prompt = f"""Answer the given question using ONLY the information provided in the supplied document content.
+def best_chunk_indices(similarities: np.ndarray, threshold: float = 0.2) -> np.ndarray:
+    """
+    Best chunk for each row of a (questions x chunks) similarity matrix.
+
+    Same choice as select_relevant_chunk_indices(...)[0]: the highest-scoring
+    chunk (first one on ties), or chunk 0 when nothing scores above threshold.
+    """
+    best = np.argmax(similarities, axis=1)
+    best[similarities[np.arange(len(best)), best] <= threshold] = 0
+    return best
 
-INSTRUCTIONS:
-• Be direct, concise, and accurate
-• Do NOT add any external knowledge or assumptions beyond the document
-• If the information is not present in the document, clearly state: "The document does not contain information about [topic]"
-• Remove section numbers, headings, or reference markers from answers
-• Use appropriate formatting based on question type:
+def answer_questions(questions: List[str], document_chunks: Optional[Sequence[str]] = None,
+                     chunk_embeddings: Optional[np.ndarray] = None,
+                     sentence_index: Optional[SentenceIndex] = None,
+                     question_embeddings: Optional[np.ndarray] = None, top_n: int = 2,
+                     vector_index: Optional[VectorIndex] = None,
+                     lexical_index: Optional[BM25Index] = None) -> List[str]:
+    """
+    Answer several questions about one document in a single batch.
 
-FOR DEFINITIONS ("what is", "define"):
-- Provide a clear, complete definition in 1-2 sentences
-- Bold key terms: **term**
+    All questions are encoded with one model call, scored against every chunk
+    with one matrix multiply, and the sentences of all the chosen chunks that
+    aren't cached yet are encoded with one more call. Answers match calling
+    answer_question for each question.
 
-FOR LISTS ("list", "what are", "name"):
-- Use bullet points (•) or numbered format
-- Be comprehensive but concise
-- Maximum 10 items
+    Args:
+        questions (List[str]): The user's questions
+        document_chunks (Sequence[str]): The document's chunks (a list or ChunkSpans)
+        chunk_embeddings (np.ndarray): Normalized chunk embeddings; computed when missing
+        sentence_index (SentenceIndex): Cached sentence spans and embeddings for the chunks
+        question_embeddings (np.ndarray): Normalized question embeddings, one row per question
+        top_n (int): Sentences kept from the best chunk
+        vector_index (VectorIndex): Index over chunk_embeddings; exact search when None
+        lexical_index (BM25Index): BM25 index over the chunks; enables hybrid ranking
 
-FOR PROCEDURES ("how", "steps", "process"):
-- Use numbered steps (1., 2., 3.)
-- Keep steps clear and actionable
-- Maximum 8 steps
+    Returns:
+        List[str]: One formatted answer per question, in order
+    """
+    if not questions:
+        return []
+    if not document_chunks:
+        return ["No document context available to answer this question."] * len(questions)
+
+    try:
+        if chunk_embeddings is None or len(chunk_embeddings) != len(document_chunks):
+            chunk_embeddings = embed_chunks(document_chunks)
+        if sentence_index is None:
+            sentence_index = SentenceIndex(document_chunks)
+        if question_embeddings is None:
+            with stage("question_encoding"):
+                question_embeddings = encode_texts(questions)
+
+        with stage("similarity_search"):
+            exact = vector_index is None or isinstance(vector_index, FlatIndex)
+            similarities = question_embeddings @ chunk_embeddings.T if exact else None
+            if exact and lexical_index is None:
+                best = best_chunk_indices(similarities)
+            else:
+                # Approximate indexes are searched per question; each search only touches a few lists.
+                # Hybrid ranking reuses the rows of the similarity matrix when it was computed
+                best = np.array([
+                    select_relevant_chunk_indices(q, chunk_embeddings, 1, vector_index, lexical_index, question,
+                                                  similarities[row] if exact else None)[0]
+                    for row, (question, q) in enumerate(zip(questions, question_embeddings))
+                ], dtype=np.intp)
+    except Exception as e:
+        return [f"Error processing question: {str(e)}"] * len(questions)
+
+    refined: List[Optional[str]] = [None] * len(questions)
+    try:
+        with stage("sentence_refinement"):
+            sentence_index.prefetch(best.tolist(), encode_texts)
+            # One product per distinct chunk scores its sentences against every question that chose it
+            for chunk_idx in np.unique(best):
+                rows = np.flatnonzero(best == chunk_idx)
+                sentences = sentence_index.sentences(int(chunk_idx))
+                scores = sentence_index.embeddings(int(chunk_idx), encode_texts) @ question_embeddings[rows].T
+                for column, row in enumerate(rows):
+                    top_indices = np.argsort(-scores[:, column], kind="stable")[:top_n]
+                    refined[row] = ' '.join(sentences[idx] for idx in top_indices).strip()
+    except Exception as e:
+        print(f"Error extracting sentences: {e}")
 
-FOR IDENTIFICATION ("who", "which", "where"):
-- State only what's explicitly mentioned
-- Be specific and factual
+    with stage("formatting"):
+        return [
+            clean_and_format_response(text if text is not None else document_chunks[int(best[row])], question)
+            for row, (question, text) in enumerate(zip(questions, refined))
+        ]
 
-AVOID:
-- Phrases like "Based on the document" or "According to the text"
-- Adding information not in the source
-- Overly complex explanations
-- Repetitive content
+def answer_question_lexical(question: str, document_chunks: Optional[Sequence[str]],
+                            lexical_index: BM25Index, sentence_index: Optional[SentenceIndex] = None,
+                            top_n: int = 2) -> str:
+    """
+    Answer a question with BM25 alone.
+
+    Needs no embedding model, so it also serves as the degraded mode when the
+    model can't be loaded or the embedding pool is overloaded: the best BM25
+    chunk is picked and its sentences ranked by the IDF of the question terms
+    they contain.
+    """
+    if not document_chunks:
+        return "No document context available to answer this question."
 
-Question: {question}
+    with stage("lexical_search"):
+        indices, _ = lexical_index.search(question, 1)
+    if not len(indices):
+        return "I couldn't find relevant information in the document to answer this question."
+    chunk_idx = int(indices[0])
+    if sentence_index is None:
+        sentence_index = SentenceIndex(document_chunks)
+    with stage("sentence_refinement"):
+        sentences = sentence_index.sentences(chunk_idx)
+        top_indices = top_k_indices(lexical_index.rank_texts(question, sentences), top_n)
+    with stage("formatting"):
+        return clean_and_format_response(' '.join(sentences[idx] for idx in top_indices).strip(), question)
 
-Document Content: {' '.join(chunks)}
+def process_with_llm(prompt: str, document_chunks: Optional[List[str]] = None,
+                     chunk_embeddings: Optional[np.ndarray] = None,
+                     sentence_index: Optional[SentenceIndex] = None,
+                     question_embedding: Optional[np.ndarray] = None) -> str:
+    """Process a prompt ending in "Question: ..." using the document chunks; see answer_question."""
+    question = prompt.split("Question:")[-1].strip() if "Question:" in prompt else prompt
+    return answer_question(question, document_chunks, chunk_embeddings, sentence_index, question_embedding)
 
-Answer:"""
-    return process_with_llm(system_prompt, chunks)
+def generate_response(question: str, chunks: List[str], chunk_embeddings: Optional[np.ndarray] = None,
+                      sentence_index: Optional[SentenceIndex] = None,
+                      question_embedding: Optional[np.ndarray] = None) -> str:
+    """Generate a response to a question, or to a prompt ending in "Question: ..."; see answer_question."""
+    return process_with_llm(question, chunks, chunk_embeddings, sentence_index, question_embedding)
 
 async def process_chunk_with_llm_async(prompt: str, chunks: List[str]) -> str:
     """Async version of the LLM processing function."""
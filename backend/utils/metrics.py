@@ -0,0 +1,165 @@
+# utils/metrics.py
+
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Share of requests (and of stages run outside a request, e.g. ingestion) whose stages are timed
+STAGE_SAMPLE_RATE = float(os.getenv("METRICS_STAGE_SAMPLE_RATE", "1.0"))
+
+# Seconds; covers a cached answer (~1 ms) up to ingesting a large PDF
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INF_LABEL = 'le="+Inf"'
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label combination, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values_by_labels = sorted(self._values.items())
+        for values, count in values_by_labels:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {count:g}")
+        return lines
+
+
+class Histogram:
+    """Durations in seconds per label combination, with cumulative buckets as Prometheus expects."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values: str, seconds: float) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for idx, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][idx] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((values, [list(s[0]), s[1], s[2]]) for values, s in self._series.items())
+        for values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, values, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+request_seconds = Histogram("rag_request_duration_seconds", "HTTP request latency by endpoint, to the last byte.",
+                            ("endpoint",))
+requests_total = Counter("rag_requests_total", "HTTP requests by endpoint and status code.", ("endpoint", "status"))
+stage_seconds = Histogram("rag_stage_duration_seconds", "Time spent in each pipeline stage (sampled).", ("stage",))
+
+
+class Trace:
+    """Stage timings of one request; stages run several times (e.g. per question) are summed."""
+
+    __slots__ = ("sampled", "stages")
+
+    def __init__(self, sampled: bool):
+        self.sampled = sampled
+        self.stages: Dict[str, float] = {}
+
+    def server_timing(self) -> str:
+        """The stages as a Server-Timing header value, in milliseconds."""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items())
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("rag_trace", default=None)
+
+
+def start_trace(sampled: bool) -> Tuple[Trace, contextvars.Token]:
+    """Make a new trace current for this request; pass the token to end_trace."""
+    trace = Trace(sampled)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: contextvars.Token) -> None:
+    _current_trace.reset(token)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a stage timed elsewhere (e.g. a wait measured across a pipeline)."""
+    stage_seconds.observe(name, seconds=seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.stages[name] = trace.stages.get(name, 0.0) + seconds
+
+
+def is_sampled() -> bool:
+    """Whether to time stages now: the current request's decision, or a fresh draw outside a request."""
+    trace = _current_trace.get()
+    return trace.sampled if trace is not None else random.random() < STAGE_SAMPLE_RATE
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into rag_stage_duration_seconds and the current trace, when sampled."""
+    if not is_sampled():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def render_gauges(prefix: str, stats: Dict[str, object]) -> List[str]:
+    """Numeric entries of a stats() dict as gauges named prefix_key; nested and non-numeric ones are skipped."""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f"# TYPE {prefix}_{key} gauge")
+        lines.append(f"{prefix}_{key} {value:g}")
+    return lines
+
+
+def render_metrics(gauges: Optional[Dict[str, Dict[str, object]]] = None) -> str:
+    """Everything recorded so far, plus gauges per prefix, in the Prometheus text exposition format."""
+    lines = request_seconds.render() + requests_total.render() + stage_seconds.render()
+    for prefix, stats in (gauges or {}).items():
+        lines += render_gauges(prefix, stats)
+    return "\n".join(lines) + "\n"
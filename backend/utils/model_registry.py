@@ -0,0 +1,109 @@
+# utils/model_registry.py
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+def _rss_bytes() -> Optional[int]:
+    """Return the current resident set size of this process in bytes, if available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _parameter_bytes(model: Any) -> Optional[int]:
+    """Return the size of a model's parameters in bytes, if it exposes them."""
+    parameters = getattr(model, "parameters", None)
+    if parameters is None:
+        return None
+    try:
+        return sum(p.numel() * p.element_size() for p in parameters())
+    except Exception:
+        return None
+
+
+class ModelRegistry:
+    """
+    Process-wide registry that loads each model once and shares it across threads.
+
+    Concurrent callers asking for a model that is still loading wait on a
+    per-model lock instead of starting a second load.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._loading_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, name: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the model registered under name, loading it with loader on first use.
+
+        Args:
+            name (str): Registry key, usually the model repository name
+            loader (Callable): Zero-argument function that builds the model
+
+        Returns:
+            Any: The shared model instance
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            loading_lock = self._loading_locks.setdefault(name, threading.Lock())
+
+        with loading_lock:
+            model = self._models.get(name)
+            if model is not None:
+                return model
+
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - started
+            rss_after = _rss_bytes()
+
+            self._record(name, model, load_seconds, rss_before, rss_after)
+            self._models[name] = model
+            print(f"Loaded model {name} in {load_seconds:.2f}s")
+            return model
+
+    def register(self, name: str, model: Any) -> None:
+        """Register an already-built model, e.g. a local stand-in for benchmarks."""
+        with self._lock:
+            self._record(name, model, 0.0, None, None)
+            self._models[name] = model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def unload(self, name: str) -> None:
+        with self._lock:
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return load time and memory footprint for every loaded model."""
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def _record(self, name, model, load_seconds, rss_before, rss_after) -> None:
+        rss_delta = None
+        if rss_before is not None and rss_after is not None:
+            rss_delta = max(rss_after - rss_before, 0)
+        self._stats[name] = {
+            "load_seconds": round(load_seconds, 3),
+            "parameter_bytes": _parameter_bytes(model),
+            "backend": getattr(model, "inference_backend", None),
+            "rss_delta_bytes": rss_delta,
+            "loaded_at": time.time(),
+        }
+
+
+# Shared by every module in this process
+model_registry = ModelRegistry()
@@ -0,0 +1,360 @@
+# utils/notebook_store.py
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .chunks import ChunkSpans
+from .document_store import DocumentArtifacts
+from .sentence_index import SentenceIndex
+
+# Metadata columns every backend returns for a notebook
+NOTEBOOK_FIELDS = ("notebook_id", "title", "pdf_filename", "created_at", "status", "job_id", "document_hash")
+
+
+class NotebookNotFoundError(KeyError):
+    """The notebook doesn't exist (e.g. another worker deleted it)."""
+
+
+class NotebookStore(ABC):
+    """
+    Durable storage for notebooks, their Q&A log and their documents.
+
+    Notebook metadata and documents are stored separately: documents are keyed
+    by the SHA-256 of the PDF and shared by every notebook built from it, and
+    are only deleted with the last notebook that uses them.
+    """
+
+    @abstractmethod
+    def create_notebook(self, notebook: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get_notebook(self, notebook_id: str) -> Optional[Dict[str, Any]]:
+        """Return the notebook's metadata (NOTEBOOK_FIELDS) or None."""
+
+    @abstractmethod
+    def update_notebook(self, notebook_id: str, **fields: Any) -> None:
+        ...
+
+    @abstractmethod
+    def list_notebooks(self) -> List[Dict[str, Any]]:
+        """Return metadata plus questions_count for every notebook, oldest first."""
+
+    @abstractmethod
+    def count_notebooks(self) -> int:
+        ...
+
+    @abstractmethod
+    def delete_notebook(self, notebook_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def add_answer(self, notebook_id: str, question: str, answer: str, created_at: str) -> Tuple[int, int]:
+        """Append a Q&A pair; returns (question_id, total_questions). Raises NotebookNotFoundError."""
+
+    @abstractmethod
+    def get_answers(self, notebook_id: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def save_document(self, document: DocumentArtifacts) -> None:
+        """Persist a document's text, chunks and embeddings if not already stored."""
+
+    @abstractmethod
+    def load_document(self, document_hash: str) -> Optional[DocumentArtifacts]:
+        ...
+
+    def load_embeddings(self, document_hash: str) -> Optional[np.ndarray]:
+        """The stored embedding matrix, memory-mapped where the backend supports it; None if not stored."""
+        return None
+
+
+class InMemoryNotebookStore(NotebookStore):
+    """Process-local backend; nothing survives a restart. Useful for tests and benchmarks."""
+
+    def __init__(self):
+        self._notebooks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._answers: Dict[str, List[Dict[str, Any]]] = {}
+        self._documents: Dict[str, DocumentArtifacts] = {}
+        self._lock = threading.Lock()
+
+    def create_notebook(self, notebook: Dict[str, Any]) -> None:
+        with self._lock:
+            self._notebooks[notebook["notebook_id"]] = {field: notebook.get(field) for field in NOTEBOOK_FIELDS}
+            self._answers[notebook["notebook_id"]] = []
+
+    def get_notebook(self, notebook_id: str) -> Optional[Dict[str, Any]]:
+        notebook = self._notebooks.get(notebook_id)
+        return dict(notebook) if notebook is not None else None
+
+    def update_notebook(self, notebook_id: str, **fields: Any) -> None:
+        with self._lock:
+            if notebook_id in self._notebooks:
+                self._notebooks[notebook_id].update(fields)
+
+    def list_notebooks(self) -> List[Dict[str, Any]]:
+        return [dict(notebook, questions_count=len(self._answers.get(notebook_id, [])))
+                for notebook_id, notebook in list(self._notebooks.items())]
+
+    def count_notebooks(self) -> int:
+        return len(self._notebooks)
+
+    def delete_notebook(self, notebook_id: str) -> bool:
+        with self._lock:
+            notebook = self._notebooks.pop(notebook_id, None)
+            if notebook is None:
+                return False
+            self._answers.pop(notebook_id, None)
+            document_hash = notebook.get("document_hash")
+            if document_hash and not any(n.get("document_hash") == document_hash for n in self._notebooks.values()):
+                self._documents.pop(document_hash, None)
+            return True
+
+    def add_answer(self, notebook_id: str, question: str, answer: str, created_at: str) -> Tuple[int, int]:
+        with self._lock:
+            answers = self._answers.get(notebook_id)
+            if answers is None:
+                raise NotebookNotFoundError(notebook_id)
+            question_id = len(answers) + 1
+            answers.append({"question": question, "answer": answer,
+                            "question_id": question_id, "created_at": created_at})
+            return question_id, len(answers)
+
+    def get_answers(self, notebook_id: str) -> List[Dict[str, Any]]:
+        return list(self._answers.get(notebook_id, []))
+
+    def save_document(self, document: DocumentArtifacts) -> None:
+        self._documents.setdefault(document.document_hash, document)
+
+    def load_document(self, document_hash: str) -> Optional[DocumentArtifacts]:
+        return self._documents.get(document_hash)
+
+
+class SQLiteNotebookStore(NotebookStore):
+    """
+    Embedded SQLite backend shared by every worker process on the host.
+
+    Metadata, the Q&A log, document text and chunks (offsets into that text and
+    page) live in tables; each document's embedding matrix is a .npy file next to the
+    database that is memory-mapped on load, so only the pages a query touches
+    are read into RAM.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS notebooks (
+            notebook_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            pdf_filename TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'ready',
+            job_id TEXT,
+            document_hash TEXT
+        );
+        CREATE INDEX IF NOT EXISTS notebooks_document ON notebooks (document_hash);
+        CREATE TABLE IF NOT EXISTS questions_answers (
+            notebook_id TEXT NOT NULL REFERENCES notebooks (notebook_id) ON DELETE CASCADE,
+            question_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (notebook_id, question_id)
+        );
+        CREATE TABLE IF NOT EXISTS documents (
+            document_hash TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            chunk_count INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS chunks (
+            document_hash TEXT NOT NULL REFERENCES documents (document_hash) ON DELETE CASCADE,
+            chunk_index INTEGER NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            page INTEGER,
+            PRIMARY KEY (document_hash, chunk_index)
+        );
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.embeddings_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), "embeddings")
+        os.makedirs(self.embeddings_dir, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+        self._drop_chunk_text()
+
+    def _drop_chunk_text(self) -> None:
+        """Databases from before chunks were spans also hold each chunk's text; drop that copy."""
+        conn = self._connection()
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(chunks)")}
+        if "text" in columns:
+            try:
+                with conn:
+                    conn.execute("ALTER TABLE chunks DROP COLUMN text")
+            except sqlite3.OperationalError:
+                # Another worker dropped it first
+                if "text" in {row["name"] for row in conn.execute("PRAGMA table_info(chunks)")}:
+                    raise
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers in other workers run alongside a writer."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _embeddings_path(self, document_hash: str) -> str:
+        return os.path.join(self.embeddings_dir, f"{document_hash}.npy")
+
+    def create_notebook(self, notebook: Dict[str, Any]) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO notebooks (notebook_id, title, pdf_filename, created_at, status, job_id, document_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                tuple(notebook.get(field) if field != "status" else notebook.get(field, "ready")
+                      for field in NOTEBOOK_FIELDS)
+            )
+
+    def get_notebook(self, notebook_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"SELECT {', '.join(NOTEBOOK_FIELDS)} FROM notebooks WHERE notebook_id = ?", (notebook_id,)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def update_notebook(self, notebook_id: str, **fields: Any) -> None:
+        columns = [field for field in fields if field in NOTEBOOK_FIELDS and field != "notebook_id"]
+        if not columns:
+            return
+        with self._connection() as conn:
+            conn.execute(
+                f"UPDATE notebooks SET {', '.join(f'{c} = ?' for c in columns)} WHERE notebook_id = ?",
+                tuple(fields[c] for c in columns) + (notebook_id,)
+            )
+
+    def list_notebooks(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            f"SELECT {', '.join('n.' + f for f in NOTEBOOK_FIELDS)}, "
+            "(SELECT COUNT(*) FROM questions_answers qa WHERE qa.notebook_id = n.notebook_id) AS questions_count "
+            "FROM notebooks n ORDER BY n.created_at"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_notebooks(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM notebooks").fetchone()[0]
+
+    def delete_notebook(self, notebook_id: str) -> bool:
+        orphaned = None
+        with self._connection() as conn:
+            row = conn.execute("SELECT document_hash FROM notebooks WHERE notebook_id = ?", (notebook_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM notebooks WHERE notebook_id = ?", (notebook_id,))
+            document_hash = row["document_hash"]
+            if document_hash is not None:
+                still_used = conn.execute(
+                    "SELECT 1 FROM notebooks WHERE document_hash = ? LIMIT 1", (document_hash,)
+                ).fetchone()
+                if still_used is None:
+                    conn.execute("DELETE FROM documents WHERE document_hash = ?", (document_hash,))
+                    orphaned = document_hash
+        if orphaned is not None:
+            try:
+                os.remove(self._embeddings_path(orphaned))
+            except OSError:
+                pass
+        return True
+
+    def add_answer(self, notebook_id: str, question: str, answer: str, created_at: str) -> Tuple[int, int]:
+        with self._connection() as conn:
+            # Numbering happens inside the INSERT so concurrent workers can't reuse an ID
+            try:
+                conn.execute(
+                    "INSERT INTO questions_answers (notebook_id, question_id, question, answer, created_at) "
+                    "SELECT ?, COALESCE(MAX(question_id), 0) + 1, ?, ?, ? FROM questions_answers "
+                    "WHERE notebook_id = ?",
+                    (notebook_id, question, answer, created_at, notebook_id)
+                )
+            except sqlite3.IntegrityError as e:
+                # The FOREIGN KEY check: the notebook was deleted, possibly by another worker
+                raise NotebookNotFoundError(notebook_id) from e
+            question_id, total = conn.execute(
+                "SELECT MAX(question_id), COUNT(*) FROM questions_answers WHERE notebook_id = ?", (notebook_id,)
+            ).fetchone()
+            return question_id, total
+
+    def get_answers(self, notebook_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT question, answer, question_id, created_at FROM questions_answers "
+            "WHERE notebook_id = ? ORDER BY question_id", (notebook_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_document(self, document: DocumentArtifacts) -> None:
+        conn = self._connection()
+        exists = conn.execute(
+            "SELECT 1 FROM documents WHERE document_hash = ?", (document.document_hash,)
+        ).fetchone()
+        if exists is not None and os.path.exists(self._embeddings_path(document.document_hash)):
+            return
+
+        # Write the matrix first so a stored document always has its embeddings
+        path = self._embeddings_path(document.document_hash)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(document.embeddings, dtype=np.float32))
+        os.replace(tmp_path, path)
+
+        chunks = document.chunks
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO documents (document_hash, text, chunk_count) VALUES (?, ?, ?)",
+                (document.document_hash, document.text, len(document.chunks))
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunks (document_hash, chunk_index, start_offset, end_offset, page) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((document.document_hash, idx, *chunks.span(idx)) for idx in range(len(chunks)))
+            )
+
+    def load_document(self, document_hash: str) -> Optional[DocumentArtifacts]:
+        conn = self._connection()
+        row = conn.execute("SELECT text FROM documents WHERE document_hash = ?", (document_hash,)).fetchone()
+        if row is None:
+            return None
+        rows = conn.execute(
+            "SELECT start_offset, end_offset, page FROM chunks WHERE document_hash = ? ORDER BY chunk_index",
+            (document_hash,)
+        ).fetchall()
+        # Chunks are rebuilt as spans into the document text rather than read back as copies
+        chunks = ChunkSpans(row["text"])
+        for start, end, page in rows:
+            chunks.append(start, end, page)
+        embeddings = self.load_embeddings(document_hash)
+        if embeddings is None:
+            return None
+        return DocumentArtifacts(document_hash, chunks.text, chunks, embeddings, SentenceIndex(chunks))
+
+    def load_embeddings(self, document_hash: str) -> Optional[np.ndarray]:
+        try:
+            return np.load(self._embeddings_path(document_hash), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+
+def create_notebook_store(backend: str, db_path: str) -> NotebookStore:
+    """Build the configured backend: 'sqlite' (default) or 'memory'."""
+    if backend == "memory":
+        return InMemoryNotebookStore()
+    if backend == "sqlite":
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        return SQLiteNotebookStore(db_path)
+    raise ValueError(f"Unknown notebook store backend: {backend}")
@@ -0,0 +1,86 @@
+# utils/pdf_extract.py
+
+import tempfile
+from concurrent.futures import Executor
+from typing import Iterator, List, Optional, Tuple, Union
+import fitz
+
+
+def extract_pdf_text(pdf_bytes: bytes) -> str:
+    """
+    Extract the text of every page of a PDF.
+
+    Args:
+        pdf_bytes (bytes): Raw PDF file content
+
+    Returns:
+        str: Text of all pages concatenated in page order
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return "".join(page.get_text() for page in doc)
+
+
+def _open(source: Union[bytes, str]):
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    with _open(pdf_bytes) as doc:
+        return doc.page_count
+
+
+def extract_page_range(source: Union[bytes, str], first: int, last: int) -> List[str]:
+    """
+    Extract the text of pages first..last-1 (zero-based).
+
+    Runs in a worker process, so the PDF is passed as a file path (or bytes)
+    and every worker opens its own document.
+    """
+    with _open(source) as doc:
+        return [doc[page_no].get_text() for page_no in range(first, last)]
+
+
+def iter_page_texts(pdf_bytes: bytes, executor: Optional[Executor] = None,
+                    pages_per_task: int = 8) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for every page, in order, numbering pages from 1.
+
+    With an executor, page ranges are extracted in parallel and yielded as soon
+    as each range (and all earlier ones) is done, so the consumer can start on
+    the first pages while later ones are still being extracted.
+
+    Args:
+        pdf_bytes (bytes): Raw PDF file content
+        executor (Executor): Pool to spread page ranges over; extract inline when None
+        pages_per_task (int): Number of pages per worker task
+
+    Yields:
+        Tuple[int, str]: Page number and that page's text
+    """
+    page_count = count_pages(pdf_bytes)
+    if executor is None or page_count <= pages_per_task:
+        with _open(pdf_bytes) as doc:
+            for page_no, page in enumerate(doc, 1):
+                yield page_no, page.get_text()
+        return
+
+    # Workers open the PDF from disk rather than receiving a copy of the bytes each
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        pdf_file.write(pdf_bytes)
+        pdf_file.flush()
+
+        futures = [
+            executor.submit(extract_page_range, pdf_file.name, first, min(first + pages_per_task, page_count))
+            for first in range(0, page_count, pages_per_task)
+        ]
+        try:
+            page_no = 1
+            for future in futures:
+                for text in future.result():
+                    yield page_no, text
+                    page_no += 1
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,56 @@
+# utils/quantization.py
+
+from typing import Optional
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8")
+
+
+class QuantizedEmbeddings:
+    """
+    Reduced-precision copy of a normalized embedding matrix.
+
+    float16 halves the memory of float32. int8 quarters it: each vector is
+    stored with its own float32 scale (largest absolute component / 127), so
+    every row uses the full int8 range. Scores are computed in blocks that are
+    widened to float32 on the fly, so a query never materializes the whole
+    matrix at full precision (blocks are kept small enough to stay in cache).
+    """
+
+    def __init__(self, embeddings: np.ndarray, precision: str = "int8", block_rows: int = 256):
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"Unsupported quantized precision: {precision}")
+        self.precision = precision
+        self.block_rows = block_rows
+        self.scales: Optional[np.ndarray] = None
+
+        if precision == "float16":
+            self.codes = np.asarray(embeddings, dtype=np.float16)
+            return
+
+        n = len(embeddings)
+        self.codes = np.empty(embeddings.shape, dtype=np.int8)
+        self.scales = np.empty(n, dtype=np.float32)
+        for start in range(0, n, block_rows):
+            block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+            scales = np.abs(block).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.codes[start:start + block_rows] = np.rint(block / scales[:, None]).astype(np.int8)
+            self.scales[start:start + block_rows] = scales
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate inner product of every vector with query."""
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.block_rows):
+            scores[start:start + self.block_rows] = self.codes[start:start + self.block_rows].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
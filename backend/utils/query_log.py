@@ -0,0 +1,70 @@
+# utils/query_log.py
+
+import contextvars
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Operation recorded for each (method, route template); other requests aren't logged
+OPERATIONS = {
+    ("POST", "/hackrx/create-notebook"): "create",
+    ("POST", "/hackrx/query-notebook"): "query",
+    ("GET", "/hackrx/notebooks"): "list",
+    ("GET", "/hackrx/notebooks/{notebook_id}"): "get",
+    ("DELETE", "/hackrx/notebooks/{notebook_id}"): "delete",
+}
+
+_current_entry: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("query_log_entry",
+                                                                                          default=None)
+
+
+def annotate(**fields: Any) -> None:
+    """Add fields to the current request's log entry; does nothing when the request isn't being logged."""
+    entry = _current_entry.get()
+    if entry is not None:
+        entry.update(fields)
+
+
+class QueryLogRecorder:
+    """
+    Appends one compact JSON line per notebook API request, for replay by benchmarks.replay.
+
+    Lines hold the offset from the start of the log in seconds ("t"), the
+    operation, the notebook ID ("nb"), the question for queries, the page count,
+    size and hash of uploaded PDFs (not their bytes), the status code and the
+    latency in milliseconds.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.records = 0
+
+    def begin(self) -> contextvars.Token:
+        """Start collecting fields for the current request; pass the token to finish."""
+        return _current_entry.set({"t": round(time.monotonic() - self._started, 3)})
+
+    def finish(self, token: contextvars.Token, method: str, route: Optional[str], path_params: Dict[str, str],
+               status: int, latency_s: float) -> None:
+        """Write the current request's entry if it is one of OPERATIONS."""
+        entry = _current_entry.get()
+        _current_entry.reset(token)
+        operation = OPERATIONS.get((method, route))
+        if entry is None or operation is None:
+            return
+        entry["op"] = operation
+        if "notebook_id" in path_params:
+            entry.setdefault("nb", path_params["notebook_id"])
+        entry["status"] = status
+        entry["ms"] = round(latency_s * 1000, 2)
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,143 @@
+# utils/resident_set.py
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class _Entry:
+    __slots__ = ("value", "charge_key", "pinned")
+
+    def __init__(self, value: Any, charge_key: str, pinned: bool):
+        self.value = value
+        self.charge_key = charge_key
+        self.pinned = pinned
+
+
+class ResidentSet:
+    """
+    Byte-budgeted LRU of values whose durable copy lives in a backing store.
+
+    Each entry is charged for the bytes it holds in memory. Entries that share
+    the same underlying data (notebooks built from the same PDF) pass the same
+    share_key and are charged once. When resident bytes exceed max_bytes the
+    least recently used unpinned entries are evicted and on_evict is called so
+    the caller can drop what they hold; they are reloaded on the next miss. The
+    most recently used entry is never evicted, so one value larger than the
+    whole budget still stays resident while it is in use.
+    """
+
+    def __init__(self, max_bytes: int, on_evict: Optional[Callable[[Any], None]] = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._charges: Dict[str, list] = {}  # charge key -> [entries sharing it, bytes]
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a resident value and mark it most recently used; counts a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Return a resident value without touching the LRU order or the counters."""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def put(self, key: str, value: Any, nbytes: int, share_key: Optional[str] = None,
+            pinned: bool = False) -> None:
+        """Make a value resident, evicting others if the budget is exceeded."""
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._uncharge(previous)
+                if previous.value is not value:
+                    evicted.append(previous.value)
+            entry = _Entry(value, share_key or f"entry:{key}", pinned)
+            self._entries[key] = entry
+            charge = self._charges.setdefault(entry.charge_key, [0, 0])
+            charge[0] += 1
+            self._set_charge(charge, nbytes)
+            evicted.extend(self._evict_over_budget(key))
+        self._notify(evicted)
+
+    def resize(self, key: str, nbytes: int) -> None:
+        """Update the bytes charged for a resident value (e.g. after lazily cached data grew)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            self._set_charge(self._charges[entry.charge_key], nbytes)
+            evicted = self._evict_over_budget(key)
+        self._notify(evicted)
+
+    def unpin(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.pinned = False
+
+    def pop(self, key: str) -> Optional[Any]:
+        """Drop a value (e.g. when it is deleted); on_evict is still called."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._uncharge(entry)
+        if entry is None:
+            return None
+        self._notify([entry.value])
+        return entry.value
+
+    def _set_charge(self, charge: list, nbytes: int) -> None:
+        self.resident_bytes += nbytes - charge[1]
+        charge[1] = nbytes
+
+    def _uncharge(self, entry: _Entry) -> None:
+        charge = self._charges[entry.charge_key]
+        charge[0] -= 1
+        if charge[0] == 0:
+            self.resident_bytes -= charge[1]
+            del self._charges[entry.charge_key]
+
+    def _evict_over_budget(self, keep: str) -> list:
+        evicted = []
+        for key in list(self._entries):
+            if self.resident_bytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if key == keep or entry.pinned:
+                continue
+            del self._entries[key]
+            self._uncharge(entry)
+            self.evictions += 1
+            evicted.append(entry.value)
+        return evicted
+
+    def _notify(self, values: list) -> None:
+        if self.on_evict is not None:
+            for value in values:
+                self.on_evict(value)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "resident_entries": len(self._entries),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,103 @@
+# utils/sentence_index.py
+
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Same boundary rule the answer refinement step has always used
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?]) +')
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Return (start, end) offsets of the sentences in text.
+
+    Slicing text with these spans gives exactly re.split(r'(?<=[.!?]) +', text).
+    """
+    spans = []
+    start = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return spans
+
+
+class SentenceIndex:
+    """
+    Sentence spans for every chunk of a notebook, with embeddings cached per chunk.
+
+    A chunk's spans and sentence embeddings are computed the first time that
+    chunk is refined and reused for every later question. chunks may keep
+    growing (a notebook that is still being ingested); indexes stay valid.
+    """
+
+    def __init__(self, chunks: Sequence[str]):
+        self.chunks = chunks
+        self._spans: Dict[int, List[Tuple[int, int]]] = {}
+        self._embeddings: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def spans(self, chunk_idx: int) -> List[Tuple[int, int]]:
+        spans = self._spans.get(chunk_idx)
+        if spans is None:
+            spans = self._spans.setdefault(chunk_idx, sentence_spans(self.chunks[chunk_idx]))
+        return spans
+
+    def sentences(self, chunk_idx: int) -> List[str]:
+        chunk = self.chunks[chunk_idx]
+        return [chunk[start:end] for start, end in self.spans(chunk_idx)]
+
+    def embeddings(self, chunk_idx: int, encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return the normalized sentence embeddings of a chunk, encoding them on first use."""
+        cached = self._embeddings.get(chunk_idx)
+        if cached is not None:
+            return cached
+
+        embeddings = np.ascontiguousarray(encode(self.sentences(chunk_idx)), dtype=np.float32)
+        with self._lock:
+            cached = self._embeddings.setdefault(chunk_idx, embeddings)
+            if cached is embeddings:
+                self._nbytes += embeddings.nbytes
+            return cached
+
+    def cached_embeddings(self, chunk_idx: int) -> Optional[np.ndarray]:
+        """The chunk's sentence embeddings if they were already encoded, without encoding them."""
+        return self._embeddings.get(chunk_idx)
+
+    def prefetch(self, chunk_indices: Iterable[int], encode: Callable[[List[str]], np.ndarray]) -> None:
+        """Encode the sentences of every uncached chunk in chunk_indices with a single encode call."""
+        missing = sorted({idx for idx in chunk_indices if idx not in self._embeddings})
+        if not missing:
+            return
+        sentences = [self.sentences(idx) for idx in missing]
+        flat = [sentence for chunk_sentences in sentences for sentence in chunk_sentences]
+        embeddings = np.ascontiguousarray(encode(flat), dtype=np.float32)
+        offset = 0
+        with self._lock:
+            for idx, chunk_sentences in zip(missing, sentences):
+                block = embeddings[offset:offset + len(chunk_sentences)]
+                offset += len(chunk_sentences)
+                if self._embeddings.setdefault(idx, block) is block:
+                    self._nbytes += block.nbytes
+
+    def top_sentences(self, chunk_idx: int, question_embedding: np.ndarray,
+                      encode: Callable[[List[str]], np.ndarray], top_n: int = 2) -> List[str]:
+        """Return the top_n sentences of a chunk ranked by similarity to the question."""
+        sentences = self.sentences(chunk_idx)
+        similarities = self.embeddings(chunk_idx, encode) @ question_embedding
+        top_indices = np.argsort(-similarities, kind="stable")[:top_n]
+        return [sentences[idx] for idx in top_indices]
+
+    @property
+    def cached_chunks(self) -> int:
+        return len(self._embeddings)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
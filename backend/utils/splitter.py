@@ -1,33 +1,83 @@
 # utils/splitter.py
 
 import re
-from typing import List
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-def semantic_split(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+# Every candidate break position in one pass; a break goes right after the match
+BOUNDARY_PATTERN = re.compile(r'[.!?;:,](?=\s)|\s')
+
+class BoundaryIndex:
     """
-    Split text into semantic chunks based on sentences and paragraphs.
-    
+    Sorted break positions of a text, grouped by kind.
+
+    Built with a single regex pass so that each chunk's break point is a binary
+    search instead of a backwards character scan.
+    """
+
+    __slots__ = ("sentence", "paragraph", "clause", "word")
+
+    def __init__(self, text: str):
+        self.sentence: List[int] = []
+        self.paragraph: List[int] = []
+        self.clause: List[int] = []
+        self.word: List[int] = []
+        for match in BOUNDARY_PATTERN.finditer(text):
+            char = match.group()
+            position = match.end()
+            if char in '.!?':
+                self.sentence.append(position)
+            elif char in ';:,':
+                self.clause.append(position)
+            else:
+                if char == '\n':
+                    self.paragraph.append(position)
+                self.word.append(position)
+
+def _last_break(positions: List[int], lower: int, end: int) -> int:
+    """Largest break position b with lower + 1 < b <= end, or -1."""
+    idx = bisect_right(positions, end) - 1
+    if idx >= 0 and positions[idx] >= lower + 2:
+        return positions[idx]
+    return -1
+
+def normalize_text(text: str) -> str:
+    """Collapse every whitespace run to a single space and strip the ends."""
+    text = re.sub(r'\n+', '\n', text)  # Remove multiple newlines
+    text = re.sub(r'\s+', ' ', text)   # Normalize whitespace
+    return text.strip()
+
+def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Offsets of text[start:end].strip() for normalized text (single spaces only)."""
+    if start < end and text[start].isspace():
+        start += 1
+    if end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def chunk_spans(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[Tuple[int, int]]:
+    """
+    Compute the (start, end) offsets of the semantic chunks of normalized text.
+
     Args:
-        text (str): The input text to split
+        text (str): Text already passed through normalize_text
         chunk_size (int): Maximum size of each chunk in characters
         overlap (int): Number of characters to overlap between chunks
-        
+
     Returns:
-        List[str]: List of text chunks
+        List[Tuple[int, int]]: Offsets such that text[start:end] is each chunk
     """
-    if not text or not text.strip():
+    if not text:
         return []
-    
-    # Clean the text
-    text = re.sub(r'\n+', '\n', text)  # Remove multiple newlines
-    text = re.sub(r'\s+', ' ', text)   # Normalize whitespace
-    text = text.strip()
-    
+
     # If text is smaller than chunk_size, return as single chunk
     if len(text) <= chunk_size:
-        return [text]
+        return [(0, len(text))]
     
-    chunks = []
+    # The break search windows are relative to the whole text, so past ~4x chunk_size
+    # they are always empty and every chunk is cut at chunk_size; skip the index then
+    boundaries = BoundaryIndex(text) if len(text) // 4 < chunk_size - 1 else None
+    spans = []
     start = 0
     
     while start < len(text):
@@ -36,19 +86,17 @@ def semantic_split(text: str, chunk_size: int = 1000, overlap: int = 100) -> Lis
         
         if end >= len(text):
             # Last chunk
-            chunks.append(text[start:].strip())
+            spans.append(_trim(text, start, len(text)))
             break
         
         # Try to find a good breaking point
-        break_point = find_break_point(text, start, end)
+        break_point = find_break_point(text, start, end, boundaries)
         
         if break_point == -1:
             # No good break point found, use the end position
             break_point = end
         
-        chunk = text[start:break_point].strip()
-        if chunk:
-            chunks.append(chunk)
+        spans.append(_trim(text, start, break_point))
         
         # Move start position with overlap
         start = max(break_point - overlap, start + 1)
@@ -57,9 +105,109 @@ def semantic_split(text: str, chunk_size: int = 1000, overlap: int = 100) -> Lis
         if start >= break_point:
             start = break_point
     
-    return [chunk for chunk in chunks if chunk.strip()]
+    return [(s, e) for s, e in spans if s < e]
+
+def semantic_split(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+    """
+    Split text into semantic chunks based on sentences and paragraphs.
+    
+    Args:
+        text (str): The input text to split
+        chunk_size (int): Maximum size of each chunk in characters
+        overlap (int): Number of characters to overlap between chunks
+        
+    Returns:
+        List[str]: List of text chunks
+    """
+    if not text or not text.strip():
+        return []
+    
+    text = normalize_text(text)
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, overlap)]
 
-def find_break_point(text: str, start: int, end: int) -> int:
+def iter_chunk_spans(pages: Iterable[Tuple[int, str]], chunk_size: int = 1000,
+                     overlap: int = 100) -> Iterator[Tuple[str, int, int, int]]:
+    """
+    Split a stream of page texts into chunks as the pages arrive.
+
+    The chunks are exactly those semantic_split would return for the pages
+    concatenated in order. Short documents can only be split once the last page
+    is in, but as soon as the text is long enough that every break search window
+    is empty (see chunk_spans), chunks are emitted while later pages are still
+    being extracted. Only the text from the current chunk onwards is kept.
+
+    Args:
+        pages (Iterable[Tuple[int, str]]): (page_number, text) pairs in page order
+        chunk_size (int): Maximum size of each chunk in characters
+        overlap (int): Number of characters to overlap between chunks
+
+    Yields:
+        Tuple[str, int, int, int]: Each chunk, its (start, end) offsets in
+        normalize_text of the concatenated pages, and the page its first
+        character comes from
+    """
+    buffer = ""           # Normalized text from offset `base` onwards
+    base = 0
+    length = 0            # Normalized length so far, possibly ending in a space
+    page_starts: List[int] = []
+    page_numbers: List[int] = []
+    start = 0
+    streaming = False
+
+    def page_at(offset: int) -> int:
+        return page_numbers[bisect_right(page_starts, offset) - 1]
+
+    for page_number, page_text in pages:
+        piece = re.sub(r'\s+', ' ', page_text)
+        if piece.startswith(' ') and (length == 0 or buffer.endswith(' ')):
+            # Leading strip, or the run continues the previous page's whitespace
+            piece = piece[1:]
+        page_starts.append(length)
+        page_numbers.append(page_number)
+        if not piece:
+            continue
+
+        buffer = buffer[start - base:] + piece if streaming else buffer + piece
+        if streaming:
+            base = start
+        length += len(piece)
+
+        known = length - 1 if buffer.endswith(' ') else length
+        if not streaming and known > chunk_size and known // 4 >= chunk_size - 1:
+            streaming = True
+
+        if streaming:
+            # Cuts are final here: the windows only shrink as the text grows
+            while start + chunk_size < known:
+                end = start + chunk_size
+                chunk_start, chunk_end = _trim(buffer, start - base, end - base)
+                if chunk_start < chunk_end:
+                    yield (buffer[chunk_start:chunk_end], chunk_start + base, chunk_end + base,
+                           page_at(chunk_start + base))
+                start = min(max(end - overlap, start + 1), end)
+            buffer = buffer[start - base:]
+            base = start
+
+    if not streaming:
+        text = buffer.strip()
+        for chunk_start, chunk_end in chunk_spans(text, chunk_size, overlap):
+            yield text[chunk_start:chunk_end], chunk_start, chunk_end, page_at(chunk_start)
+        return
+
+    # Flush what is left with the same hard cuts; the final chunk takes the rest
+    text_end = length - 1 if buffer.endswith(' ') else length
+    while start < text_end:
+        end = start + chunk_size
+        last = end >= text_end
+        chunk_start, chunk_end = _trim(buffer, start - base, min(end, text_end) - base)
+        if chunk_start < chunk_end:
+            yield (buffer[chunk_start:chunk_end], chunk_start + base, chunk_end + base,
+                   page_at(chunk_start + base))
+        if last:
+            break
+        start = min(max(end - overlap, start + 1), end)
+
+def find_break_point(text: str, start: int, end: int, boundaries: Optional[BoundaryIndex] = None) -> int:
     """
     Find the best point to break the text, preferring sentence or paragraph boundaries.
     
@@ -67,36 +215,28 @@ def find_break_point(text: str, start: int, end: int) -> int:
         text (str): The full text
         start (int): Start position of the current chunk
         end (int): End position of the current chunk
+        boundaries (BoundaryIndex): Precomputed break positions of text; built on
+            the fly when omitted, so pass it when calling repeatedly on one text
         
     Returns:
         int: Position to break the text, or -1 if no good break point found
     """
-    # Look for sentence endings near the end
-    sentence_endings = ['.', '!', '?']
-    
-    # Search backwards from end for sentence ending
-    for i in range(end - 1, start + len(text) // 4, -1):  # Don't go too far back
-        if text[i] in sentence_endings and i + 1 < len(text):
-            # Check if next character is whitespace or end of text
-            if text[i + 1].isspace() or i + 1 == len(text):
-                return i + 1
-    
-    # If no sentence ending found, look for paragraph breaks
-    for i in range(end - 1, start + len(text) // 4, -1):
-        if text[i] == '\n':
-            return i + 1
-    
-    # If no paragraph break, look for other punctuation
-    other_punctuation = [';', ':', ',']
-    for i in range(end - 1, start + len(text) // 2, -1):
-        if text[i] in other_punctuation and i + 1 < len(text):
-            if text[i + 1].isspace():
-                return i + 1
-    
-    # If no punctuation, look for word boundaries
-    for i in range(end - 1, start + len(text) // 2, -1):
-        if text[i].isspace():
-            return i + 1
+    # Don't go too far back; the search windows are the same as they always were
+    near = start + len(text) // 4
+    far = start + len(text) // 2
+    if near >= end - 1:
+        # Every window is empty
+        return -1
+
+    if boundaries is None:
+        boundaries = BoundaryIndex(text)
+
+    # Prefer sentence endings, then paragraph breaks, then other punctuation, then word boundaries
+    for positions, lower in ((boundaries.sentence, near), (boundaries.paragraph, near),
+                             (boundaries.clause, far), (boundaries.word, far)):
+        break_point = _last_break(positions, lower, end)
+        if break_point != -1:
+            return break_point
     
     # No good break point found
     return -1
@@ -0,0 +1,161 @@
+# utils/summarizer.py
+
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .lexical_index import tokenize
+from .sentence_index import SentenceIndex
+
+# Shorter sentences are mostly headings and list fragments; used only when a chunk has nothing longer
+MIN_SENTENCE_CHARS = 40
+# MMR runs over this many chunks per summary sentence, the ones closest to the centroid
+CANDIDATES_PER_SENTENCE = 20
+
+
+def mmr_select(embeddings: np.ndarray, count: int, diversity: float = 0.3,
+               candidates_per_pick: int = CANDIDATES_PER_SENTENCE) -> Tuple[List[int], np.ndarray]:
+    """
+    Pick count rows that represent the whole set by maximal marginal relevance.
+
+    Relevance is cosine similarity to the normalized centroid of all rows; each
+    pick trades it off against similarity to the rows already picked, weighted
+    by diversity. Only the rows closest to the centroid are candidates, so the
+    cost is one pass over embeddings plus a small dense problem.
+
+    Returns:
+        Tuple[List[int], ndarray]: Picked row indices in pick order, and the centroid
+    """
+    rows = len(embeddings)
+    if rows == 0 or count <= 0:
+        return [], np.zeros(0, dtype=np.float32)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    centroid = embeddings.mean(axis=0)
+    centroid /= np.linalg.norm(centroid) or 1.0
+    relevance = embeddings @ centroid
+
+    pool_size = min(rows, max(count * candidates_per_pick, count))
+    pool = np.argpartition(-relevance, pool_size - 1)[:pool_size] if pool_size < rows else np.arange(rows)
+    pool_embeddings = embeddings[pool]
+    pool_relevance = relevance[pool]
+
+    picked: List[int] = []
+    redundancy = np.full(len(pool), -np.inf, dtype=np.float32)  # Max similarity to a picked row
+    available = np.ones(len(pool), dtype=bool)
+    for _ in range(min(count, len(pool))):
+        scores = (1 - diversity) * pool_relevance - diversity * np.maximum(redundancy, 0.0)
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        np.maximum(redundancy, pool_embeddings @ pool_embeddings[best], out=redundancy)
+    return [int(pool[idx]) for idx in picked], centroid
+
+
+def representative_sentence(sentence_index: SentenceIndex, chunk_idx: int,
+                            centroid: Optional[np.ndarray]) -> Tuple[int, str]:
+    """
+    The (position, text) of the sentence that best stands for its chunk.
+
+    Sentence embeddings refinement already cached are compared to the centroid;
+    otherwise the sentence sharing the most of the chunk's frequent terms wins.
+    Never encodes anything.
+    """
+    sentences = sentence_index.sentences(chunk_idx)
+    eligible = [idx for idx, sentence in enumerate(sentences) if len(sentence.strip()) >= MIN_SENTENCE_CHARS]
+    if not eligible:
+        eligible = [idx for idx, sentence in enumerate(sentences) if sentence.strip()] or [0]
+
+    cached = sentence_index.cached_embeddings(chunk_idx)
+    if centroid is not None and cached is not None and len(cached) == len(sentences) \
+            and cached.shape[1] == len(centroid):
+        scores = cached[eligible] @ centroid
+    else:
+        term_counts = Counter(tokenize(sentence_index.chunks[chunk_idx]))
+        scores = []
+        for idx in eligible:
+            terms = set(tokenize(sentences[idx]))
+            scores.append(sum(term_counts[term] for term in terms) / np.sqrt(len(terms)) if terms else 0.0)
+    best = eligible[int(np.argmax(scores))]
+    return best, sentences[best].strip()
+
+
+def summarize(chunks: Sequence[str], embeddings: np.ndarray, sentence_index: SentenceIndex, pages: Sequence[int],
+              sentences: int = 8, diversity: float = 0.3) -> List[Dict[str, object]]:
+    """
+    Extractive summary of a document from the chunk embeddings it already has.
+
+    MMR picks chunks that are central to the document yet cover different
+    parts of it; each contributes its most representative sentence. The
+    sentences come back in document order, each with its page and chunk.
+    Documents without embeddings (lexical mode) use evenly spaced chunks.
+
+    Args:
+        chunks (Sequence[str]): The document's chunks
+        embeddings (ndarray): Normalized chunk embeddings, one row per chunk
+        sentence_index (SentenceIndex): Sentence spans and any cached sentence embeddings
+        pages (Sequence[int]): Page each chunk starts on
+        sentences (int): Sentences in the summary
+        diversity (float): 0 ranks by centrality alone; higher values favor coverage
+
+    Returns:
+        List[Dict]: {"text", "page", "chunk"} per summary sentence
+    """
+    if len(embeddings) < len(chunks):
+        spaced = np.linspace(0, len(chunks) - 1, min(sentences, len(chunks))).round()
+        picked = sorted({int(chunk_idx) for chunk_idx in spaced})
+        centroid = None
+    else:
+        picked, centroid = mmr_select(embeddings, sentences, diversity)
+    selected = []
+    seen = set()
+    for chunk_idx in picked:
+        position, text = representative_sentence(sentence_index, chunk_idx, centroid)
+        if text and text not in seen:  # Overlapping chunks can share a sentence
+            seen.add(text)
+            selected.append((chunk_idx, position, text))
+    selected.sort()
+    return [{"text": text, "page": int(pages[chunk_idx]) if len(pages) else None, "chunk": chunk_idx}
+            for chunk_idx, _, text in selected]
+
+
+class SummaryCache:
+    """
+    Summaries keyed by (document hash, length), evicted least recently used.
+
+    Documents are content-addressed, so an entry never goes stale; values are
+    whatever the caller stores (the summary and its audio URL).
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, document_hash: str, length: int) -> Optional[object]:
+        with self._lock:
+            value = self._entries.get((document_hash, length))
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((document_hash, length))
+            self.hits += 1
+            return value
+
+    def put(self, document_hash: str, length: int, value: object) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(document_hash, length)] = value
+            self._entries.move_to_end((document_hash, length))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses}
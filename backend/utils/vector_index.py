@@ -0,0 +1,164 @@
+# utils/vector_index.py
+
+import os
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+import numpy as np
+from .quantization import PRECISIONS, QuantizedEmbeddings
+
+# Notebooks with at least this many chunks get an approximate (IVF) index
+IVF_MIN_CHUNKS = int(os.getenv("VECTOR_INDEX_IVF_MIN_CHUNKS", "20000"))
+# Inverted lists scanned per query; higher is slower and closer to exact
+IVF_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+# Precision of the in-memory search copy of the embeddings: float32, float16 or int8
+EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "float32")
+if EMBEDDING_PRECISION not in PRECISIONS:
+    raise ValueError(f"EMBEDDING_PRECISION must be one of {', '.join(PRECISIONS)}")
+# Candidates taken from the quantized scores and re-scored at full precision
+RESCORE_CANDIDATES = int(os.getenv("VECTOR_INDEX_RESCORE_CANDIDATES", "32"))
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, lowest index first on ties.
+
+    Same result as np.argsort(-scores, kind="stable")[:k], but uses
+    argpartition so only the k winners are sorted.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.intp)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+
+    kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    candidates = np.concatenate([above, ties])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorIndex(ABC):
+    """Top-k inner-product search over a notebook's normalized chunk embeddings."""
+
+    kind = "base"
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) of the k best chunks for one query, best first."""
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held on top of the embedding matrix itself."""
+        return 0
+
+
+class FlatIndex(VectorIndex):
+    """Exact search: one matrix-vector product over every chunk."""
+
+    kind = "flat"
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.embeddings @ query
+        indices = top_k_indices(scores, k)
+        return indices, scores[indices]
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: chunks are clustered with spherical k-means and a query
+    only scores the chunks in the n_probe clusters whose centroids it is closest
+    to. Candidates are then scored exactly, so results differ from FlatIndex only
+    when a true neighbour sits in a cluster that wasn't probed.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, embeddings: np.ndarray, n_lists: Optional[int] = None, n_probe: int = IVF_NPROBE,
+                 iterations: int = 10, seed: int = 0):
+        super().__init__(embeddings)
+        n = len(embeddings)
+        self.n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        self.n_probe = max(1, min(n_probe, self.n_lists))
+
+        # Train on a sample; ~64 points per list is plenty for the centroids
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, self.n_lists * 64)
+        sample = np.asarray(embeddings[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty lists keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+
+        # Assign every chunk in blocks so the (chunks x lists) matrix stays small
+        assignments = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 8192):
+            block = np.asarray(embeddings[start:start + 8192], dtype=np.float32)
+            assignments[start:start + 8192] = np.argmax(block @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        self.list_ids = order.astype(np.int32)
+        self.offsets = np.searchsorted(assignments[order], np.arange(self.n_lists + 1))
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        probes = top_k_indices(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([self.list_ids[self.offsets[p]:self.offsets[p + 1]] for p in probes])
+        candidates.sort()  # Ties resolve to the lowest chunk index, as in FlatIndex
+        scores = self.embeddings[candidates] @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes + self.list_ids.nbytes + self.offsets.nbytes
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    Scans a float16 or int8 copy of the embeddings, then re-scores the best
+    rescore candidates exactly against the float32 rows. Only those rows are
+    read, so a memory-mapped float32 matrix stays mostly on disk.
+    """
+
+    kind = "quantized"
+
+    def __init__(self, embeddings: np.ndarray, precision: str = "int8", rescore: int = RESCORE_CANDIDATES):
+        super().__init__(embeddings)
+        self.quantized = QuantizedEmbeddings(embeddings, precision)
+        self.precision = precision
+        self.rescore = rescore
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        candidates = top_k_indices(self.quantized.scores(query), max(k, self.rescore))
+        candidates.sort()  # Ties resolve to the lowest chunk index, as in FlatIndex
+        scores = np.asarray(self.embeddings[candidates], dtype=np.float32) @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+    @property
+    def nbytes(self) -> int:
+        return self.quantized.nbytes
+
+
+def build_vector_index(embeddings: np.ndarray, ivf_min_chunks: int = IVF_MIN_CHUNKS,
+                       precision: str = EMBEDDING_PRECISION) -> VectorIndex:
+    """
+    Exact index for ordinary notebooks, IVF once a notebook reaches
+    ivf_min_chunks chunks, and a quantized scan with re-scoring below that
+    when precision isn't float32.
+    """
+    if len(embeddings) >= max(1, ivf_min_chunks):
+        return IVFIndex(embeddings)
+    if precision != "float32":
+        return QuantizedIndex(embeddings, precision)
+    return FlatIndex(embeddings)
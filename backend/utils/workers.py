@@ -0,0 +1,101 @@
+# utils/workers.py
+
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class WorkerPools:
+    """
+    Executors that keep blocking work off the event loop.
+
+    PDF page extraction runs on a process pool so it doesn't hold the GIL;
+    splitting and BM25 indexing consume its pages as they stream in, on the
+    ingestion thread. Embedding inference runs on a small bounded thread pool
+    because the model releases the GIL inside its kernels and must not be
+    copied into every process. Worker processes are started from a fork server
+    (spawned where there is none): forking the already multi-threaded server
+    directly can deadlock the child. Setting process_workers to 0 runs
+    extraction on a thread pool instead, which is useful where processes are
+    not available. Ingestion pipelines, which mostly wait on the other two
+    pools, get their own small thread pool so they can't tie up embedding
+    threads. The embedding pool has at least two threads: ingestion may use all
+    but one, which is kept for queries.
+    """
+
+    def __init__(self, process_workers: int, embedding_workers: int, ingest_workers: int = 2):
+        self.process_workers = process_workers
+        self.embedding_workers = max(2, embedding_workers)
+        self.ingest_workers = max(1, ingest_workers)
+        self._process_pool: Optional[Executor] = None
+        self._embedding_pool: Optional[ThreadPoolExecutor] = None
+        self._ingest_pool: Optional[ThreadPoolExecutor] = None
+        # Ingestion may occupy all but one embedding thread, so queries always get one
+        self.ingest_embedding_slots = threading.BoundedSemaphore(max(1, self.embedding_workers - 1))
+
+    @property
+    def process_pool(self) -> Executor:
+        if self._process_pool is None:
+            if self.process_workers > 0:
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers,
+                                                         mp_context=multiprocessing.get_context(start_method))
+            else:
+                self._process_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cpu")
+        return self._process_pool
+
+    @property
+    def embedding_pool(self) -> ThreadPoolExecutor:
+        if self._embedding_pool is None:
+            self._embedding_pool = ThreadPoolExecutor(max_workers=self.embedding_workers,
+                                                      thread_name_prefix="embed")
+        return self._embedding_pool
+
+    @property
+    def ingest_pool(self) -> ThreadPoolExecutor:
+        if self._ingest_pool is None:
+            self._ingest_pool = ThreadPoolExecutor(max_workers=self.ingest_workers,
+                                                   thread_name_prefix="ingest")
+        return self._ingest_pool
+
+    def start(self) -> None:
+        """Create every pool now, from the main thread at startup, rather than on first use."""
+        self.process_pool
+        self.embedding_pool
+        self.ingest_pool
+
+    async def run_embedding(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run model inference (or anything that calls it) on the bounded thread pool."""
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (e.g. the request's stage trace) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.embedding_pool, context.run, functools.partial(fn, *args, **kwargs))
+
+    async def run_ingest(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run an ingestion pipeline on the ingestion thread pool."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.ingest_pool, context.run, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._embedding_pool is not None:
+            self._embedding_pool.shutdown(wait=False, cancel_futures=True)
+            self._embedding_pool = None
+        if self._ingest_pool is not None:
+            self._ingest_pool.shutdown(wait=False, cancel_futures=True)
+            self._ingest_pool = None
+
+
+worker_pools = WorkerPools(
+    process_workers=int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    embedding_workers=int(os.getenv("EMBED_WORKERS", "2")),
+    ingest_workers=int(os.getenv("INGEST_WORKERS", "2"))
+)